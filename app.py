@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import os
+from contextlib import nullcontext
 from pathlib import Path
 
+import pandas as pd
 import streamlit as st
 from dotenv import load_dotenv
 
@@ -13,17 +15,54 @@ sys.path.insert(0, str(Path(__file__).parent / "src"))
 
 from retail_ai.data_engine.data_loader import DataLoader
 from retail_ai.engine import RetailAssistantEngine
+from retail_ai.graphs.followup import ChatSession
 from retail_ai.handlers.error_handler import friendly_error
+from retail_ai.utils.config_loader import configure_logging, load_yaml
+from retail_ai.utils.tracing import profile_queries, span_table
+
+# Selectbox entry that ingests every CSV in the input folder as one table.
+ALL_FILES = "__all_csv_files__"
+
+
+def performance_panel(engine: RetailAssistantEngine, trace_id: str | None) -> None:
+    """Per-stage timings of one engine call (the spans of its trace)."""
+    spans = engine.trace_spans(trace_id) if trace_id else []
+    if not spans:
+        return
+    with st.expander("Performance"):
+        st.dataframe(pd.DataFrame(span_table(spans)), use_container_width=True, hide_index=True)
+        for s in spans:
+            if s["attrs"].get("profile"):
+                st.caption(
+                    f"Query profile ({s['attrs'].get('rows', '?')} rows, {s['duration_ms']:.1f} ms)"
+                )
+                st.code(s["attrs"]["profile"], language="text")
+        st.download_button(
+            "Download trace (JSONL)",
+            engine.tracer.to_jsonl(trace_id),
+            file_name=f"trace-{trace_id}.jsonl",
+            mime="application/jsonl",
+            key=f"trace-{trace_id}",
+        )
+
+
+@st.cache_resource
+def shared_engine() -> RetailAssistantEngine:
+    """One engine for every browser session of this server process (graphs, LLM
+    client and dataset connections are shared; chat history stays per session)."""
+    return RetailAssistantEngine()
 
 
 def main() -> None:
     load_dotenv()
+    configure_logging("config/logging_config.yaml")
 
     st.set_page_config(page_title="Retail Insights Assistant", layout="wide")
     st.title("Retail Insights Assistant")
 
     input_dir = Path(os.getenv("DATA_INPUT_DIR", "data/input"))
-    loader = DataLoader(input_dir=input_dir)
+    cache_dir = Path(os.getenv("DATA_CACHE_DIR", "data/cache"))
+    loader = DataLoader.from_config(load_yaml("config/model_config.yaml"), input_dir, cache_dir)
 
     with st.sidebar:
         st.header("Dataset")
@@ -34,6 +73,10 @@ def main() -> None:
         max_rows = st.number_input(
             "Max rows to display", 10, 500, int(os.getenv("MAX_ROWS", "50")), 10
         )
+        profile = st.checkbox(
+            "Profile DuckDB queries",
+            help="Attach EXPLAIN ANALYZE plans to the Performance panel",
+        )
 
     files = loader.list_csv_files()
     if not files:
@@ -42,39 +85,73 @@ def main() -> None:
         )
         st.stop()
 
-    selected = st.selectbox("Select a CSV file", options=files, format_func=lambda p: p.name)
+    selected = st.selectbox(
+        "Select a CSV file",
+        options=[*files, ALL_FILES],
+        format_func=lambda p: "All CSV files (combined)" if p == ALL_FILES else p.name,
+    )
+
+    if "chat_history" not in st.session_state:
+        st.session_state.chat_history = []
+    if "chat_session" not in st.session_state:
+        # Previous plan + result of this browser session, for follow-up questions
+        st.session_state.chat_session = ChatSession()
+    engine = shared_engine()
 
     try:
-        df = loader.load(Path(selected))
+        with engine.tracer.activate(), engine.tracer.span("app.load_dataset"):
+            if selected == ALL_FILES:
+                bar = st.progress(0.0, text="Ingesting CSV files…")
+
+                def on_progress(p):
+                    note = " (cached)" if p.cached else ""
+                    bar.progress(
+                        (p.index + 1) / p.total, text=f"{p.path.name}: {p.rows:,} rows{note}"
+                    )
+
+                dataset = loader.ingest_all(progress=on_progress)
+                bar.empty()
+                label = f"{len(dataset.files)} CSV files"
+            else:
+                dataset = loader.open(Path(selected))
+                label = Path(selected).name
+            preview = dataset.preview(int(max_rows))
+        # Summary tables and narrative are prepared in the background while the user looks around.
+        summary_job = engine.precompute(dataset)
     except Exception as e:
         st.error(friendly_error(e))
         st.stop()
 
     st.subheader("Dataset Preview")
-    st.write(f"File: **{Path(selected).name}** | Rows: {len(df):,} | Columns: {df.shape[1]}")
-    st.dataframe(df.head(int(max_rows)), use_container_width=True)
-
-    # Engine cached per session
-    if "engine" not in st.session_state:
-        st.session_state.engine = RetailAssistantEngine()
-    if "chat_history" not in st.session_state:
-        st.session_state.chat_history = []
+    n_rows, n_cols = dataset.shape
+    st.write(f"File: **{label}** | Rows: {n_rows:,} | Columns: {n_cols}")
+    st.dataframe(preview, use_container_width=True)
 
     tab1, tab2 = st.tabs(["Summarize", "Chat Q&A"])
 
     with tab1:
+        if summary_job is not None:
+            st.caption(f"Background summary: {summary_job.status}")
         if st.button("Generate Summary", type="primary"):
             try:
-                res = st.session_state.engine.summarize(df, max_rows=int(max_rows))
+                answer_box = st.empty()
+                text = ""
+                res = {}
+                with profile_queries() if profile else nullcontext():
+                    for ev in engine.summarize_stream(dataset, max_rows=int(max_rows)):
+                        if ev["type"] == "tables" and ev["tables"]:
+                            with st.expander("Show supporting tables"):
+                                for name, tdf in ev["tables"].items():
+                                    st.markdown(f"### {name}")
+                                    st.dataframe(tdf.head(int(max_rows)), use_container_width=True)
+                        elif ev["type"] == "token":
+                            text += ev["text"]
+                            answer_box.markdown(text + "▌")
+                        elif ev["type"] == "done":
+                            res = ev["state"]
+                answer_box.markdown(res.get("answer") or text or "(no answer)")
                 st.success("Summary ready")
-                st.markdown(res.get("answer", "(no answer)"))
-
-                tables = res.get("_summary_tables") or {}
-                if tables:
-                    with st.expander("Show supporting tables"):
-                        for name, tdf in tables.items():
-                            st.markdown(f"### {name}")
-                            st.dataframe(tdf.head(int(max_rows)), use_container_width=True)
+                performance_panel(engine, (res.get("telemetry") or {}).get("trace_id"))
             except Exception as e:
                 st.error(friendly_error(e))
 
@@ -86,21 +163,37 @@ def main() -> None:
         q = st.chat_input("Ask a question")
         if q:
             st.session_state.chat_history.append({"role": "user", "content": q})
+            res = {}
             with st.chat_message("assistant"):
                 try:
-                    res = st.session_state.engine.answer(
-                        df,
-                        q,
-                        chat_history=st.session_state.chat_history[-10:],
-                        max_rows=int(max_rows),
-                    )
-                    st.markdown(res.get("answer", "(no answer)"))
-
-                    with st.expander("Show SQL"):
-                        st.code(res.get("sql", ""), language="sql")
-
-                    if res.get("result_df") is not None and len(res["result_df"]) > 0:
-                        st.dataframe(res["result_df"].head(int(max_rows)), use_container_width=True)
+                    answer_box = st.empty()
+                    answer_box.markdown("_Running query…_")
+                    text = ""
+                    with profile_queries() if profile else nullcontext():
+                        for ev in engine.answer_stream(
+                            dataset,
+                            q,
+                            chat_history=st.session_state.chat_history[-10:],
+                            max_rows=int(max_rows),
+                            session=st.session_state.chat_session,
+                        ):
+                            if ev["type"] == "result":
+                                with st.expander("Show SQL"):
+                                    st.code(ev.get("sql", ""), language="sql")
+                                table = ev.get("result_table")
+                                if table is not None and table.num_rows > 0:
+                                    # Arrow goes to the frontend as is; slicing copies nothing.
+                                    st.dataframe(
+                                        table.slice(0, int(max_rows)), use_container_width=True
+                                    )
+                                answer_box.markdown("_Writing answer…_")
+                            elif ev["type"] == "token":
+                                text += ev["text"]
+                                answer_box.markdown(text + "▌")
+                            elif ev["type"] == "done":
+                                res = ev["state"]
+                    answer_box.markdown(res.get("answer") or text or "(no answer)")
+                    performance_panel(engine, (res.get("telemetry") or {}).get("trace_id"))
                 except Exception as e:
                     st.error(friendly_error(e))
             st.session_state.chat_history.append(
@@ -0,0 +1,156 @@
+"""Memory and latency of the pandas vs Arrow data paths.
+
+Cases, each run in a fresh process (so peak RSS is not shared between them):
+
+- base_table  the whole sales table out of the ingested database:
+              ``fetchdf()`` (pandas) vs ``to_arrow_table()`` (``DataLoader.load_table``)
+- result      a large result set (one row per order), cached and shown twice
+              (a miss, then a result-cache hit), rendering the first rows as markdown:
+              pandas  DuckDB -> pandas, pandas -> Arrow for the cache, Arrow -> pandas on the hit
+              arrow   ``DuckDBService.query_arrow``: the fetched table is cached and
+                      returned as is; only the rendered rows are converted
+
+Reported per case: median latency (miss and, for ``result``, the hit) over
+``--repeat`` processes and the peak RSS of the measuring process.
+
+Usage:
+    python benchmarks/bench_arrow.py --rows 1000000 --repeat 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import duckdb
+import pyarrow as pa
+from bench_suite import peak_rss
+from synthetic import write_csv
+
+from retail_ai.data_engine.data_loader import DataLoader
+from retail_ai.data_engine.duckdb_service import DuckDBService
+from retail_ai.data_engine.result_cache import ResultCache
+from retail_ai.utils.helpers import df_to_markdown
+
+RESULT_SQL = (
+    'SELECT "Order ID", ANY_VALUE(Category) AS Category, SUM(COALESCE(Amount, 0)) AS gross_amount, '
+    'SUM(COALESCE(Qty, 0)) AS units FROM sales GROUP BY "Order ID" ORDER BY gross_amount DESC'
+)
+SHOWN_ROWS = 50
+COPIES = {
+    ("base_table", "pandas"): "DuckDB -> pandas",
+    ("base_table", "arrow"): "DuckDB -> Arrow",
+    ("result", "pandas"): "DuckDB -> pandas -> Arrow (cache) -> pandas (hit)",
+    ("result", "arrow"): "DuckDB -> Arrow (cached and shared as is)",
+}
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, (time.perf_counter() - t0) * 1000
+
+
+def _child(case: str, variant: str, db: str):
+    """One measurement in this (fresh) process; prints a JSON line."""
+    out = {}
+    with peak_rss() as mem:
+        if case == "base_table":
+            conn = duckdb.connect(db, read_only=True)
+            if variant == "pandas":
+                rows, out["miss_ms"] = _timed(
+                    lambda: len(conn.execute("SELECT * FROM sales").fetchdf())
+                )
+            else:
+                rows, out["miss_ms"] = _timed(
+                    lambda: conn.execute("SELECT * FROM sales").to_arrow_table().num_rows
+                )
+        elif variant == "pandas":
+            # The previous query_df path: fetchdf, then from_pandas for the result cache and to_pandas on a hit.
+            conn = duckdb.connect(db, read_only=True)
+            cache = {}
+
+            def miss():
+                df = conn.execute(RESULT_SQL).fetchdf()
+                cache["t"] = pa.Table.from_pandas(df, preserve_index=False)
+                df_to_markdown(df, SHOWN_ROWS)
+                return len(df)
+
+            def hit():
+                df = cache["t"].to_pandas()
+                df_to_markdown(df, SHOWN_ROWS)
+                return len(df)
+
+            rows, out["miss_ms"] = _timed(miss)
+            _, out["hit_ms"] = _timed(hit)
+        else:
+            svc = DuckDBService.attach(db, fingerprint="bench")
+            svc.result_cache = ResultCache(max_bytes=2**34)
+
+            def run():
+                table = svc.query_arrow(RESULT_SQL)
+                df_to_markdown(table, SHOWN_ROWS)
+                return table.num_rows
+
+            rows, out["miss_ms"] = _timed(run)
+            _, out["hit_ms"] = _timed(run)
+    out.update(rows=rows, peak_mb=mem["peak_mb"])
+    print(json.dumps(out))
+
+
+def _measure(case: str, variant: str, db: str):
+    cmd = [sys.executable, str(Path(__file__).resolve()), "--child", case, variant, db]
+    proc = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _median(runs, key):
+    values = [r[key] for r in runs if r.get(key) is not None]
+    return f"{statistics.median(values):.1f}" if values else "-"
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--repeat", type=int, default=3, help="processes per case")
+    ap.add_argument("--child", nargs=3, metavar=("CASE", "VARIANT", "DB"), help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+    if args.child:
+        _child(*args.child)
+        return 0
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_arrow_"))
+    (workdir / "input").mkdir()
+    csv = Path(write_csv(str(workdir / "input" / "sales.csv"), args.rows))
+    dataset = DataLoader(input_dir=csv.parent, cache_dir=workdir / "cache").open(csv)
+    db = str(dataset.cache_path)
+    _measure("base_table", "arrow", db)  # warm the OS page cache
+
+    print(f"{args.rows:,} rows")
+    print(
+        f"{'case':>10} {'path':>7} {'rows':>10} {'miss_ms':>9} {'hit_ms':>8} {'peak_rss_mb':>12}  copies"
+    )
+    for case in ("base_table", "result"):
+        for variant in ("pandas", "arrow"):
+            runs = [_measure(case, variant, db) for _ in range(args.repeat)]
+            print(
+                f"{case:>10} {variant:>7} {runs[0]['rows']:>10,} {_median(runs, 'miss_ms'):>9} "
+                f"{_median(runs, 'hit_ms'):>8} {_median(runs, 'peak_mb'):>12}  {COPIES[case, variant]}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
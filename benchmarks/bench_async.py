@@ -0,0 +1,150 @@
+"""Throughput / tail latency of RetailAssistantEngine.aanswer() under N concurrent sessions.
+
+The Gemini SDK model is replaced by a local fake with configurable latency and
+429 rate, so the run needs no network and exercises the real guard (rate limit,
+concurrency cap, timeout, retry with backoff).
+
+Usage:
+    python benchmarks/bench_async.py --sessions 1 8 32 --questions 4 --latency-ms 400 --error-rate 0.05
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import duckdb
+import google.generativeai as genai
+from google.api_core import exceptions as gexc
+from synthetic import synthetic_sales_sql
+
+from retail_ai.engine import RetailAssistantEngine
+
+PLAN = '{"metrics":["shipped_amount","orders"],"group_by":["ship-state"],"filters":{},"limit":10}'
+QUESTIONS = [
+    "Which states drove shipped revenue and orders?",
+    "Where do we sell the most, state by state?",
+    "Break down revenue and orders across regions",
+    "Compare states on sales and order volume",
+]
+
+
+class _Resp:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """Stands in for genai.GenerativeModel: sleeps, sometimes answers 429."""
+
+    latency_s = 0.4
+    error_rate = 0.0
+
+    def __init__(self, model_name: str, *args, **kwargs):
+        self.model_name = model_name
+
+    def _text(self, prompt: str):
+        return PLAN if "Planner agent" in prompt else "Shipped revenue is led by a few states."
+
+    def _delay(self):
+        return random.lognormvariate(0, 0.35) * self.latency_s
+
+    def generate_content(self, prompt, **kwargs):
+        time.sleep(self._delay())
+        if random.random() < self.error_rate:
+            raise gexc.ResourceExhausted("429 quota exceeded (fake)")
+        return _Resp(self._text(prompt))
+
+    async def generate_content_async(self, prompt, **kwargs):
+        await asyncio.sleep(self._delay())
+        if random.random() < self.error_rate:
+            raise gexc.ResourceExhausted("429 quota exceeded (fake)")
+        return _Resp(self._text(prompt))
+
+
+def _config(args):
+    cfg = yaml.safe_load((ROOT / "config/model_config.yaml").read_text(encoding="utf-8"))
+    cfg.setdefault("llm_cache", {})["enabled"] = False
+    cfg["llm_limits"] = {
+        "rate_per_sec": args.rate,
+        "burst": args.burst,
+        "max_concurrency": args.max_concurrency,
+        "timeout_seconds": args.timeout,
+        "max_retries": 4,
+        "backoff_base_seconds": 0.1,
+        "backoff_max_seconds": 2.0,
+    }
+    path = Path(tempfile.mkdtemp(prefix="bench_async_")) / "model_config.yaml"
+    path.write_text(yaml.safe_dump(cfg), encoding="utf-8")
+    return str(path)
+
+
+async def _session(engine, df, n_questions: int, latencies):
+    for i in range(n_questions):
+        t0 = time.perf_counter()
+        await engine.aanswer(df, QUESTIONS[i % len(QUESTIONS)])
+        latencies.append(time.perf_counter() - t0)
+
+
+def _pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, round(p / 100 * (len(values) - 1)))]
+
+
+async def _run(engine, df, sessions: int, n_questions: int):
+    latencies = []
+    t0 = time.perf_counter()
+    await asyncio.gather(*[_session(engine, df, n_questions, latencies) for _ in range(sessions)])
+    return time.perf_counter() - t0, latencies
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--sessions", type=int, nargs="+", default=[1, 8, 32])
+    ap.add_argument("--questions", type=int, default=4, help="questions per session")
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--latency-ms", type=float, default=400)
+    ap.add_argument("--error-rate", type=float, default=0.05)
+    ap.add_argument("--rate", type=float, default=20.0, help="guard rate limit (calls/s)")
+    ap.add_argument("--burst", type=int, default=10)
+    ap.add_argument("--max-concurrency", type=int, default=16)
+    ap.add_argument("--timeout", type=float, default=10.0)
+    args = ap.parse_args(argv)
+
+    FakeGenerativeModel.latency_s = args.latency_ms / 1000
+    FakeGenerativeModel.error_rate = args.error_rate
+    os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+
+    with duckdb.connect() as conn:
+        df = conn.execute(synthetic_sales_sql(args.rows)).fetchdf()
+
+    with mock.patch.object(genai, "GenerativeModel", FakeGenerativeModel):
+        engine = RetailAssistantEngine(cfg_path=_config(args))
+        print(
+            f"{'sessions':>8} {'answers':>8} {'wall_s':>8} {'ans/s':>7} {'p50_s':>7} {'p95_s':>7} {'p99_s':>7}"
+        )
+        for sessions in args.sessions:
+            wall, lat = asyncio.run(_run(engine, df, sessions, args.questions))
+            print(
+                f"{sessions:>8} {len(lat):>8} {wall:>8.2f} {len(lat) / wall:>7.2f} "
+                f"{statistics.median(lat):>7.2f} {_pct(lat, 95):>7.2f} {_pct(lat, 99):>7.2f}"
+            )
+        print("guard:", engine.llm_call_stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""N simultaneous chat sessions on one shared engine vs one engine per session.
+
+Sessions are threads, like Streamlit's script runs. Each session asks
+``--questions`` questions with its own chat history against one on-disk
+dataset (DataLoader.open). The LLM is the offline stub backend with
+``--latency-ms`` per call, so the run needs no network.
+
+- shared       one RetailAssistantEngine for all sessions (what app.py does):
+               graphs, LLM client and the read-only dataset connection are
+               built once; each request borrows a cursor from the pool
+- per-session  a new engine per session (the previous app.py behaviour)
+
+Every answer is checked against a single-session reference (same SQL, same
+result frame). The exit code is 1 if any answer failed or differed.
+
+Usage:
+    python benchmarks/bench_concurrency.py --sessions 1 8 32 64 --questions 4 --latency-ms 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_suite import peak_rss
+from synthetic import write_csv
+
+from retail_ai.data_engine.data_loader import DataLoader
+from retail_ai.engine import RetailAssistantEngine
+
+QUESTIONS = [
+    "Top 5 categories by revenue",
+    "Sales by state",
+    "Which cities have the most orders?",
+    "Cancellation rate by category",
+    "Revenue by ship-service-level",
+    "Units sold by fulfilment",
+]
+
+
+def _config(workdir: Path, args):
+    cfg = yaml.safe_load((ROOT / "config/model_config.yaml").read_text(encoding="utf-8"))
+    cfg.setdefault("llm", {})["provider"] = "stub"
+    cfg["llm"]["stub"] = {"latency_ms": args.latency_ms, "responses": {}}
+    cfg.setdefault("llm_cache", {})["enabled"] = False
+    cfg.setdefault("llm_limits", {}).update(
+        {"rate_per_sec": 0, "max_concurrency": args.llm_concurrency}
+    )
+    cfg["connections"] = {
+        "pool_size": args.pool_size,
+        "acquire_timeout_seconds": 120,
+        "max_datasets": 4,
+    }
+    cfg.setdefault("tracing", {})["enabled"] = False
+    path = workdir / "model_config.yaml"
+    path.write_text(yaml.safe_dump(cfg), encoding="utf-8")
+    return str(path)
+
+
+def _pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, round(p / 100 * (len(values) - 1)))]
+
+
+def _reference(engine, dataset):
+    out = {}
+    for q in QUESTIONS:
+        res = engine.answer(dataset, q)
+        out[q] = (res.get("sql"), res.get("result_table"))
+    return out
+
+
+def _session(engine_for, dataset, index: int, n_questions: int, reference, latencies, failures):
+    try:
+        engine = engine_for()
+        history = []
+        for i in range(n_questions):
+            q = QUESTIONS[(index + i) % len(QUESTIONS)]
+            t0 = time.perf_counter()
+            res = engine.answer(dataset, q, chat_history=history[-10:])
+            latencies.append(time.perf_counter() - t0)
+            sql, table = reference[q]
+            if res.get("error") or res.get("sql") != sql or not res["result_table"].equals(table):
+                failures.append(
+                    f"session {index}: {q!r} -> {res.get('error') or 'different result'}"
+                )
+            history += [
+                {"role": "user", "content": q},
+                {"role": "assistant", "content": res.get("answer", "")},
+            ]
+    except Exception as e:  # noqa: BLE001 - reported, not raised
+        failures.append(f"session {index}: {type(e).__name__}: {e}")
+
+
+def _run(mode: str, cfg_path: str, shared, dataset, sessions: int, n_questions: int, reference):
+    latencies, failures = [], []
+    if mode == "shared":
+        engine_for = lambda: shared  # noqa: E731
+    else:
+        engine_for = lambda: RetailAssistantEngine(cfg_path=cfg_path)  # noqa: E731
+    threads = [
+        threading.Thread(
+            target=_session,
+            args=(engine_for, dataset, i, n_questions, reference, latencies, failures),
+        )
+        for i in range(sessions)
+    ]
+    with peak_rss() as mem:
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - t0
+    return wall, latencies, failures, mem["peak_mb"]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    ap.add_argument("--sessions", type=int, nargs="+", default=[1, 8, 32, 64])
+    ap.add_argument("--questions", type=int, default=4, help="questions per session")
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--latency-ms", type=float, default=200, help="stub LLM latency per call")
+    ap.add_argument("--llm-concurrency", type=int, default=64, help="llm_limits.max_concurrency")
+    ap.add_argument("--pool-size", type=int, default=16, help="connections.pool_size")
+    ap.add_argument(
+        "--modes", nargs="+", default=["shared", "per-session"], choices=["shared", "per-session"]
+    )
+    args = ap.parse_args(argv)
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_concurrency_"))
+    (workdir / "input").mkdir()
+    csv = Path(write_csv(str(workdir / "input" / "sales.csv"), args.rows))
+    dataset = DataLoader(input_dir=csv.parent, cache_dir=workdir / "cache").open(csv)
+    cfg_path = _config(workdir, args)
+
+    t0 = time.perf_counter()
+    shared = RetailAssistantEngine(cfg_path=cfg_path)
+    startup = time.perf_counter() - t0
+    reference = _reference(shared, dataset)
+    print(
+        f"{args.rows:,} rows, engine startup {startup * 1000:.0f} ms, stub LLM {args.latency_ms:.0f} ms/call"
+    )
+
+    print(
+        f"{'mode':>12} {'sessions':>8} {'answers':>8} {'wall_s':>8} {'ans/s':>7} {'p50_s':>7} {'p95_s':>7} "
+        f"{'peak_mb':>8} {'failed':>6}"
+    )
+    failed = 0
+    for mode in args.modes:
+        for sessions in args.sessions:
+            wall, lat, failures, peak = _run(
+                mode, cfg_path, shared, dataset, sessions, args.questions, reference
+            )
+            failed += len(failures)
+            print(
+                f"{mode:>12} {sessions:>8} {len(lat):>8} {wall:>8.2f} {len(lat) / wall:>7.2f} "
+                f"{statistics.median(lat) if lat else 0:>7.2f} {_pct(lat, 95) if lat else 0:>7.2f} "
+                f"{peak if peak is not None else float('nan'):>8.1f} {len(failures):>6}"
+            )
+            for f in failures[:5]:
+                print("   ", f)
+    print("pools:", shared.pool_stats())
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
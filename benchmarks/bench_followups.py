@@ -0,0 +1,148 @@
+"""First-question vs follow-up latency of a chat session.
+
+Each conversation is one opening question followed by refinements ("now only
+MAHARASHTRA", "split that by month", "top 3"). The LLM is the offline stub
+backend with ``--latency-ms`` per call and the rule fast path is off, so every
+opening question pays one planner call, as an open-ended question would.
+
+- followups  follow-ups are merged into the session's previous plan (no planner
+             call) and answered from the previous result when exact
+- planner    planner.followups off: every follow-up goes through the planner
+
+Reported per mode: time to result (SQL result ready, what the UI shows first)
+and total time (narration included), p50 for opening questions and follow-ups.
+Follow-up answers in ``followups`` mode are checked against their plan run on
+the base table; the exit code is 1 on any mismatch.
+
+Usage:
+    python benchmarks/bench_followups.py --rows 1000000 --latency-ms 300
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synthetic import write_csv
+
+from retail_ai.data_engine.data_loader import DataLoader
+from retail_ai.data_engine.sql_builder import build_sql
+from retail_ai.engine import RetailAssistantEngine
+from retail_ai.graphs.followup import ChatSession
+from retail_ai.utils.helpers import arrow_to_df
+
+# The stub planner's fixed plan is "shipped revenue by Category, top 10".
+CONVERSATIONS = [
+    ["Which categories sell best?", "now only MAHARASHTRA", "split that by month", "top 3"],
+    ["Which categories sell best?", "what about units", "by state instead", "now only Amazon"],
+    ["Which categories sell best?", "in May", "break that down by fulfilment", "bottom 2"],
+    ["Which categories sell best?", "top 5", "and orders too", "only Expedited"],
+]
+
+
+def _config(workdir: Path, args, followups: bool):
+    cfg = yaml.safe_load((ROOT / "config/model_config.yaml").read_text(encoding="utf-8"))
+    cfg.setdefault("llm", {})["provider"] = "stub"
+    cfg["llm"]["stub"] = {"latency_ms": args.latency_ms, "responses": {}}
+    cfg.setdefault("llm_cache", {})["enabled"] = False
+    cfg.setdefault("llm_limits", {}).update({"rate_per_sec": 0})
+    cfg.setdefault("result_cache", {})["enabled"] = False
+    cfg["planner"] = {"fast_path": False, "followups": followups}
+    path = workdir / f"model_config_{'followups' if followups else 'planner'}.yaml"
+    path.write_text(yaml.safe_dump(cfg), encoding="utf-8")
+    return str(path)
+
+
+def _same(got, ref):
+    if list(got.columns) != list(ref.columns) or len(got) != len(ref):
+        return False
+    for col in ref.columns:
+        a, b = got[col].reset_index(drop=True), ref[col].reset_index(drop=True)
+        if a.dtype.kind in "fiu" and b.dtype.kind in "fiu":
+            if not ((a - b).abs() <= 1e-9 * b.abs() + 1e-6).all():
+                return False
+        elif not (a.astype(str) == b.astype(str)).all():
+            return False
+    return True
+
+
+def _turn(engine, dataset, question, session):
+    t0 = time.perf_counter()
+    to_result = None
+    state = {}
+    for ev in engine.answer_stream(dataset, question, session=session):
+        if ev["type"] == "result":
+            to_result = time.perf_counter() - t0
+        elif ev["type"] == "done":
+            state = ev["state"]
+    return to_result, time.perf_counter() - t0, state
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--latency-ms", type=float, default=300, help="stub LLM latency per call")
+    ap.add_argument("--repeat", type=int, default=3, help="passes over the conversations")
+    args = ap.parse_args(argv)
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_followups_"))
+    (workdir / "input").mkdir()
+    csv = Path(write_csv(str(workdir / "input" / "sales.csv"), args.rows))
+    dataset = DataLoader(input_dir=csv.parent, cache_dir=workdir / "cache").open(csv)
+    print(f"{args.rows:,} rows, stub LLM {args.latency_ms:.0f} ms/call")
+    print(f"{'mode':>10} {'turn':>9} {'n':>4} {'result_p50_ms':>14} {'total_p50_ms':>13}  sources")
+
+    mismatches = 0
+    for mode in ("followups", "planner"):
+        engine = RetailAssistantEngine(cfg_path=_config(workdir, args, mode == "followups"))
+        engine.answer(dataset, CONVERSATIONS[0][0])  # warm the dataset pool and column reads
+        times = {"first": ([], []), "follow-up": ([], [])}
+        sources = {}
+        for _ in range(args.repeat):
+            for conversation in CONVERSATIONS:
+                session = ChatSession()
+                for i, question in enumerate(conversation):
+                    to_result, total, state = _turn(engine, dataset, question, session)
+                    kind = "first" if i == 0 else "follow-up"
+                    times[kind][0].append(to_result)
+                    times[kind][1].append(total)
+                    telemetry = state.get("telemetry") or {}
+                    if kind == "follow-up":
+                        source = telemetry.get("followup_source") or telemetry.get("planner", "llm")
+                        sources[source] = sources.get(source, 0) + 1
+                    if mode == "followups" and telemetry.get("planner") == "followup":
+                        with engine._cursor(dataset) as svc:
+                            ref = svc.conn.execute(
+                                build_sql(state["plan"], svc.schema_profile())
+                            ).fetchdf()
+                        if not _same(arrow_to_df(state["result_table"]), ref):
+                            mismatches += 1
+                            print(f"    mismatch: {question!r} -> {state.get('sql')!r}")
+        for kind, (results, totals) in times.items():
+            src = (
+                ", ".join(f"{k}={v}" for k, v in sorted(sources.items()))
+                if kind == "follow-up"
+                else ""
+            )
+            print(
+                f"{mode:>10} {kind:>9} {len(totals):>4} {statistics.median(results) * 1000:>14.1f} "
+                f"{statistics.median(totals) * 1000:>13.1f}  {src}"
+            )
+        engine.close()
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,481 @@
+"""Regression benchmark: ingestion, summary and a fixed battery of chat plans.
+
+For every dataset size a synthetic CSV in the sale-report shape is generated
+(benchmarks/synthetic.py, deterministic for a given seed) and run through:
+
+- ingest         DataLoader.ingest_all() from a cold cache
+- ingest_cached  the same call again (fingerprint check only)
+- build_sql      validate_plan() + build_sql() for each battery plan (CPU only)
+- summarize      RetailAssistantEngine.summarize()
+- chat           RetailAssistantEngine.answer() for each battery question
+
+The Gemini SDK model is replaced by a deterministic stub: the planner gets the
+battery plan of the question, the narrators get a fixed text. Per-stage times
+come from the engine's trace spans. Results (median/p95 latency, throughput,
+peak RSS) are written as JSON; with --baseline the run is compared against an
+earlier result and the exit code is 1 when a stage regressed past its threshold.
+
+Usage:
+    python benchmarks/bench_suite.py --sizes 100000 1000000 10000000 --out bench.json
+    python benchmarks/bench_suite.py --sizes 100000 --baseline bench.json --threshold 0.2
+    python benchmarks/bench_suite.py --compare new.json old.json --threshold chat=0.3
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest import mock
+
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import duckdb
+import google.generativeai as genai
+from synthetic import write_csv
+
+from retail_ai.data_engine.data_loader import DataLoader
+from retail_ai.data_engine.sql_builder import build_sql
+from retail_ai.engine import RetailAssistantEngine
+from retail_ai.utils.validators import validate_plan
+
+try:
+    import psutil
+except ImportError:  # optional; /proc is used on Linux
+    psutil = None
+
+# (question, plan): covers rollup and base-table paths, filters, a time window,
+# a high-cardinality group and a KPI-only query.
+PLAN_BATTERY = [
+    (
+        "bench: top categories by shipped revenue",
+        {
+            "metrics": ["shipped_amount"],
+            "group_by": ["Category"],
+            "sort": [{"by": "shipped_amount", "order": "desc"}],
+            "limit": 5,
+        },
+    ),
+    (
+        "bench: orders and units by state",
+        {"metrics": ["orders", "units"], "group_by": ["ship-state"], "limit": 20},
+    ),
+    (
+        "bench: cancellation rate by state in May",
+        {
+            "metrics": ["cancel_rate"],
+            "group_by": ["ship-state"],
+            "time": {"from": "2022-05-01", "to": "2022-05-31"},
+        },
+    ),
+    (
+        "bench: gross vs cancelled amount by service level",
+        {"metrics": ["gross_amount", "cancelled_amount"], "group_by": ["ship-service-level"]},
+    ),
+    (
+        "bench: karnataka revenue and orders by category",
+        {
+            "metrics": ["shipped_amount", "orders"],
+            "group_by": ["Category"],
+            "filters": {"ship-state": "KARNATAKA"},
+        },
+    ),
+    (
+        "bench: revenue by city",
+        {"metrics": ["shipped_amount"], "group_by": ["ship-city"], "limit": 50},
+    ),
+    (
+        "bench: overall kpis",
+        {
+            "metrics": ["gross_amount", "shipped_amount", "orders", "units", "cancel_rate"],
+            "group_by": [],
+        },
+    ),
+    (
+        "bench: units by fulfilment and category",
+        {"metrics": ["units"], "group_by": ["Fulfilment", "Category"], "limit": 50},
+    ),
+]
+_PLANS = {q: json.dumps(p) for q, p in PLAN_BATTERY}
+
+# Stages whose sub-stage times are taken from these span names.
+_CHAT_SPANS = [
+    "node.planner",
+    "node.validator",
+    "node.extractor",
+    "node.narrator",
+    "duckdb.query",
+    "llm.complete",
+]
+_SUMMARY_SPANS = ["node.summary_extractor", "node.summary_narrator", "duckdb.query", "llm.complete"]
+
+
+class _Resp:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubGenerativeModel:
+    """Deterministic stand-in for genai.GenerativeModel (optional fixed latency)."""
+
+    latency_s = 0.0
+
+    def __init__(self, model_name: str, *args, **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, prompt, **kwargs):
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        if "Planner agent" in prompt:
+            question = prompt.rsplit("User: ", 1)[-1].strip()
+            return _Resp(_PLANS.get(question, "{}"))
+        return _Resp("Benchmark narrative.")
+
+
+def _rss_bytes():
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+@contextmanager
+def peak_rss(interval_s: float = 0.01):
+    """Sample the process RSS while the block runs; yields a dict with ``peak_mb``."""
+    out = {"peak_mb": None}
+    start = _rss_bytes()
+    if start is None:
+        yield out
+        return
+    peak = [start]
+    stop = threading.Event()
+
+    def sample():
+        while not stop.wait(interval_s):
+            peak[0] = max(peak[0], _rss_bytes() or 0)
+
+    t = threading.Thread(target=sample, daemon=True)
+    t.start()
+    try:
+        yield out
+    finally:
+        stop.set()
+        t.join()
+        peak[0] = max(peak[0], _rss_bytes() or 0)
+        out["peak_mb"] = round(peak[0] / 2**20, 1)
+
+
+def _pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, round(p / 100 * (len(values) - 1)))]
+
+
+def _latency(samples):
+    return {
+        "median": round(statistics.median(samples), 6),
+        "p95": round(_pct(samples, 95), 6),
+        "min": round(min(samples), 6),
+        "n": len(samples),
+    }
+
+
+def _span_medians(spans_per_run, names):
+    """Median per run of the summed duration of each span name (seconds)."""
+    out = {}
+    for name in names:
+        totals = [
+            sum(s["duration_ms"] for s in spans if s["name"] == name) / 1000
+            for spans in spans_per_run
+        ]
+        if any(totals):
+            out[name] = round(statistics.median(totals), 6)
+    return out
+
+
+def _config(workdir: Path, llm_latency_ms: float):
+    cfg = yaml.safe_load((ROOT / "config/model_config.yaml").read_text(encoding="utf-8"))
+    cfg.setdefault("llm_cache", {})["enabled"] = False
+    cfg.setdefault("result_cache", {})["enabled"] = False  # time the queries, not cache hits
+    cfg.setdefault("precompute", {})[
+        "enabled"
+    ] = False  # summarize() runs every time, not a stored job
+    cfg.setdefault("planner", {})["fast_path"] = False  # every battery question uses its fixed plan
+    cfg.setdefault("ingest", {})["temp_directory"] = str(workdir / "spill")
+    cfg["tracing"] = {
+        "enabled": True,
+        "max_spans": 100_000,
+        "export_path": None,
+        "profile_queries": False,
+    }
+    cfg["llm_limits"] = {
+        "rate_per_sec": 0,
+        "burst": 1,
+        "max_concurrency": 64,
+        "timeout_seconds": 60,
+        "max_retries": 0,
+    }
+    StubGenerativeModel.latency_s = llm_latency_ms / 1000
+    path = workdir / "model_config.yaml"
+    path.write_text(yaml.safe_dump(cfg), encoding="utf-8")
+    return str(path), cfg
+
+
+def bench_size(rows: int, workdir: Path, cfg_path: str, cfg, repeat: int, seed: int):
+    res = {}
+    input_dir = workdir / f"rows-{rows}" / "input"
+    input_dir.mkdir(parents=True, exist_ok=True)
+    t0 = time.perf_counter()
+    write_csv(str(input_dir / "sales.csv"), rows, seed=seed)
+    res["generate_csv"] = {"latency_s": _latency([time.perf_counter() - t0])}
+
+    loader = DataLoader.from_config(cfg, input_dir, workdir / f"rows-{rows}" / "cache")
+    with peak_rss() as mem:
+        t0 = time.perf_counter()
+        dataset = loader.ingest_all()
+        elapsed = time.perf_counter() - t0
+    res["ingest"] = {
+        "latency_s": _latency([elapsed]),
+        "rows_per_s": round(rows / elapsed),
+        "peak_rss_mb": mem["peak_mb"],
+    }
+
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        loader.ingest_all()
+        samples.append(time.perf_counter() - t0)
+    res["ingest_cached"] = {"latency_s": _latency(samples)}
+
+    engine = RetailAssistantEngine(cfg_path=cfg_path)
+
+    with engine._cursor(dataset) as svc:
+        profile, rollup = svc.schema_profile(), svc.rollup
+    samples = []
+    for _ in range(max(repeat, 3)):
+        t0 = time.perf_counter()
+        for _ in range(100):
+            for _, plan in PLAN_BATTERY:
+                p, _ = validate_plan(json.loads(json.dumps(plan)), profile)
+                build_sql(p, profile, rollup=rollup)
+        samples.append((time.perf_counter() - t0) / (100 * len(PLAN_BATTERY)))
+    res["build_sql"] = {
+        "latency_s": _latency(samples),
+        "plans_per_s": round(1 / statistics.median(samples)),
+    }
+
+    with peak_rss() as mem:
+        t0 = time.perf_counter()
+        engine.summarize(dataset)  # cold: attach, schema profile, first scan
+        first = time.perf_counter() - t0
+        spans, samples = [], []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            out = engine.summarize(dataset)
+            samples.append(time.perf_counter() - t0)
+            spans.append(engine.trace_spans(out["telemetry"]["trace_id"]))
+    res["summarize"] = {
+        "latency_s": _latency(samples),
+        "first_s": round(first, 6),
+        "rows_per_s": round(rows / statistics.median(samples)),
+        "stages_s": _span_medians(spans, _SUMMARY_SPANS),
+        "peak_rss_mb": mem["peak_mb"],
+    }
+
+    with peak_rss() as mem:
+        spans, samples, per_question = [], [], {}
+        for _ in range(repeat):
+            for question, _ in PLAN_BATTERY:
+                t0 = time.perf_counter()
+                out = engine.answer(dataset, question)
+                elapsed = time.perf_counter() - t0
+                samples.append(elapsed)
+                per_question.setdefault(question, []).append(elapsed)
+                spans.append(engine.trace_spans(out["telemetry"]["trace_id"]))
+    res["chat"] = {
+        "latency_s": _latency(samples),
+        "answers_per_s": round(len(samples) / sum(samples), 2),
+        "stages_s": _span_medians(spans, _CHAT_SPANS),
+        "questions_s": {q: round(statistics.median(v), 6) for q, v in per_question.items()},
+        "peak_rss_mb": mem["peak_mb"],
+    }
+    engine.tracer.clear()
+    return res
+
+
+def _meta(args):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "duckdb": duckdb.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "llm_latency_ms": args.llm_latency_ms,
+    }
+
+
+def _parse_thresholds(items, default: float):
+    thresholds = {"*": default}
+    for item in items or []:
+        if "=" in item:
+            stage, value = item.split("=", 1)
+            thresholds[stage.strip()] = float(value)
+        else:
+            thresholds["*"] = float(item)
+    return thresholds
+
+
+def compare(current, baseline, thresholds, rss_threshold: float, min_delta_s: float):
+    """Rows of (size, stage, metric, baseline, current, change, regressed)."""
+    rows = []
+    for size, stages in current.get("sizes", {}).items():
+        for stage, cur in stages.items():
+            base = baseline.get("sizes", {}).get(size, {}).get(stage)
+            if base is None or stage == "generate_csv":
+                continue
+            limit = thresholds.get(stage, thresholds["*"])
+            b, c = base["latency_s"]["median"], cur["latency_s"]["median"]
+            change = (c - b) / b if b else 0.0
+            rows.append(
+                (size, stage, "median_s", b, c, change, change > limit and c - b > min_delta_s)
+            )
+            if base.get("peak_rss_mb") and cur.get("peak_rss_mb"):
+                b, c = base["peak_rss_mb"], cur["peak_rss_mb"]
+                change = (c - b) / b
+                rows.append((size, stage, "peak_rss_mb", b, c, change, change > rss_threshold))
+    return rows
+
+
+def print_results(result):
+    print(
+        f"{'rows':>12} {'stage':<14} {'median_ms':>10} {'p95_ms':>10} {'throughput':>16} {'peak_rss_mb':>12}"
+    )
+    for size, stages in result["sizes"].items():
+        for stage, r in stages.items():
+            rate = next(
+                (
+                    f"{r[k]:,.0f} {k.split('_per_s')[0]}/s"
+                    for k in ("rows_per_s", "plans_per_s", "answers_per_s")
+                    if k in r
+                ),
+                "",
+            )
+            rss = r.get("peak_rss_mb")
+            print(
+                f"{int(size):>12,} {stage:<14} {r['latency_s']['median'] * 1000:>10.2f} {r['latency_s']['p95'] * 1000:>10.2f} "
+                f"{rate:>16} {rss if rss is not None else '':>12}"
+            )
+
+
+def print_comparison(rows):
+    print(
+        f"\n{'rows':>12} {'stage':<14} {'metric':<12} {'baseline':>10} {'current':>10} {'change':>8}"
+    )
+    for size, stage, metric, b, c, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(
+            f"{int(size):>12,} {stage:<14} {metric:<12} {b:>10.4f} {c:>10.4f} {change:>+7.1%}{flag}"
+        )
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000])
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument(
+        "--llm-latency-ms", type=float, default=0.0, help="fixed stub LLM latency per call"
+    )
+    ap.add_argument("--out", type=Path, help="write results JSON here")
+    ap.add_argument(
+        "--workdir",
+        type=Path,
+        help="keep generated CSVs and caches here (default: temp dir, removed)",
+    )
+    ap.add_argument("--baseline", type=Path, help="compare against this results JSON")
+    ap.add_argument(
+        "--compare",
+        type=Path,
+        nargs=2,
+        metavar=("CURRENT", "BASELINE"),
+        help="only compare two results files",
+    )
+    ap.add_argument(
+        "--threshold",
+        action="append",
+        help="allowed median slowdown, e.g. 0.2 or per stage chat=0.3 (repeatable; default 0.2)",
+    )
+    ap.add_argument("--rss-threshold", type=float, default=0.25, help="allowed peak RSS growth")
+    ap.add_argument(
+        "--min-delta-ms", type=float, default=5.0, help="ignore slowdowns smaller than this"
+    )
+    args = ap.parse_args(argv)
+    thresholds = _parse_thresholds(args.threshold, 0.2)
+
+    if args.compare:
+        current, baseline = (json.loads(p.read_text(encoding="utf-8")) for p in args.compare)
+    else:
+        os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+        workdir = args.workdir or Path(tempfile.mkdtemp(prefix="bench_suite_"))
+        workdir.mkdir(parents=True, exist_ok=True)
+        cfg_path, cfg = _config(workdir, args.llm_latency_ms)
+        current = {"meta": _meta(args), "sizes": {}}
+        try:
+            with mock.patch.object(genai, "GenerativeModel", StubGenerativeModel):
+                for rows in args.sizes:
+                    current["sizes"][str(rows)] = bench_size(
+                        rows, workdir, cfg_path, cfg, args.repeat, args.seed
+                    )
+        finally:
+            if args.workdir is None:
+                shutil.rmtree(workdir, ignore_errors=True)
+        print_results(current)
+        if args.out:
+            args.out.parent.mkdir(parents=True, exist_ok=True)
+            args.out.write_text(json.dumps(current, indent=2), encoding="utf-8")
+            print(f"\nresults: {args.out}")
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline else None
+
+    if baseline is None:
+        return 0
+    rows = compare(current, baseline, thresholds, args.rss_threshold, args.min_delta_ms / 1000)
+    print_comparison(rows)
+    regressions = [r for r in rows if r[-1]]
+    print(f"\n{len(regressions)} regression(s) against baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Compare summary extraction modes: five sequential scans, concurrent cursors, fused scan.
+
+Usage:
+    python benchmarks/bench_summary.py --rows 1000000 10000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import duckdb
+from synthetic import create_raw_sales
+
+from retail_ai.data_engine.duckdb_service import DuckDBService
+from retail_ai.data_engine.ingest import materialize_sales
+from retail_ai.graphs.sql_queries import (
+    FUSED_SUMMARY_SQL,
+    SUMMARY_QUERIES,
+    split_fused_summary,
+)
+
+
+def run_sequential(svc: DuckDBService):
+    return {name: svc.query_df(sql) for name, sql in SUMMARY_QUERIES.items()}
+
+
+def run_concurrent(svc: DuckDBService):
+    def run(sql):
+        cur = svc.cursor()
+        try:
+            return cur.query_df(sql)
+        finally:
+            cur.close()
+
+    with ThreadPoolExecutor(max_workers=len(SUMMARY_QUERIES)) as pool:
+        futures = {name: pool.submit(run, sql) for name, sql in SUMMARY_QUERIES.items()}
+        return {name: f.result() for name, f in futures.items()}
+
+
+def run_fused(svc: DuckDBService):
+    return split_fused_summary(svc.query_df(FUSED_SUMMARY_SQL))
+
+
+def _timeit(fn, svc, repeat: int):
+    fn(svc)  # warm-up
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(svc)
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument(
+        "--on-disk", action="store_true", help="store the table in a DuckDB file (like data/cache)"
+    )
+    args = ap.parse_args(argv)
+
+    print(
+        f"{'rows':>12} {'sequential_s':>13} {'concurrent_s':>13} {'fused_s':>9} {'fused_speedup':>14}"
+    )
+    for rows in args.rows:
+        if args.on_disk:
+            tmpdir = tempfile.mkdtemp(prefix="bench_summary_")
+            svc = DuckDBService(conn=duckdb.connect(str(Path(tmpdir) / "sales.duckdb")))
+        else:
+            svc = DuckDBService.in_memory()
+        create_raw_sales(svc.conn, rows)
+        materialize_sales(svc.conn, "sales_raw")
+        svc.conn.execute("DROP TABLE sales_raw")
+
+        seq = _timeit(run_sequential, svc, args.repeat)
+        conc = _timeit(run_concurrent, svc, args.repeat)
+        fused = _timeit(run_fused, svc, args.repeat)
+        print(f"{rows:>12,} {seq:>13.3f} {conc:>13.3f} {fused:>9.3f} {seq / fused:>13.2f}x")
+        svc.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Synthetic sales data in the Amazon sale-report shape assumed by sql_builder."""
+
+from __future__ import annotations
+
+import duckdb
+
+STATUSES = [
+    "Shipped",
+    "Shipped - Delivered to Buyer",
+    "Shipped - Returned to Seller",
+    "Cancelled",
+    "Pending",
+]
+CATEGORIES = [
+    "Set",
+    "kurta",
+    "Western Dress",
+    "Top",
+    "Ethnic Dress",
+    "Blouse",
+    "Bottom",
+    "Saree",
+    "Dupatta",
+]
+STATES = [
+    "MAHARASHTRA",
+    "KARNATAKA",
+    "TAMIL NADU",
+    "TELANGANA",
+    "UTTAR PRADESH",
+    "DELHI",
+    "KERALA",
+    "WEST BENGAL",
+    "ANDHRA PRADESH",
+    "GUJARAT",
+    "HARYANA",
+    "RAJASTHAN",
+]
+CITIES = [
+    "MUMBAI",
+    "BENGALURU",
+    "CHENNAI",
+    "HYDERABAD",
+    "LUCKNOW",
+    "NEW DELHI",
+    "KOCHI",
+    "KOLKATA",
+    "PUNE",
+]
+SERVICE_LEVELS = ["Expedited", "Standard"]
+FULFILMENT = ["Amazon", "Merchant"]
+
+
+def _pick(values, seed_col: str, salt: int):
+    arr = "[" + ", ".join("'" + v.replace("'", "''") + "'" for v in values) + "]"
+    return f"{arr}[1 + CAST(hash({seed_col} + {salt}) % {len(values)} AS INTEGER)]"
+
+
+def synthetic_sales_sql(rows: int, seed: int = 42):
+    """SELECT producing ``rows`` deterministic rows (same seed, same data)."""
+    return f"""SELECT
+  '{seed}-' || CAST(i // 2 AS VARCHAR) AS "Order ID",
+  STRFTIME(DATE '2022-03-31' + CAST(hash(i + {seed}) % 91 AS INTEGER), '%m-%d-%y') AS Date,
+  {_pick(STATUSES, "i", seed + 1)} AS Status,
+  {_pick(FULFILMENT, "i", seed + 2)} AS Fulfilment,
+  {_pick(SERVICE_LEVELS, "i", seed + 3)} AS "ship-service-level",
+  {_pick(CATEGORIES, "i", seed + 4)} AS Category,
+  CAST(hash(i + {seed + 5}) % 3 AS BIGINT) AS Qty,
+  ROUND(199 + (hash(i + {seed + 6}) % 200000) / 100.0, 2) AS Amount,
+  {_pick(CITIES, "i", seed + 7)} AS "ship-city",
+  {_pick(STATES, "i", seed + 8)} AS "ship-state"
+FROM range({int(rows)}) t(i)"""
+
+
+def create_raw_sales(
+    conn: duckdb.DuckDBPyConnection, rows: int, table_name: str = "sales_raw", seed: int = 42
+):
+    conn.execute(f"CREATE OR REPLACE TABLE {table_name} AS {synthetic_sales_sql(rows, seed)}")
+    return table_name
+
+
+def write_csv(path: str, rows: int, seed: int = 42):
+    with duckdb.connect() as conn:
+        conn.execute(
+            f"COPY ({synthetic_sales_sql(rows, seed)}) TO '{path}' (HEADER, DELIMITER ',')"
+        )
+    return path
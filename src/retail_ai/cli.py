@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import pyarrow as pa
+from dotenv import load_dotenv
+
+from retail_ai.data_engine.data_loader import DataLoader
+from retail_ai.engine import RetailAssistantEngine
+from retail_ai.utils.config_loader import configure_logging
+from retail_ai.utils.helpers import arrow_to_df
+
+
+def _read_questions(path: Path):
+    """JSONL: one ``{"question": ...}`` (optionally with ``"id"``) or a bare JSON string per line."""
+    items = []
+    with path.open(encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            obj = json.loads(line)
+            if isinstance(obj, str):
+                obj = {"question": obj}
+            if not obj.get("question"):
+                raise ValueError(f"{path}:{n}: missing 'question'")
+            obj.setdefault("id", n)
+            items.append(obj)
+    return items
+
+
+def _result_record(item, res, max_rows: int):
+    rec = {"id": item["id"], "question": item["question"]}
+    if "error" in res:
+        rec["error"] = res["error"]
+        return rec
+    table = res.get("result_table")
+    rec.update(
+        {
+            "answer": res.get("answer", ""),
+            "sql": res.get("sql", ""),
+            "plan": res.get("plan"),
+            "warnings": res.get("warnings", []),
+            "rows": table.num_rows if isinstance(table, pa.Table) else 0,
+            "result": (
+                json.loads(
+                    arrow_to_df(table.slice(0, max_rows)).to_json(
+                        orient="records", date_format="iso"
+                    )
+                )
+                if isinstance(table, pa.Table)
+                else []
+            ),
+            "telemetry": res.get("telemetry", {}),
+        }
+    )
+    return rec
+
+
+def main(argv=None):
+    load_dotenv()
+    ap = argparse.ArgumentParser(description="Answer a batch of questions about a sales CSV.")
+    ap.add_argument("--csv", required=True, type=Path, help="Dataset CSV file")
+    ap.add_argument("--questions", required=True, type=Path, help="JSONL file of questions")
+    ap.add_argument("--out", type=Path, help="Write JSONL results here (default: stdout)")
+    ap.add_argument("--max-rows", type=int, default=50)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--cache-dir", type=Path, default=None)
+    ap.add_argument("--config", default="config/model_config.yaml")
+    ap.add_argument("--prompts", default="config/prompt_templates.yaml")
+    ap.add_argument("--trace-out", type=Path, help="Append the batch's trace spans here (JSONL)")
+    args = ap.parse_args(argv)
+    configure_logging()
+
+    items = _read_questions(args.questions)
+    dataset = DataLoader(input_dir=args.csv.parent, cache_dir=args.cache_dir).open(args.csv)
+    engine = RetailAssistantEngine(cfg_path=args.config, prompts_path=args.prompts)
+    results = engine.answer_many(
+        dataset, [it["question"] for it in items], max_rows=args.max_rows, max_workers=args.workers
+    )
+    if args.trace_out:
+        engine.tracer.export_jsonl(args.trace_out, engine.tracer.last_trace_id)
+
+    out = args.out.open("w", encoding="utf-8") if args.out else sys.stdout
+    try:
+        for item, res in zip(items, results):
+            out.write(json.dumps(_result_record(item, res, args.max_rows), default=str) + "\n")
+    finally:
+        if args.out:
+            out.close()
+
+    batch = next(
+        (r["telemetry"]["batch"] for r in results if "batch" in r.get("telemetry", {})), None
+    )
+    if batch:
+        print(
+            f"{batch['questions']} questions, {batch['unique_queries']} unique queries "
+            f"({batch['shared_results']} results shared)",
+            file=sys.stderr,
+        )
+    return 1 if any("error" in r for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import threading
+import weakref
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List
+
+import duckdb
+
+from retail_ai.data_engine.duckdb_service import DuckDBService
+
+# Every open pool, so a writer can release the read-only handles on a file (see release_database).
+_open_pools: "weakref.WeakSet[ConnectionPool]" = weakref.WeakSet()
+_registry_lock = threading.Lock()
+
+
+class PoolClosed(RuntimeError):
+    """The dataset's connection was released (e.g. re-ingested); open a new pool."""
+
+
+@dataclass(eq=False)
+class ConnectionPool:
+    """One DuckDB connection to a dataset, shared by every request, plus up to
+    ``size`` reusable cursors.
+
+    On-disk datasets are opened ``read_only``, so any number of sessions can
+    query them and DuckDB rejects writes. ``cursor()`` blocks while ``size``
+    cursors are in use (``TimeoutError`` after ``timeout_s``).
+    """
+
+    service: DuckDBService
+    size: int = 16
+    timeout_s: float = 30.0
+    _free: List[DuckDBService] = field(default_factory=list, init=False, repr=False)
+    _active: int = field(default=0, init=False, repr=False)
+    _closed: bool = field(default=False, init=False, repr=False)
+
+    def __post_init__(self):
+        self._slots = threading.BoundedSemaphore(max(1, int(self.size)))
+        self._idle = threading.Condition(threading.Lock())
+        with _registry_lock:
+            _open_pools.add(self)
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any], service: DuckDBService):
+        """Pool for ``service`` sized by the ``connections`` section of model_config.yaml."""
+        c = cfg.get("connections", {}) or {}
+        return cls(
+            service=service,
+            size=int(c.get("pool_size", 16)),
+            timeout_s=float(c.get("acquire_timeout_seconds", 30)),
+        )
+
+    @property
+    def closed(self):
+        return self._closed
+
+    @property
+    def path(self):
+        return self.service.path
+
+    def stats(self):
+        with self._idle:
+            return {
+                "size": self.size,
+                "active": self._active,
+                "idle": len(self._free),
+                "closed": self._closed,
+            }
+
+    def acquire(self):
+        """Check out a cursor (blocks while all ``size`` are in use); pair with ``release``."""
+        if not self._slots.acquire(timeout=self.timeout_s):
+            raise TimeoutError(f"All {self.size} dataset connections are busy; try again shortly")
+        try:
+            with self._idle:
+                if self._closed:
+                    raise PoolClosed("dataset connection was released")
+                cur = self._free.pop() if self._free else self.service.cursor()
+                self._active += 1
+                return cur
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, cur: DuckDBService):
+        with self._idle:
+            self._active -= 1
+            if self._closed:
+                cur.close()
+            else:
+                self._free.append(cur)
+            self._idle.notify_all()
+            if self._closed and not self._active:
+                self._close_service()
+        self._slots.release()
+
+    @contextmanager
+    def cursor(self):
+        """A cursor for one request, returned to the pool afterwards."""
+        cur = self.acquire()
+        try:
+            yield cur
+        finally:
+            self.release(cur)
+
+    def close(self, wait_s: float | None = 0):
+        """Stop handing out cursors; the connection is closed once in-flight
+        requests return (waiting up to ``wait_s`` for them, None = forever)."""
+        with self._idle:
+            if not self._closed:
+                self._closed = True
+                for cur in self._free:
+                    cur.close()
+                self._free.clear()
+            if wait_s != 0:
+                self._idle.wait_for(lambda: not self._active, timeout=wait_s)
+            if not self._active:
+                self._close_service()
+        with _registry_lock:
+            _open_pools.discard(self)
+
+    def _close_service(self):
+        try:
+            self.service.drop()
+            self.service.close()
+        except duckdb.Error:
+            pass  # already closed
+
+
+def release_database(path: str | Path, wait_s: float | None = 30.0):
+    """Close every pool on ``path`` so the file can be opened for writing.
+
+    DuckDB refuses a read-write connection to a file this process holds
+    read-only; the loader calls this before re-ingesting. Pools are closed
+    after their in-flight requests finish, and engines reopen them on demand.
+    """
+    target = Path(path).resolve()
+    with _registry_lock:
+        pools = [p for p in _open_pools if p.path is not None and Path(p.path).resolve() == target]
+    for pool in pools:
+        pool.close(wait_s=wait_s)
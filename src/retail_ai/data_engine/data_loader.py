@@ -1,31 +1,554 @@
 from __future__ import annotations
 
+import hashlib
+import logging
+import os
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from typing import Any, Callable, Dict, List
 
-import pandas as pd
+import duckdb
+
+from retail_ai.data_engine.connection_pool import release_database
+from retail_ai.data_engine.dataset import Dataset
+from retail_ai.data_engine.duckdb_service import DuckDBService
+from retail_ai.data_engine.ingest import (
+    append_sales,
+    materialize_sales,
+    new_enum_values,
+    new_source_columns,
+    source_select,
+    stage_csv_files,
+)
+from retail_ai.data_engine.schema_profile import SchemaProfile, merge_profiles, profile_table
+from retail_ai.utils.helpers import arrow_to_df
+from retail_ai.utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Bump when the cached table layout changes so stale caches are rebuilt.
+CACHE_VERSION = 8
+
+
+@dataclass(frozen=True)
+class SourceFingerprint:
+    """Identity of a source CSV: path, size, mtime and content hash."""
+
+    path: str
+    size: int
+    mtime_ns: int
+    sha256: str
+
+    @property
+    def key(self):
+        return self.sha256
+
+
+@dataclass(frozen=True)
+class IngestProgress:
+    """Per-file progress of ``DataLoader.ingest_all``."""
+
+    index: int
+    total: int
+    path: Path
+    rows: int  # rows ingested from this file in this call
+    cached: bool = False  # nothing new in the file
+
+
+@dataclass(frozen=True)
+class FileState:
+    """Manifest entry of a file in the combined table: ``offset`` bytes have been
+    ingested (``rows`` rows); ``probe`` hashes the head and tail of that prefix."""
+
+    fp: SourceFingerprint
+    rows: int
+    offset: int
+    probe: str
+
+
+def _probe(path: Path, offset: int, window: int = 1 << 16):
+    """Cheap check that the first ``offset`` bytes are unchanged (head + tail window)."""
+    h = hashlib.sha256(str(offset).encode("utf-8"))
+    with path.open("rb") as f:
+        h.update(f.read(min(window, offset)))
+        f.seek(max(0, offset - window))
+        h.update(f.read(offset - max(0, offset - window)))
+    return h.hexdigest()
+
+
+def _chain(digest: str, delta_digest: str):
+    return hashlib.sha256(f"{digest}:{delta_digest}".encode("utf-8")).hexdigest()
+
+
+def _hash_file(path: Path, chunk_size: int = 1 << 20):
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
 
 
 @dataclass
 class DataLoader:
-    """loads the datasets from a folder. Keeps Input Output concerns separate from UI."""
+    """loads the datasets from a folder. Keeps Input Output concerns separate from UI.
+
+    Each CSV is streamed once by DuckDB into an on-disk database under
+    ``cache_dir``. Later opens reuse the columnar copy and only re-ingest when the
+    source file's size/mtime changed *and* its content hash differs. ``open``
+    returns a lazy ``Dataset`` handle; ``load`` materializes a DataFrame.
+
+    ``ingest_all`` combines every CSV in ``input_dir`` into one table with DuckDB's
+    own CSV reader, under ``memory_limit`` and spilling to ``temp_directory``.
+    """
 
     input_dir: Path
+    cache_dir: Path | None = None
+    memory_limit: str | None = None
+    temp_directory: Path | None = None
+    threads: int | None = None
+
+    def __post_init__(self):
+        self.input_dir = Path(self.input_dir)
+        if self.cache_dir is None:
+            self.cache_dir = self.input_dir.parent / "cache"
+        self.cache_dir = Path(self.cache_dir)
+        if self.temp_directory is None:
+            self.temp_directory = self.cache_dir / "spill"
+        self.temp_directory = Path(self.temp_directory)
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any], input_dir: Path, cache_dir: Path | None = None):
+        """Build with the ``ingest`` section of model_config.yaml."""
+        c = cfg.get("ingest", {}) or {}
+        return cls(
+            input_dir=Path(input_dir),
+            cache_dir=cache_dir,
+            memory_limit=c.get("memory_limit"),
+            temp_directory=Path(c["temp_directory"]) if c.get("temp_directory") else None,
+            threads=int(c["threads"]) if c.get("threads") else None,
+        )
 
     def list_csv_files(self):
         if not self.input_dir.exists():
             return []
         return sorted(self.input_dir.glob("*.csv"))
 
-    def load(self, path: Path):
+    def cache_path(self, path: Path):
+        resolved = str(Path(path).resolve())
+        digest = hashlib.sha1(resolved.encode("utf-8")).hexdigest()[:12]
+        return self.cache_dir / f"{Path(path).stem}-{digest}.duckdb"
+
+    def _read_manifest(self, cache: Path):
+        """``(fingerprint, rows)`` recorded in the per-file cache, or None."""
+        if not cache.exists():
+            return None
         try:
-            df = pd.read_csv(path, low_memory=False)
-        except UnicodeDecodeError:
-            df = pd.read_csv(path, low_memory=False, encoding="latin1")
-
-        # Standard numeric coercions
-        for col in ["Amount", "Qty"]:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors="coerce")
+            # read_only, like the engine's pools: DuckDB refuses a connection with a
+            # different config to a file this process already has open.
+            with duckdb.connect(str(cache), read_only=True) as conn:
+                row = conn.execute(
+                    "SELECT path, size, mtime_ns, sha256, version, rows FROM _ingest_manifest"
+                ).fetchone()
+        except duckdb.Error:
+            return None
+        if row is None or int(row[4]) != CACHE_VERSION:
+            return None
+        return SourceFingerprint(
+            path=row[0], size=int(row[1]), mtime_ns=int(row[2]), sha256=row[3]
+        ), int(row[5])
+
+    def _write_manifest(self, conn: duckdb.DuckDBPyConnection, fp: SourceFingerprint, rows: int):
+        conn.execute(
+            "CREATE OR REPLACE TABLE _ingest_manifest "
+            "(path VARCHAR, size BIGINT, mtime_ns BIGINT, sha256 VARCHAR, version INTEGER, rows BIGINT)"
+        )
+        conn.execute(
+            "INSERT INTO _ingest_manifest VALUES (?, ?, ?, ?, ?, ?)",
+            [fp.path, fp.size, fp.mtime_ns, fp.sha256, CACHE_VERSION, rows],
+        )
+
+    def fingerprint(self, path: Path):
+        """Return the fingerprint of ``path``, reusing the cached hash when size/mtime match."""
+        path = Path(path)
+        manifest = self._read_manifest(self.cache_path(path))
+        return self._fingerprint(path, manifest[0] if manifest is not None else None)
+
+    def _fingerprint(self, path: Path, cached: SourceFingerprint | None):
+        st = path.stat()
+        if cached and cached.size == st.st_size and cached.mtime_ns == st.st_mtime_ns:
+            return cached
+        return SourceFingerprint(
+            path=str(path.resolve()),
+            size=st.st_size,
+            mtime_ns=st.st_mtime_ns,
+            sha256=_hash_file(path),
+        )
+
+    def _ingest(self, path: Path):
+        """Make sure the cache of ``path`` is current; returns (cache_path, fingerprint, rows)."""
+        path = Path(path)
+        cache = self.cache_path(path)
+        cached, rows = self._read_manifest(cache) or (None, 0)
+        fp = self._fingerprint(path, cached)
+
+        if cached is not None and cached.sha256 == fp.sha256:
+            if (cached.size, cached.mtime_ns) != (fp.size, fp.mtime_ns):
+                # Touched but unchanged content: refresh the stat part of the key only.
+                release_database(cache)
+                with duckdb.connect(str(cache)) as conn:
+                    self._write_manifest(conn, fp, rows)
+            return cache, fp, rows
+
+        # Streamed by DuckDB (never through pandas) and swapped in one transaction,
+        # in place, after the engine's read-only handles on the file are released.
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        release_database(cache)
+        with span("data.ingest_csv", file=path.name, bytes=fp.size) as s, duckdb.connect(
+            str(cache)
+        ) as conn:
+            self._configure(conn)
+            try:
+                (rows,) = stage_csv_files(conn, [path], "_staging_sales")
+                conn.execute("BEGIN TRANSACTION")
+                try:
+                    materialize_sales(conn, "_staging_sales")
+                    self._write_manifest(conn, fp, rows)
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+            finally:
+                conn.execute("DROP TABLE IF EXISTS _staging_sales")
+            self._store_profile(conn, fp.key)
+            conn.execute("CHECKPOINT")
+            s.set(rows=rows)
+        return cache, fp, rows
+
+    def ingest(self, path: Path):
+        """Ensure the columnar cache for ``path`` is current; returns (cache_path, fingerprint)."""
+        cache, fp, _ = self._ingest(path)
+        return cache, fp
+
+    def open(self, path: Path):
+        """Lazy ``Dataset`` for one CSV: ingested if needed, no rows loaded."""
+        with span("data.open", file=Path(path).name) as s:
+            cache, fp, rows = self._ingest(path)
+            s.set(rows=rows)
+            return Dataset(cache_path=cache, fingerprint=fp.key, files=(fp.path,), row_count=rows)
+
+    def load_table(self, path: Path):
+        """Whole CSV as an Arrow table (prefer ``open`` for anything large)."""
+        cache, _ = self.ingest(path)
+        return self._read_table(cache, path)
+
+    def load(self, path: Path):
+        """Whole CSV as a DataFrame, converted from ``load_table``'s Arrow result."""
+        cache, fp = self.ingest(path)
+        df = arrow_to_df(self._read_table(cache, path))
+        df.attrs["fingerprint"] = fp.key
+        df.attrs["cache_path"] = str(cache)
         return df
+
+    def _read_table(self, cache: Path, path: Path):
+        with span("data.load", file=Path(path).name) as s:
+            with duckdb.connect(str(cache), read_only=True) as conn:
+                table = conn.execute(f"SELECT {source_select(conn)} FROM sales").to_arrow_table()
+            s.set(rows=table.num_rows)
+            return table
+
+    def combined_cache_path(self):
+        digest = hashlib.sha1(str(self.input_dir.resolve()).encode("utf-8")).hexdigest()[:12]
+        return self.cache_dir / f"combined-{digest}.duckdb"
+
+    def _store_profile(self, conn: duckdb.DuckDBPyConnection, fingerprint: str):
+        """Profile the fresh table while the database is writable (engines open it read-only).
+
+        A no-op when the profile of ``fingerprint`` is already stored (merged by ``_append``).
+        """
+        DuckDBService(conn=conn, fingerprint=fingerprint, owns_table=False).schema_profile()
+
+    def _configure(self, conn: duckdb.DuckDBPyConnection):
+        self.temp_directory.mkdir(parents=True, exist_ok=True)
+        conn.execute(f"SET temp_directory = '{self.temp_directory.as_posix()}'")
+        if self.memory_limit:
+            conn.execute(f"SET memory_limit = '{self.memory_limit}'")
+        if self.threads:
+            conn.execute(f"SET threads = {int(self.threads)}")
+
+    def _read_files_manifest(self, conn: duckdb.DuckDBPyConnection):
+        try:
+            rows = conn.execute(
+                "SELECT path, size, mtime_ns, sha256, rows, byte_offset, probe, version FROM _ingest_files"
+            ).fetchall()
+        except (duckdb.CatalogException, duckdb.BinderException):
+            return {}
+        return {
+            r[0]: FileState(
+                fp=SourceFingerprint(path=r[0], size=int(r[1]), mtime_ns=int(r[2]), sha256=r[3]),
+                rows=int(r[4]),
+                offset=int(r[5]),
+                probe=r[6],
+            )
+            for r in rows
+            if int(r[7]) == CACHE_VERSION
+        }
+
+    def _write_files_manifest(self, conn: duckdb.DuckDBPyConnection, states: List[FileState]):
+        conn.execute(
+            "CREATE OR REPLACE TABLE _ingest_files (path VARCHAR, size BIGINT, mtime_ns BIGINT, "
+            "sha256 VARCHAR, rows BIGINT, byte_offset BIGINT, probe VARCHAR, version INTEGER)"
+        )
+        conn.executemany(
+            "INSERT INTO _ingest_files VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                [
+                    s.fp.path,
+                    s.fp.size,
+                    s.fp.mtime_ns,
+                    s.fp.sha256,
+                    s.rows,
+                    s.offset,
+                    s.probe,
+                    CACHE_VERSION,
+                ]
+                for s in states
+            ],
+        )
+
+    def _plan_append(self, files: List[Path], manifest: Dict[str, FileState]):
+        """Per file ``(path, previous state, offset to read from)`` for an append-only
+        refresh; offset None means unchanged. Returns None when a rebuild is needed
+        (a file was removed, shrank or was rewritten)."""
+        if set(manifest) - {str(f.resolve()) for f in files}:
+            return None
+        plan = []
+        for f in files:
+            prev = manifest.get(str(f.resolve()))
+            st = f.stat()
+            if prev is None:
+                plan.append((f, None, 0))
+            elif (st.st_size, st.st_mtime_ns) == (prev.fp.size, prev.fp.mtime_ns):
+                plan.append((f, prev, None))
+            elif st.st_size >= prev.offset and _probe(f, prev.offset) == prev.probe:
+                plan.append((f, prev, prev.offset))
+            else:
+                return None
+        return plan
+
+    def _current_states(self, cache: Path, files: List[Path]):
+        """Manifest states if ``cache`` already holds exactly ``files`` (checked read-only), else None."""
+        if not cache.exists():
+            return None
+        try:
+            with duckdb.connect(str(cache), read_only=True) as conn:
+                manifest = self._read_files_manifest(conn)
+        except duckdb.Error:
+            return None
+        plan = self._plan_append(files, manifest) if manifest else None
+        if plan is None or any(offset is not None for _, _, offset in plan):
+            return None
+        return [prev for _, prev, _ in plan]
+
+    def _rebuild_all(self, conn: duckdb.DuckDBPyConnection, files: List[Path], progress):
+        fps = [self._fingerprint(f, None) for f in files]
+
+        def on_file(i: int, path: Path, rows: int):
+            if progress is not None:
+                progress(IngestProgress(i, len(files), path, rows))
+
+        conn.execute("SET preserve_insertion_order = false")
+        try:
+            counts = stage_csv_files(conn, files, "_staging_sales", on_file=on_file)
+            states = [
+                FileState(fp=fp, rows=n, offset=fp.size, probe=_probe(Path(fp.path), fp.size))
+                for fp, n in zip(fps, counts)
+            ]
+            conn.execute("BEGIN TRANSACTION")
+            try:
+                materialize_sales(conn, "_staging_sales")
+                self._write_files_manifest(conn, states)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.execute("DROP TABLE IF EXISTS _staging_sales")
+            conn.execute("RESET preserve_insertion_order")
+        return states
+
+    def _append(self, conn: duckdb.DuckDBPyConnection, plan, progress):
+        """Stage only new files and the new complete lines of grown files, then append
+        them to ``sales``. Returns the new states, or None if the new rows bring
+        columns the table does not have or values its ENUM columns lack (caller
+        rebuilds)."""
+        states: List[FileState | None] = []
+        staged: List[tuple] = []  # (plan index, csv to stage, new offset, delta digest)
+        tmp_files: List[Path] = []
+        try:
+            for i, (path, prev, offset) in enumerate(plan):
+                st = path.stat()
+                if offset is None:
+                    states.append(prev)
+                elif prev is None:
+                    fp = self._fingerprint(path, None)
+                    staged.append((i, path, fp.size, fp.sha256))
+                    states.append(None)
+                else:
+                    delta = self._write_delta(path, offset, st.st_size)
+                    if delta is None:  # no complete new line yet
+                        fp = SourceFingerprint(
+                            prev.fp.path, st.st_size, st.st_mtime_ns, prev.fp.sha256
+                        )
+                        states.append(
+                            FileState(fp=fp, rows=prev.rows, offset=prev.offset, probe=prev.probe)
+                        )
+                    else:
+                        tmp, new_offset, digest = delta
+                        tmp_files.append(tmp)
+                        staged.append((i, tmp, new_offset, digest))
+                        states.append(None)
+
+            if staged:
+                counts = stage_csv_files(conn, [csv for _, csv, _, _ in staged], "_staging_sales")
+                if new_source_columns(conn, "_staging_sales"):
+                    logger.info("New rows bring new columns; rebuilding the combined table")
+                    return None
+                widened = new_enum_values(conn, "_staging_sales")
+                if widened:
+                    logger.info(
+                        "New rows bring new %s values; rebuilding the combined table",
+                        ", ".join(widened),
+                    )
+                    return None
+                for (i, _, new_offset, digest), n in zip(staged, counts):
+                    path, prev = plan[i][0], plan[i][1]
+                    st = path.stat()
+                    sha = digest if prev is None else _chain(prev.fp.sha256, digest)
+                    fp = SourceFingerprint(str(path.resolve()), st.st_size, st.st_mtime_ns, sha)
+                    rows = n + (prev.rows if prev is not None else 0)
+                    states[i] = FileState(
+                        fp=fp, rows=rows, offset=new_offset, probe=_probe(path, new_offset)
+                    )
+                # Merge the new rows' profile into the stored one instead of profiling the whole table.
+                previous_fp = self._combined_fingerprint(
+                    [prev for _, prev, _ in plan if prev is not None]
+                )
+                previous = DuckDBService(
+                    conn=conn, fingerprint=previous_fp, owns_table=False
+                ).stored_profile()
+                delta: List[SchemaProfile] = []
+
+                def on_delta(table: str):
+                    if previous is not None:
+                        delta.append(profile_table(conn, table))
+
+                conn.execute("BEGIN TRANSACTION")
+                try:
+                    append_sales(conn, "_staging_sales", on_delta=on_delta)
+                    self._write_files_manifest(conn, states)
+                    if previous is not None:
+                        merged = merge_profiles(previous, delta[0])
+                        svc = DuckDBService(
+                            conn=conn,
+                            fingerprint=self._combined_fingerprint(states),
+                            owns_table=False,
+                        )
+                        svc.store_profile(merged)
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+            elif any(s != p for s, (_, p, _) in zip(states, plan)):
+                self._write_files_manifest(conn, states)
+        finally:
+            conn.execute("DROP TABLE IF EXISTS _staging_sales")
+            for tmp in tmp_files:
+                tmp.unlink(missing_ok=True)
+
+        if progress is not None:
+            appended = {i: n for (i, _, _, _), n in zip(staged, counts)} if staged else {}
+            for i, (path, _, _) in enumerate(plan):
+                rows = appended.get(i, 0)
+                progress(IngestProgress(i, len(plan), path, rows, cached=i not in appended))
+        return states
+
+    def _write_delta(self, path: Path, offset: int, size: int):
+        """Copy the header plus bytes ``[offset, last newline before size)`` of ``path``
+        to a temp CSV; returns ``(tmp, new_offset, sha256 of the bytes)`` or None."""
+        with path.open("rb") as f:
+            header = f.readline()
+            f.seek(offset)
+            data = f.read(size - offset)
+        end = data.rfind(b"\n")
+        if end < 0:
+            return None
+        data = data[: end + 1]
+        self.temp_directory.mkdir(parents=True, exist_ok=True)
+        tmp = (
+            self.temp_directory
+            / f"delta-{hashlib.sha1(str(path).encode('utf-8')).hexdigest()[:12]}-{os.getpid()}.csv"
+        )
+        with tmp.open("wb") as out:
+            out.write(header if header.endswith(b"\n") else header + b"\n")
+            out.write(data)
+        return tmp, offset + len(data), hashlib.sha256(data).hexdigest()
+
+    def ingest_all(self, progress: Callable[[IngestProgress], None] | None = None):
+        """Ingest every ``*.csv`` in ``input_dir`` into one ``sales`` table; returns a Dataset.
+
+        Files are streamed by DuckDB (never loaded into pandas), so the inputs may
+        be larger than RAM. Files with a different column order or missing columns
+        are aligned by name.
+
+        Input files are treated as append-only: the manifest keeps each file's
+        consumed byte offset, so new files and rows appended to known files are
+        added incrementally (``append_sales``), including the rollup cube. A file
+        that was removed, shrank or rewritten triggers a full rebuild, as do new
+        rows with new columns or new values of an ENUM column. An unchanged
+        folder is detected with a read-only connection, so it does not disturb
+        engines querying the table.
+        """
+        files = self.list_csv_files()
+        if not files:
+            raise FileNotFoundError(f"No CSV files found in {self.input_dir}")
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        cache = self.combined_cache_path()
+
+        with span("data.ingest_all", files=len(files)) as s:
+            states = self._current_states(cache, files)
+            if states is not None:
+                s.set(mode="cached")
+                if progress is not None:
+                    for i, f in enumerate(files):
+                        progress(IngestProgress(i, len(files), f, 0, cached=True))
+            else:
+                release_database(cache)
+                with duckdb.connect(str(cache)) as conn:
+                    self._configure(conn)
+                    has_table = bool(
+                        conn.execute(
+                            "SELECT COUNT(*) FROM duckdb_tables() WHERE table_name = 'sales'"
+                        ).fetchone()[0]
+                    )
+                    manifest = self._read_files_manifest(conn) if has_table else {}
+                    plan = self._plan_append(files, manifest) if manifest else None
+                    states = self._append(conn, plan, progress) if plan is not None else None
+                    s.set(mode="append" if states is not None else "rebuild")
+                    if states is None:
+                        states = self._rebuild_all(conn, files, progress)
+                    self._store_profile(conn, self._combined_fingerprint(states))
+                    conn.execute("CHECKPOINT")
+            s.set(rows=int(sum(st.rows for st in states)))
+
+        return Dataset(
+            cache_path=cache,
+            fingerprint=self._combined_fingerprint(states),
+            files=tuple(st.fp.path for st in states),
+            row_count=int(sum(st.rows for st in states)),
+        )
+
+    def _combined_fingerprint(self, states: List[FileState]):
+        digest = hashlib.sha256(f"combined-v{CACHE_VERSION}".encode("utf-8"))
+        for st in states:
+            digest.update(f"\n{Path(st.fp.path).name}:{st.fp.sha256}".encode("utf-8"))
+        return digest.hexdigest()
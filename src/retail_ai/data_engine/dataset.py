@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+from typing import List, Tuple
+
+import duckdb
+
+from retail_ai.data_engine.duckdb_service import DuckDBService
+from retail_ai.data_engine.ingest import source_columns
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """Handle to a ``sales`` table persisted in an on-disk DuckDB database.
+
+    Returned by ``DataLoader.open()`` and ``DataLoader.ingest_all()``; the engine
+    queries the database directly, so the rows never have to fit in a pandas
+    DataFrame. Row count comes from the ingest manifest and columns, preview and
+    schema from small queries, so showing a dataset costs the same at any size.
+    """
+
+    cache_path: Path
+    fingerprint: str
+    files: Tuple[str, ...] = ()
+    row_count: int = 0
+    table_name: str = "sales"
+
+    def connect(self):
+        return duckdb.connect(str(self.cache_path), read_only=True)
+
+    def __len__(self):
+        return self.row_count
+
+    @cached_property
+    def dtypes(self):
+        """``{column: DuckDB type}`` in the original CSV shape (derived columns excluded)."""
+        with self.connect() as conn:
+            return dict(source_columns(conn, self.table_name))
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.dtypes)
+
+    @property
+    def shape(self):
+        return self.row_count, len(self.dtypes)
+
+    def preview(self, n: int = 50):
+        """First ``n`` rows as an Arrow table (``st.dataframe`` renders it without pandas)."""
+        cols = ", ".join(f'"{c}"' for c in self.columns)
+        with self.connect() as conn:
+            return conn.execute(
+                f"SELECT {cols} FROM {self.table_name} LIMIT {int(n)}"
+            ).to_arrow_table()
+
+    def schema_profile(self):
+        """SchemaProfile of the table (stored in the database after the first call)."""
+        svc = DuckDBService.attach(self.cache_path, self.table_name, fingerprint=self.fingerprint)
+        try:
+            return svc.schema_profile()
+        finally:
+            svc.close()
@@ -1,26 +1,269 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict
 
 import duckdb
 import pandas as pd
+import pyarrow as pa
+
+from retail_ai.data_engine.ingest import materialize_sales
+from retail_ai.data_engine.query_limits import QueryInterrupted, QueryLimits, QueryTimeout
+from retail_ai.data_engine.result_cache import ResultCache
+from retail_ai.data_engine.rollup import RollupInfo, load_rollup
+from retail_ai.data_engine.schema_profile import SchemaProfile, profile_table
+from retail_ai.utils.helpers import arrow_to_df
+from retail_ai.utils.tracing import profiling_queries, span
 
 
 @dataclass
 class DuckDBService:
-    """Encapsulates the DuckDB connection + data registration."""
+    """Encapsulates the DuckDB connection + data registration.
+
+    A service is scoped to one dataset (identified by ``fingerprint``). Requests
+    should work on ``cursor()`` handles, which share the registered table without
+    copying it.
+    """
 
     conn: duckdb.DuckDBPyConnection
     table_name: str = "sales"
+    fingerprint: str | None = None
+    rollup: RollupInfo | None = None
+    # Per-dataset memo shared (by reference) with every cursor.
+    meta: Dict[str, Any] = field(default_factory=dict)
+    meta_lock: Any = field(default_factory=threading.Lock, repr=False)
+    # False when the table belongs to an on-disk ingest database (never dropped here).
+    owns_table: bool = True
+    path: Path | None = None
+    # Shared by every service of an engine; see query_arrow.
+    result_cache: ResultCache | None = None
+    # Connection settings (applied when opened) and the per-query timeout.
+    limits: QueryLimits | None = None
 
     @classmethod
-    def in_memory(cls, table_name: str = "sales"):
+    def in_memory(
+        cls,
+        table_name: str = "sales",
+        fingerprint: str | None = None,
+        limits: QueryLimits | None = None,
+    ):
         conn = duckdb.connect(database=":memory:")
-        return cls(conn=conn, table_name=table_name)
+        if limits is not None:
+            limits.apply(conn)
+        return cls(conn=conn, table_name=table_name, fingerprint=fingerprint, limits=limits)
+
+    @classmethod
+    def attach(
+        cls,
+        path: str | Path,
+        table_name: str = "sales",
+        fingerprint: str | None = None,
+        read_only: bool = True,
+        limits: QueryLimits | None = None,
+    ):
+        """Query an ingested on-disk database in place (see DataLoader.ingest_all).
+
+        Read-only by default: the loader is the only writer (see connection_pool.release_database).
+        """
+        conn = duckdb.connect(str(path), read_only=read_only)
+        if limits is not None:
+            limits.apply(conn)
+        return cls(
+            conn=conn,
+            table_name=table_name,
+            fingerprint=fingerprint,
+            rollup=load_rollup(conn, table_name),
+            owns_table=False,
+            path=Path(path),
+            limits=limits,
+        )
+
+    def register_sales(self, df: pd.DataFrame | pa.Table):
+        """Materialize ``df`` (a DataFrame or Arrow table, scanned in place) as the
+        sales table, with typed columns derived at ingest."""
+        with span("duckdb.register_sales", rows=len(df), columns=len(df.columns)) as s:
+            self.conn.register("sales_df", df)
+            try:
+                self.rollup = materialize_sales(self.conn, "sales_df", self.table_name)
+                self.meta.clear()
+                self._invalidate_results()
+            finally:
+                self.conn.unregister("sales_df")
+            s.set(rollup=self.rollup is not None)
+
+    def cursor(self):
+        """Cheap per-request handle onto the same database (no data copy)."""
+        return DuckDBService(
+            conn=self.conn.cursor(),
+            table_name=self.table_name,
+            fingerprint=self.fingerprint,
+            rollup=self.rollup,
+            meta=self.meta,
+            meta_lock=self.meta_lock,
+            owns_table=self.owns_table,
+            path=self.path,
+            result_cache=self.result_cache,
+            limits=self.limits,
+        )
+
+    def drop(self):
+        self._invalidate_results()
+        if not self.owns_table:
+            return
+        self.conn.execute(f"DROP TABLE IF EXISTS {self.table_name}_rollup")
+        self.conn.execute(f"DROP TABLE IF EXISTS {self.table_name}")
+        self.rollup = None
+        self.meta.clear()
+
+    def close(self):
+        self.conn.close()
+
+    def interrupt(self):
+        """Cancel the query running on this handle (it raises QueryInterrupted); harmless when idle."""
+        self.conn.interrupt()
+
+    def date_bounds(self):
+        """(min, max) of the typed order_date column, computed once per dataset."""
+        if "date_bounds" not in self.meta:
+            source = self.rollup.table_name if self.rollup is not None else self.table_name
+            row = self.conn.execute(
+                f"SELECT MIN(order_date), MAX(order_date) FROM {source}"
+            ).fetchone()
+            self.meta["date_bounds"] = (row[0], row[1])
+        return self.meta["date_bounds"]
+
+    def schema_profile(self):
+        """SchemaProfile of the dataset, computed once per fingerprint.
+
+        For on-disk datasets it is also stored in the database (``_schema_profile``)
+        so a restarted process does not re-profile an unchanged dataset.
+        """
+        with self.meta_lock:  # concurrent cursors would profile (and store) it twice
+            if "schema_profile" not in self.meta:
+                profile = self.stored_profile() if not self.owns_table else None
+                if profile is None:
+                    profile = profile_table(self.conn, self.table_name)
+                    if not self.owns_table:
+                        self.store_profile(profile)
+                self.meta["schema_profile"] = profile
+            return self.meta["schema_profile"]
+
+    def stored_profile(self):
+        """The profile stored in the database for this fingerprint, or None."""
+        try:
+            row = self.conn.execute(
+                "SELECT profile FROM _schema_profile WHERE fingerprint = ?", [self.fingerprint]
+            ).fetchone()
+        except duckdb.CatalogException:
+            return None
+        return SchemaProfile.from_json(row[0]) if row else None
+
+    def store_profile(self, profile: SchemaProfile):
+        """Store ``profile`` as the database's profile of this fingerprint."""
+        try:
+            self.conn.execute(
+                "CREATE OR REPLACE TABLE _schema_profile (fingerprint VARCHAR, profile VARCHAR)"
+            )
+            self.conn.execute(
+                "INSERT INTO _schema_profile VALUES (?, ?)", [self.fingerprint, profile.to_json()]
+            )
+        except duckdb.Error:
+            # Read-only connection (the loader stores it at ingest) or a concurrent
+            # writer; the in-memory memo is enough.
+            pass
+
+    def _invalidate_results(self):
+        if self.result_cache is not None and self.fingerprint is not None:
+            self.result_cache.invalidate(self.fingerprint)
+
+    def _fetch(self, sql: str):
+        """Execute ``sql`` and fetch it as an Arrow table, interrupted past ``limits.query_timeout_seconds``."""
+        timeout = self.limits.query_timeout_seconds if self.limits is not None else None
+        if not timeout:
+            try:
+                return self.conn.execute(sql).to_arrow_table()
+            except duckdb.InterruptException as e:
+                raise QueryInterrupted("Query was cancelled.") from e
+        timed_out = threading.Event()
+
+        def expire():
+            timed_out.set()  # before interrupting, so the except below sees it
+            self.conn.interrupt()
+
+        timer = threading.Timer(timeout, expire)
+        timer.daemon = True
+        timer.start()
+        try:
+            return self.conn.execute(sql).to_arrow_table()
+        except duckdb.InterruptException as e:
+            if timed_out.is_set():
+                raise QueryTimeout(
+                    f"Query exceeded the {timeout:g}s time limit and was cancelled."
+                ) from e
+            raise QueryInterrupted("Query was cancelled.") from e
+        finally:
+            timer.cancel()
+            timer.join()  # a late interrupt must not hit this cursor's next query
+
+    def query_arrow(self, sql: str, max_rows: int | None = None):
+        """Run ``sql`` and return its result as an Arrow table (no pandas conversion).
+
+        Results are cached per (fingerprint, normalized SQL) when the service has
+        a ``result_cache`` (never while profiling); a hit returns the cached table
+        itself. ``max_rows`` caps the result inside DuckDB (span attribute
+        ``truncated`` when rows were cut). Queries are interrupted after
+        ``limits.query_timeout_seconds`` (QueryTimeout).
+        """
+        if max_rows is not None:
+            sql_run = f"SELECT * FROM (\n{sql}\n) AS capped\nLIMIT {int(max_rows) + 1}"
+        else:
+            sql_run = sql
+        with span("duckdb.query", sql=sql) as s:
+            key = None
+            table = None
+            if (
+                self.result_cache is not None
+                and self.fingerprint is not None
+                and not profiling_queries()
+            ):
+                key = self.result_cache.key(self.fingerprint, sql_run)
+                table = self.result_cache.get(key)
+                s.set(cache_hit=table is not None)
+            if table is None and not profiling_queries():
+                table = self._fetch(sql_run)
+                if key is not None:
+                    self.result_cache.put(key, table)
+            elif table is None:
+                # Same operator tree/timings as EXPLAIN ANALYZE, without running the query twice.
+                self.conn.execute("PRAGMA enable_profiling='no_output'")
+                try:
+                    table = self._fetch(sql_run)
+                    s.set(profile=self.conn.get_profiling_information(format="query_tree"))
+                finally:
+                    self.conn.execute("PRAGMA disable_profiling")
+            if max_rows is not None and table.num_rows > max_rows:
+                table = table.slice(0, int(max_rows))
+                s.set(truncated=True)
+            s.set(rows=table.num_rows, columns=table.num_columns)
+            return table
 
-    def register_sales(self, df: pd.DataFrame):
-        self.conn.register("sales_df", df)
-        self.conn.execute(f"CREATE OR REPLACE TABLE {self.table_name} AS SELECT * FROM sales_df")
+    def query_df(self, sql: str, max_rows: int | None = None):
+        """``query_arrow`` converted to a (new) DataFrame."""
+        return arrow_to_df(self.query_arrow(sql, max_rows=max_rows))
 
-    def query_df(self, sql: str):
-        return self.conn.execute(sql).fetchdf()
+    def query_frames(self, sql: str, **frames: pd.DataFrame | pa.Table):
+        """Run ``sql`` over DataFrames / Arrow tables registered under the given names
+        for this query only (e.g. a chat session's previous result); never cached.
+        Returns an Arrow table."""
+        with span("duckdb.query", sql=sql, source="frames") as s:
+            for name, frame in frames.items():
+                self.conn.register(name, frame)
+            try:
+                table = self._fetch(sql)
+            finally:
+                for name in frames:
+                    self.conn.unregister(name)
+            s.set(rows=table.num_rows, columns=table.num_columns)
+            return table
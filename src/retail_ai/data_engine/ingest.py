@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import duckdb
+
+from retail_ai.data_engine.rollup import build_rollup, refresh_rollup
+
+# Low-cardinality dimensions stored as DuckDB ENUMs (dictionary-encoded). An ENUM
+# cannot gain values in place, so appended rows with a new value are added by a
+# rebuild (see new_enum_values), and a column that brings new values with most
+# appends, like ship-city, stays VARCHAR.
+ENUM_COLUMNS = ["Category", "ship-state", "ship-service-level"]
+
+# Typed columns derived once at ingest so queries never re-parse strings per row.
+DERIVED_COLUMNS = ["order_date", "is_shipped", "is_cancelled"]
+
+# Measures coerced to numbers (non-numeric values become NULL, like pd.to_numeric(errors="coerce")).
+NUMERIC_COLUMNS = ["Amount", "Qty"]
+
+# Read as text regardless of what the CSV sniffer guesses, so every file parses the same way.
+TEXT_COLUMNS = ["Date"]
+
+_NUMERIC_TYPES = (
+    "TINYINT",
+    "SMALLINT",
+    "INTEGER",
+    "BIGINT",
+    "HUGEINT",
+    "FLOAT",
+    "DOUBLE",
+    "DECIMAL",
+)
+
+
+def _enum_type_name(table_name: str, col: str):
+    return re.sub(r"[^0-9a-zA-Z_]", "_", f"{table_name}_{col}_enum").lower()
+
+
+def _source_columns(conn: duckdb.DuckDBPyConnection, source: str):
+    rows = conn.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()
+    return [(r[0], str(r[1]).upper()) for r in rows]
+
+
+def _derived_parts(cols: Dict[str, str]):
+    parts: List[str] = []
+    if "Date" in cols:
+        if cols["Date"].startswith("DATE") or cols["Date"].startswith("TIMESTAMP"):
+            parts.append("CAST(Date AS DATE) AS order_date")
+        else:
+            parts.append(
+                "CAST(TRY_STRPTIME(CAST(Date AS VARCHAR), '%m-%d-%y') AS DATE) AS order_date"
+            )
+    if "Status" in cols:
+        parts.append("COALESCE(CAST(Status AS VARCHAR) LIKE 'Shipped%', false) AS is_shipped")
+        parts.append(
+            "COALESCE(lower(CAST(Status AS VARCHAR)) LIKE '%cancelled%', false) AS is_cancelled"
+        )
+    return parts
+
+
+def materialize_sales(conn: duckdb.DuckDBPyConnection, source: str, table_name: str = "sales"):
+    """Create ``table_name`` from the ``source`` relation with typed analytic columns.
+
+    Adds a parsed ``order_date`` DATE, boolean ``is_shipped``/``is_cancelled`` flags
+    and converts the dimensions in ENUM_COLUMNS to ENUM types. Original columns keep
+    their names so plans and schema metadata are unaffected. The rollup cube
+    (see data_engine.rollup) is rebuilt from the new table.
+    """
+    cols = [(c, t) for c, t in _source_columns(conn, source) if c not in DERIVED_COLUMNS]
+
+    conn.execute(f"DROP TABLE IF EXISTS {table_name}_rollup")
+    conn.execute(f"DROP TABLE IF EXISTS {table_name}")
+
+    select_parts: List[str] = []
+    for col, dtype in cols:
+        if col in ENUM_COLUMNS:
+            type_name = _enum_type_name(table_name, col)
+            conn.execute(f"DROP TYPE IF EXISTS {type_name}")
+            conn.execute(
+                f"CREATE TYPE {type_name} AS ENUM ("
+                f'SELECT DISTINCT CAST("{col}" AS VARCHAR) FROM {source} WHERE "{col}" IS NOT NULL ORDER BY 1)'
+            )
+            select_parts.append(f'CAST(CAST("{col}" AS VARCHAR) AS {type_name}) AS "{col}"')
+        elif col in NUMERIC_COLUMNS and not dtype.startswith(_NUMERIC_TYPES):
+            select_parts.append(f'TRY_CAST("{col}" AS DOUBLE) AS "{col}"')
+        else:
+            select_parts.append(f'"{col}"')
+    select_parts.extend(_derived_parts(dict(cols)))
+
+    conn.execute(f"CREATE TABLE {table_name} AS SELECT {', '.join(select_parts)} FROM {source}")
+    return build_rollup(conn, table_name)
+
+
+def new_source_columns(conn: duckdb.DuckDBPyConnection, source: str, table_name: str = "sales"):
+    """Columns of ``source`` that ``table_name`` does not have (appending them needs a rebuild)."""
+    existing = {c for c, _ in _source_columns(conn, table_name)}
+    return [
+        c
+        for c, _ in _source_columns(conn, source)
+        if c not in DERIVED_COLUMNS and c not in existing
+    ]
+
+
+def new_enum_values(conn: duckdb.DuckDBPyConnection, source: str, table_name: str = "sales"):
+    """ENUM columns of ``table_name`` for which ``source`` has values the type lacks.
+
+    An ENUM cannot gain values in place; widening it would rewrite the column in
+    ``table_name`` and its rollup cube, so such rows are added by a rebuild.
+    """
+    target = dict(_source_columns(conn, table_name))
+    source_cols = {c for c, _ in _source_columns(conn, source)}
+    out: List[str] = []
+    for col in ENUM_COLUMNS:
+        if col not in source_cols or not target.get(col, "").startswith("ENUM"):
+            continue
+        added = conn.execute(
+            f'SELECT DISTINCT CAST("{col}" AS VARCHAR) FROM {source} WHERE "{col}" IS NOT NULL '
+            f"EXCEPT SELECT unnest(enum_range(NULL::{_enum_type_name(table_name, col)})) LIMIT 1"
+        ).fetchone()
+        if added is not None:
+            out.append(col)
+    return out
+
+
+def append_sales(
+    conn: duckdb.DuckDBPyConnection,
+    source: str,
+    table_name: str = "sales",
+    on_delta: Callable[[str], None] | None = None,
+):
+    """Append the rows of ``source`` (raw CSV shape) to an existing ``table_name``.
+
+    Rows get the same derived columns as in ``materialize_sales``, and the rollup
+    cube is refreshed for the affected days only. ``on_delta(table)`` is called
+    with the typed rows before they are appended (e.g. to profile them).
+    ``source`` must not have columns the table lacks (see ``new_source_columns``)
+    nor values its ENUM types lack (see ``new_enum_values``). Returns the number
+    of rows appended.
+    """
+    target = dict(_source_columns(conn, table_name))
+    cols = [(c, t) for c, t in _source_columns(conn, source) if c not in DERIVED_COLUMNS]
+
+    select_parts: List[str] = []
+    for col, dtype in cols:
+        if col in ENUM_COLUMNS:
+            select_parts.append(
+                f'CAST(CAST("{col}" AS VARCHAR) AS {_enum_type_name(table_name, col)}) AS "{col}"'
+            )
+        elif dtype == target[col]:
+            select_parts.append(f'"{col}"')
+        else:
+            select_parts.append(f'TRY_CAST("{col}" AS {target[col]}) AS "{col}"')
+    select_parts.extend(_derived_parts(dict(cols)))
+
+    conn.execute(
+        f"CREATE TEMP TABLE _sales_delta AS SELECT {', '.join(select_parts)} FROM {source}"
+    )
+    try:
+        if on_delta is not None:
+            on_delta("_sales_delta")
+        rows = int(
+            conn.execute(f"INSERT INTO {table_name} BY NAME SELECT * FROM _sales_delta").fetchone()[
+                0
+            ]
+        )
+        if rows:
+            refresh_rollup(conn, table_name, "_sales_delta")
+    finally:
+        conn.execute("DROP TABLE IF EXISTS _sales_delta")
+    return rows
+
+
+def source_columns(conn: duckdb.DuckDBPyConnection, table_name: str = "sales"):
+    """``(name, type)`` of the columns of ``table_name`` minus the derived ones (the original CSV shape)."""
+    return [(c, t) for c, t in _source_columns(conn, table_name) if c not in DERIVED_COLUMNS]
+
+
+def source_select(conn: duckdb.DuckDBPyConnection, table_name: str = "sales"):
+    """SELECT list of ``table_name`` without the derived columns (the original CSV shape)."""
+    return ", ".join(f'"{c}"' for c, _ in source_columns(conn, table_name))
+
+
+def _sql_str(value: str):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def csv_relation(path: Path, columns: Sequence[str] = (), encoding: str = "utf-8"):
+    """DuckDB ``read_csv(...)`` expression for one source file."""
+    types = ", ".join(f"{_sql_str(c)}: 'VARCHAR'" for c in TEXT_COLUMNS if c in columns)
+    opts = [f"encoding = {_sql_str(encoding)}", "header = true"]
+    if types:
+        opts.append(f"types = {{{types}}}")
+    return f"read_csv({_sql_str(Path(path).as_posix())}, {', '.join(opts)})"
+
+
+def unify_columns(schemas: Sequence[List[Tuple[str, str]]]):
+    """Union of per-file columns (first-seen order). Columns whose type differs across
+    files widen to DOUBLE when all numeric, else VARCHAR."""
+    merged: Dict[str, str] = {}
+    for cols in schemas:
+        for col, dtype in cols:
+            prev = merged.get(col)
+            if prev is None or prev == dtype:
+                merged[col] = dtype
+            elif prev.startswith(_NUMERIC_TYPES) and dtype.startswith(_NUMERIC_TYPES):
+                merged[col] = "DOUBLE"
+            else:
+                merged[col] = "VARCHAR"
+    return list(merged.items())
+
+
+# Tried in order; latin-1 accepts any byte sequence.
+CSV_ENCODINGS = ["utf-8", "latin-1"]
+
+
+def _sniff_csv(conn: duckdb.DuckDBPyConnection, path: Path):
+    """Return ``(encoding, [(column, type)])`` for one file."""
+    last_error: duckdb.Error | None = None
+    for encoding in CSV_ENCODINGS:
+        try:
+            rows = conn.execute(
+                f"DESCRIBE SELECT * FROM {csv_relation(path, encoding=encoding)}"
+            ).fetchall()
+            names = [r[0] for r in rows]
+            if any(c in names for c in TEXT_COLUMNS):
+                rows = conn.execute(
+                    f"DESCRIBE SELECT * FROM {csv_relation(path, names, encoding)}"
+                ).fetchall()
+            return encoding, [(r[0], str(r[1]).upper()) for r in rows]
+        except duckdb.InvalidInputException as e:
+            last_error = e
+    raise last_error
+
+
+def _insert_csv(
+    conn: duckdb.DuckDBPyConnection,
+    table_name: str,
+    path: Path,
+    columns: Sequence[str],
+    encoding: str,
+):
+    # The sniffer only samples the file, so a bad byte can still show up later on.
+    encodings = CSV_ENCODINGS[CSV_ENCODINGS.index(encoding) :]
+    for n, enc in enumerate(encodings):
+        try:
+            sql = (
+                f"INSERT INTO {table_name} BY NAME SELECT * FROM {csv_relation(path, columns, enc)}"
+            )
+            return int(conn.execute(sql).fetchone()[0])
+        except duckdb.InvalidInputException:
+            if n == len(encodings) - 1:
+                raise
+
+
+def stage_csv_files(
+    conn: duckdb.DuckDBPyConnection,
+    files: Sequence[Path],
+    table_name: str,
+    on_file: Callable[[int, Path, int], None] | None = None,
+):
+    """Stream ``files`` into a new raw table with DuckDB's CSV reader (no pandas).
+
+    Files may differ in column order or miss columns; the table has the union of
+    all columns and missing ones are NULL. ``on_file(index, path, rows)`` is called
+    after each file. Returns the row count per file.
+    """
+    sniffed = [_sniff_csv(conn, path) for path in files]
+    columns = unify_columns([cols for _, cols in sniffed])
+    col_defs = ", ".join(f'"{c}" {t}' for c, t in columns)
+    conn.execute(f"DROP TABLE IF EXISTS {table_name}")
+    conn.execute(f"CREATE TABLE {table_name} ({col_defs})")
+
+    counts: List[int] = []
+    for i, (path, (encoding, cols)) in enumerate(zip(files, sniffed)):
+        counts.append(_insert_csv(conn, table_name, path, [c for c, _ in cols], encoding))
+        if on_file is not None:
+            on_file(i, Path(path), counts[-1])
+    return counts
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import copy
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List
+
+import duckdb
+
+from retail_ai.data_engine.sql_builder import TIME_GRAINS
+
+# Approximate days per period, to estimate how many periods a time_grain yields.
+GRAIN_DAYS = {"day": 1, "week": 7, "month": 28, "quarter": 90}
+OVER_BUDGET = ("downgrade", "reject")
+
+
+class QueryInterrupted(RuntimeError):
+    """A running query was interrupted (``DuckDBService.interrupt``)."""
+
+
+class QueryTimeout(QueryInterrupted, TimeoutError):
+    """A query ran past ``limits.query_timeout_seconds`` and was interrupted."""
+
+
+class QueryRejected(ValueError):
+    """A chat plan would produce more groups than ``limits.max_groups`` allows."""
+
+
+@dataclass(frozen=True)
+class QueryLimits:
+    """Resource limits of dataset connections and chat queries (``limits`` section).
+
+    ``threads``, ``memory_limit`` and ``temp_directory`` are DuckDB settings of
+    every dataset connection (past the memory limit, operators spill to disk).
+    ``query_timeout_seconds`` interrupts a query still running after that long,
+    ``max_result_rows`` caps the rows a chat query returns, and ``check_plan``
+    rejects or downgrades plans whose estimated group count exceeds ``max_groups``.
+    """
+
+    threads: int | None = None
+    memory_limit: str | None = None
+    temp_directory: Path | None = None
+    query_timeout_seconds: float | None = None
+    max_result_rows: int = 200
+    max_groups: int | None = None
+    over_budget: str = "downgrade"
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any]):
+        c = cfg.get("limits", {}) or {}
+        over_budget = str(c.get("over_budget", "downgrade")).lower()
+        return cls(
+            threads=int(c["threads"]) if c.get("threads") else None,
+            memory_limit=c.get("memory_limit"),
+            temp_directory=Path(c["temp_directory"]) if c.get("temp_directory") else None,
+            query_timeout_seconds=(
+                float(c["query_timeout_seconds"]) if c.get("query_timeout_seconds") else None
+            ),
+            max_result_rows=max(1, int(c.get("max_result_rows", 200))),
+            max_groups=int(c["max_groups"]) if c.get("max_groups") else None,
+            over_budget=over_budget if over_budget in OVER_BUDGET else "downgrade",
+        )
+
+    def apply(self, conn: duckdb.DuckDBPyConnection):
+        """Set threads / memory_limit / temp_directory on ``conn`` (and so on its cursors)."""
+        if self.temp_directory is not None:
+            self.temp_directory.mkdir(parents=True, exist_ok=True)
+            conn.execute(f"SET temp_directory = '{self.temp_directory.as_posix()}'")
+        if self.memory_limit:
+            conn.execute(f"SET memory_limit = '{self.memory_limit}'")
+        if self.threads:
+            conn.execute(f"SET threads = {int(self.threads)}")
+
+    def check_plan(self, plan: Dict[str, Any], profile: Any):
+        """``(plan, warnings)`` with ``plan`` kept under ``max_groups`` estimated groups.
+
+        Over budget, ``downgrade`` coarsens the time grain and then drops the
+        highest-cardinality grouping columns until the estimate fits (each step
+        becomes a warning); ``reject`` raises QueryRejected.
+        """
+        if not self.max_groups:
+            return plan, []
+        estimate = estimate_groups(plan, profile)
+        if estimate <= self.max_groups:
+            return plan, []
+        if self.over_budget == "reject":
+            keys = ([plan["time_grain"]] if plan.get("time_grain") else []) + list(
+                plan.get("group_by") or []
+            )
+            raise QueryRejected(
+                f"Grouping by {', '.join(keys)} would produce about {estimate:,} groups "
+                f"(limit {self.max_groups:,}); add a filter or group by fewer columns."
+            )
+
+        plan = copy.deepcopy(plan)
+        warnings: List[str] = []
+        while estimate > self.max_groups and plan.get("time_grain") in TIME_GRAINS[:-1]:
+            coarser = TIME_GRAINS[TIME_GRAINS.index(plan["time_grain"]) + 1]
+            warnings.append(
+                f"Too many {plan['time_grain']}s to group by; results are per {coarser} instead."
+            )
+            _rename_sort(plan, plan["time_grain"], coarser)
+            plan["time_grain"] = coarser
+            estimate = estimate_groups(plan, profile)
+        while estimate > self.max_groups and plan.get("group_by"):
+            col, distinct = max(column_groups(plan, profile).items(), key=lambda kv: kv[1])
+            plan["group_by"] = [c for c in plan["group_by"] if c != col]
+            plan["sort"] = [s for s in plan.get("sort") or [] if s.get("by") != col]
+            warnings.append(
+                f"Grouping by {col} (~{distinct:,} values) exceeds the {self.max_groups:,}-group budget; "
+                "it was left out of the grouping."
+            )
+            estimate = estimate_groups(plan, profile)
+        return plan, warnings
+
+
+def column_groups(plan: Dict[str, Any], profile: Any):
+    """Estimated distinct values per grouping column (the filter's value count when filtered)."""
+    out: Dict[str, int] = {}
+    filters = plan.get("filters") or {}
+    for col in plan.get("group_by") or []:
+        column = profile.columns.get(col) if hasattr(profile, "columns") else None
+        distinct = (
+            column.approx_distinct if column is not None else int(getattr(profile, "row_count", 0))
+        )
+        if col in filters:
+            val = filters[col]
+            distinct = min(distinct, len(val) if isinstance(val, list) else 1)
+        out[col] = max(1, int(distinct))
+    return out
+
+
+def _periods(plan: Dict[str, Any], profile: Any):
+    grain = plan.get("time_grain")
+    if grain not in GRAIN_DAYS:
+        return 1
+    time = plan.get("time") or {}
+    lo = _date(time.get("from")) or getattr(profile, "date_min", None)
+    hi = _date(time.get("to")) or getattr(profile, "date_max", None)
+    if lo is None or hi is None or hi < lo:
+        return 1
+    return (hi - lo).days // GRAIN_DAYS[grain] + 1
+
+
+def _date(value: Any):
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value)[:10]) if value else None
+    except ValueError:
+        return None
+
+
+def estimate_groups(plan: Dict[str, Any], profile: Any):
+    """Upper estimate of the groups a plan produces: the product of its grouping
+    columns' distinct counts and time periods, capped at the row count."""
+    estimate = _periods(plan, profile)
+    for distinct in column_groups(plan, profile).values():
+        estimate *= distinct
+    rows = int(getattr(profile, "row_count", 0) or 0)
+    return min(estimate, rows) if rows else estimate
+
+
+def _rename_sort(plan: Dict[str, Any], old: str, new: str):
+    plan["sort"] = [{**s, "by": new} if s.get("by") == old else s for s in plan.get("sort") or []]
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict
+
+import pyarrow as pa
+
+from retail_ai.data_engine.sql_builder import normalize_sql
+
+
+class QueryMemo:
+    """Runs each distinct (normalized) SQL statement once and shares the result.
+
+    Used for batches of questions: concurrent callers with the same SQL wait on
+    the first caller's execution instead of re-running it. Results are Arrow
+    tables, which are immutable, so sharing them is safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures: Dict[str, Future] = {}
+        self.executed = 0
+        self.shared = 0
+
+    def run(self, sql: str, execute: Callable[[], pa.Table]):
+        """Return ``(result, was_shared)``."""
+        key = normalize_sql(sql)
+        with self._lock:
+            fut = self._futures.get(key)
+            owner = fut is None
+            if owner:
+                fut = Future()
+                self._futures[key] = fut
+                self.executed += 1
+            else:
+                self.shared += 1
+        if owner:
+            try:
+                fut.set_result(execute())
+            except BaseException as e:
+                fut.set_exception(e)
+        return fut.result(), not owner
+
+    def stats(self):
+        with self._lock:
+            return {"unique_queries": self.executed, "shared_results": self.shared}
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Tuple
+
+import pyarrow as pa
+
+from retail_ai.data_engine.sql_builder import normalize_sql
+
+
+@dataclass
+class ResultCache:
+    """Query results by (dataset fingerprint, normalized SQL), LRU-bounded by bytes.
+
+    Results are held as the Arrow tables DuckDB returned (no conversion on a
+    miss) and handed out as is on a hit; tables are immutable, so callers can
+    share them. Tables larger than ``max_bytes`` are not cached.
+    """
+
+    max_bytes: int = 256 * 2**20
+    _tables: "OrderedDict[Tuple[str, str], pa.Table]" = field(
+        default_factory=OrderedDict, init=False, repr=False
+    )
+    _lock: Any = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self):
+        self._bytes = 0
+        self._counts = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any]):
+        """Build from the ``result_cache`` section of model_config.yaml; None when disabled."""
+        c = cfg.get("result_cache", {}) or {}
+        if not c.get("enabled", True):
+            return None
+        return cls(max_bytes=int(float(c.get("max_mb", 256)) * 2**20))
+
+    def key(self, fingerprint: str, sql: str):
+        return fingerprint, normalize_sql(sql)
+
+    def get(self, key: Tuple[str, str]):
+        """Cached result table, or None."""
+        with self._lock:
+            table = self._tables.get(key)
+            if table is None:
+                self._counts["misses"] += 1
+                return None
+            self._tables.move_to_end(key)
+            self._counts["hits"] += 1
+            return table
+
+    def put(self, key: Tuple[str, str], table: pa.Table):
+        if table.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._tables.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._tables[key] = table
+            self._bytes += table.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._tables.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self._counts["evictions"] += 1
+
+    def invalidate(self, fingerprint: str):
+        """Drop every result of one dataset (it was re-registered or closed)."""
+        with self._lock:
+            for key in [k for k in self._tables if k[0] == fingerprint]:
+                self._bytes -= self._tables.pop(key).nbytes
+                self._counts["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counts["hits"] + self._counts["misses"]
+            return {
+                **self._counts,
+                "hit_rate": round(self._counts["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": len(self._tables),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
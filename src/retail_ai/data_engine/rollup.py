@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Collection, Dict, FrozenSet, List
+
+import duckdb
+
+# Dimensions kept in the day-grain rollup cube (planner's usual group_by/filter columns).
+# ship-city is left out: days x cities x the other dimensions has about as many
+# cells as the base table has rows, so the cube would exceed MAX_ROLLUP_RATIO.
+ROLLUP_DIMENSIONS = ["Category", "ship-state", "Fulfilment", "ship-service-level"]
+
+# Skip the cube when it would not be meaningfully smaller than the base table.
+MAX_ROLLUP_RATIO = 0.5
+
+# Metric expressions over the cube's additive measures (same output as SAFE_METRICS).
+ROLLUP_METRICS = {
+    "gross_amount": "SUM(m_gross_amount)",
+    "shipped_amount": "SUM(m_shipped_amount)",
+    "cancelled_amount": "SUM(m_cancelled_amount)",
+    "orders": "CAST(SUM(m_orders) AS BIGINT)",
+    "units": "SUM(m_units)",
+    "cancel_rate": "SUM(m_cancelled_rows) / NULLIF(SUM(m_rows), 0)",
+}
+
+
+# Additive measures stored per cube cell.
+_MEASURES_SQL = """COUNT(*) AS m_rows,
+  COUNT(DISTINCT "Order ID") AS m_orders,
+  SUM(COALESCE(Qty,0)) AS m_units,
+  SUM(COALESCE(Amount,0)) AS m_gross_amount,
+  SUM(CASE WHEN is_shipped THEN COALESCE(Amount,0) ELSE 0 END) AS m_shipped_amount,
+  SUM(CASE WHEN is_cancelled THEN COALESCE(Amount,0) ELSE 0 END) AS m_cancelled_amount,
+  SUM(CASE WHEN is_cancelled THEN 1 ELSE 0 END) AS m_cancelled_rows"""
+
+
+@dataclass(frozen=True)
+class RollupInfo:
+    """Describes a rollup cube and decides whether a plan can be answered from it.
+
+    ``orders`` (COUNT DISTINCT "Order ID") is only additive across cells when no
+    order spans two cells of the same output group. That holds when every cube
+    dimension that is rolled up (not in group_by) is *order-atomic*, i.e. each order
+    has a single value for it; those dimensions are recorded at build time.
+    """
+
+    table_name: str
+    dimensions: FrozenSet[str]
+    order_atomic: FrozenSet[str] = field(default_factory=frozenset)
+
+    def covers(self, plan: Dict[str, Any], schema_cols: Collection[str]):
+        group_by = [c for c in (plan.get("group_by") or []) if c in schema_cols]
+        filters = [c for c in (plan.get("filters") or {}) if c in schema_cols]
+        metrics = plan.get("metrics") or ["shipped_amount"]
+
+        if any(c not in self.dimensions for c in group_by + filters):
+            return False
+        if any(m not in ROLLUP_METRICS for m in metrics):
+            return False
+        for s in plan.get("sort") or []:
+            by = s.get("by")
+            if by in schema_cols and by not in group_by:
+                return False
+        if "orders" in metrics:
+            rolled_up = (set(self.dimensions) | {"order_date"}) - set(group_by)
+            if not rolled_up <= set(self.order_atomic):
+                return False
+        return True
+
+
+def build_rollup(conn: duckdb.DuckDBPyConnection, table_name: str = "sales"):
+    """Create ``<table>_rollup`` (day x ROLLUP_DIMENSIONS) and its metadata table."""
+    rollup_table = f"{table_name}_rollup"
+    meta_table = f"{table_name}_rollup_meta"
+    conn.execute(f"DROP TABLE IF EXISTS {rollup_table}")
+    conn.execute(f"DROP TABLE IF EXISTS {meta_table}")
+
+    cols = {r[0] for r in conn.execute(f"DESCRIBE {table_name}").fetchall()}
+    required = {"order_date", "is_shipped", "is_cancelled", "Amount", "Qty", "Order ID"}
+    if not required <= cols:
+        return None
+    dims = [d for d in ROLLUP_DIMENSIONS if d in cols]
+    keys = ", ".join(["order_date"] + [f'"{d}"' for d in dims])
+
+    conn.execute(f"""CREATE TABLE {rollup_table} AS
+        SELECT {keys},
+          {_MEASURES_SQL}
+        FROM {table_name}
+        GROUP BY ALL""")
+
+    base_rows = conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+    cube_rows = conn.execute(f"SELECT COUNT(*) FROM {rollup_table}").fetchone()[0]
+    if base_rows == 0 or cube_rows > base_rows * MAX_ROLLUP_RATIO:
+        conn.execute(f"DROP TABLE {rollup_table}")
+        return None
+
+    atomic_dims = ["order_date"] + dims
+    order_atomic = _order_atomic(conn, table_name, atomic_dims)
+
+    conn.execute(f"CREATE TABLE {meta_table} (dimension VARCHAR, order_atomic BOOLEAN)")
+    conn.executemany(
+        f"INSERT INTO {meta_table} VALUES (?, ?)",
+        [[d, d in order_atomic] for d in atomic_dims],
+    )
+    return load_rollup(conn, table_name)
+
+
+def _order_atomic(
+    conn: duckdb.DuckDBPyConnection, table_name: str, dims: List[str], where: str = ""
+):
+    """Subset of ``dims`` for which no order (among rows matching ``where``) has more
+    than one value (NULL counts as a value, since it forms its own cell)."""
+    if not dims:
+        return []
+    exprs = [f'"{d}"' for d in dims]
+    per_order = ", ".join(
+        f"COUNT(DISTINCT COALESCE(CAST({e} AS VARCHAR), '<null>')) AS n{i}"
+        for i, e in enumerate(exprs)
+    )
+    spans = ", ".join(f"MAX(n{i})" for i in range(len(exprs)))
+    row = conn.execute(
+        f'SELECT {spans} FROM (SELECT {per_order} FROM {table_name} {where} GROUP BY "Order ID")'
+    ).fetchone()
+    return [d for d, n in zip(dims, row) if n is not None and int(n) <= 1]
+
+
+def refresh_rollup(conn: duckdb.DuckDBPyConnection, table_name: str, delta: str):
+    """Bring the cube up to date after rows of ``delta`` were appended to ``table_name``.
+
+    Only the days present in ``delta`` are recomputed (COUNT DISTINCT is not
+    additive, so affected cells are rebuilt from the base table rather than
+    incremented). Order-atomicity is re-checked for the orders in ``delta`` only;
+    it can be lost but never gained by appending. Returns the new RollupInfo.
+    """
+    info = load_rollup(conn, table_name)
+    if info is None:
+        return None
+    rollup_table = info.table_name
+    dims = [d for d in ROLLUP_DIMENSIONS if d in info.dimensions]
+    keys = ", ".join(["order_date"] + [f'"{d}"' for d in dims])
+    days = (
+        f"(order_date IN (SELECT order_date FROM {delta}) "
+        f"OR (order_date IS NULL AND EXISTS (SELECT 1 FROM {delta} WHERE order_date IS NULL)))"
+    )
+    conn.execute(f"DELETE FROM {rollup_table} WHERE {days}")
+    conn.execute(f"""INSERT INTO {rollup_table} BY NAME
+        SELECT {keys},
+          {_MEASURES_SQL}
+        FROM {table_name}
+        WHERE {days}
+        GROUP BY ALL""")
+
+    still_atomic = _order_atomic(
+        conn,
+        table_name,
+        sorted(info.order_atomic),
+        where=f'WHERE "Order ID" IN (SELECT "Order ID" FROM {delta})',
+    )
+    lost = sorted(set(info.order_atomic) - set(still_atomic))
+    if lost:
+        conn.executemany(
+            f"UPDATE {table_name}_rollup_meta SET order_atomic = false WHERE dimension = ?",
+            [[d] for d in lost],
+        )
+    return load_rollup(conn, table_name)
+
+
+def load_rollup(conn: duckdb.DuckDBPyConnection, table_name: str = "sales"):
+    """Return RollupInfo for ``table_name`` if its cube exists, else None."""
+    meta_table = f"{table_name}_rollup_meta"
+    try:
+        rows = conn.execute(f"SELECT dimension, order_atomic FROM {meta_table}").fetchall()
+    except duckdb.CatalogException:
+        return None
+    dims = frozenset(d for d, _ in rows if d != "order_date")
+    atomic = frozenset(d for d, a in rows if a)
+    return RollupInfo(table_name=f"{table_name}_rollup", dimensions=dims, order_atomic=atomic)
@@ -0,0 +1,331 @@
+from __future__ import annotations
+
+import difflib
+import json
+from dataclasses import asdict, dataclass, field, replace
+from datetime import date
+from typing import Any, Dict, FrozenSet, Iterator, List, Tuple
+
+import duckdb
+
+from retail_ai.data_engine.ingest import DERIVED_COLUMNS
+
+# Text columns with at most this many distinct values get an exact value dictionary
+# (used to validate filter values) and keep every value count, so the profile of
+# appended rows can be merged in; the TOP_K most frequent ones of other text
+# columns are kept, and the first values go into prompts.
+DICTIONARY_MAX = 500
+TOP_K = 12
+
+_RANGE_TYPES = (
+    "TINYINT",
+    "SMALLINT",
+    "INTEGER",
+    "BIGINT",
+    "HUGEINT",
+    "FLOAT",
+    "DOUBLE",
+    "DECIMAL",
+    "DATE",
+    "TIMESTAMP",
+)
+
+NOTES = [
+    "- order_date is an ISO DATE parsed from the raw MM-DD-YY Date; use it for periods.",
+    "- Use Amount as sales value and Qty as units.",
+    "- is_shipped / is_cancelled flag shipped and cancelled lines; Status holds the full state.",
+]
+
+
+@dataclass(frozen=True)
+class ColumnProfile:
+    name: str
+    dtype: str
+    null_count: int
+    approx_distinct: int
+    min_value: str | None = None
+    max_value: str | None = None
+    # Most frequent first; all of them when ``dictionary`` is set.
+    top_values: Tuple[Tuple[str, int], ...] = ()
+    # Every distinct value when the column is a low-cardinality text dimension.
+    dictionary: FrozenSet[str] | None = None
+
+    def render(self, row_count: int, max_values: int):
+        parts = [self.dtype, f"~{self.approx_distinct:,} distinct"]
+        if self.null_count:
+            parts.append(f"{100.0 * self.null_count / max(row_count, 1):.0f}% null")
+        if self.min_value is not None:
+            parts.append(f"range {self.min_value}..{self.max_value}")
+        if self.top_values:
+            shown = [v for v, _ in self.top_values[:max_values]]
+            more = (
+                ""
+                if self.dictionary is not None and len(self.dictionary) <= len(shown)
+                else ", ..."
+            )
+            parts.append("values: " + ", ".join(shown) + more)
+        return f"- {self.name} ({'; '.join(parts)})"
+
+
+@dataclass
+class SchemaProfile:
+    """Column statistics of a dataset, computed once per fingerprint.
+
+    Behaves like a read-only collection of column names (``in``, iteration), so it
+    can be passed wherever plan validation and SQL building expect schema columns.
+    """
+
+    table_name: str
+    row_count: int
+    columns: Dict[str, ColumnProfile]
+    date_min: date | None = None
+    date_max: date | None = None
+    _lookup: Dict[str, Dict[str, str]] = field(default_factory=dict, init=False, repr=False)
+
+    def __post_init__(self):
+        for name, col in self.columns.items():
+            if col.dictionary is not None:
+                self._lookup[name] = {v.strip().lower(): v for v in col.dictionary}
+
+    def __contains__(self, name: object):
+        return name in self.columns
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.columns)
+
+    def __len__(self):
+        return len(self.columns)
+
+    @property
+    def names(self):
+        return list(self.columns)
+
+    def column(self, name: str):
+        return self.columns.get(name)
+
+    def to_prompt(self, max_values: int = 8):
+        """Compact schema text for planner prompts (types, cardinality, ranges, top values)."""
+        header = f"Dataset `{self.table_name}`: {self.row_count:,} rows"
+        if self.date_min is not None:
+            header += f"; order dates {self.date_min.isoformat()}..{self.date_max.isoformat()}"
+        lines = [header, "Columns:"]
+        lines += [c.render(self.row_count, max_values) for c in self.columns.values()]
+        return "\n".join(lines + ["", "Notes:", *NOTES])
+
+    def validate_filters(self, filters: Dict[str, Any]):
+        """Check filter values against the column dictionaries.
+
+        Values are mapped to their stored spelling (case/whitespace, then close
+        matches). Values that do not occur are kept as given, so the filter still
+        applies and matches no rows; dropping them would widen the question to
+        every value of the column. Returns ``(filters, warnings)``.
+        """
+        cleaned: Dict[str, Any] = {}
+        warnings: List[str] = []
+        for col, val in (filters or {}).items():
+            lookup = self._lookup.get(col)
+            if lookup is None:
+                cleaned[col] = val
+                continue
+            values = val if isinstance(val, list) else [val]
+            kept: List[Any] = []
+            missing: List[Any] = []
+            for v in values:
+                key = str(v).strip().lower()
+                match = lookup.get(key)
+                if match is None:
+                    close = difflib.get_close_matches(key, list(lookup), n=1, cutoff=0.8)
+                    if close:
+                        match = lookup[close[0]]
+                        warnings.append(f"Filter {col}: interpreted '{v}' as '{match}'.")
+                if match is None:
+                    missing.append(v)
+                    match = v
+                if match not in kept:
+                    kept.append(match)
+            if missing and len(missing) == len(values):
+                shown = ", ".join(f"'{v}'" for v in missing)
+                verb = "does" if len(missing) == 1 else "do"
+                warnings.append(
+                    f"Filter {col}: {shown} {verb} not occur in the data, so no rows match."
+                )
+            elif missing:
+                for v in missing:
+                    warnings.append(f"Filter {col}: '{v}' does not occur in the data.")
+            cleaned[col] = kept if isinstance(val, list) else kept[0]
+        return cleaned, warnings
+
+    def to_json(self):
+        return json.dumps(
+            {
+                "table_name": self.table_name,
+                "row_count": self.row_count,
+                "date_min": self.date_min.isoformat() if self.date_min else None,
+                "date_max": self.date_max.isoformat() if self.date_max else None,
+                "columns": [
+                    {
+                        **asdict(c),
+                        "dictionary": sorted(c.dictionary) if c.dictionary is not None else None,
+                    }
+                    for c in self.columns.values()
+                ],
+            }
+        )
+
+    @classmethod
+    def from_json(cls, text: str):
+        raw = json.loads(text)
+        columns = {}
+        for c in raw["columns"]:
+            c["top_values"] = tuple((v, int(n)) for v, n in c["top_values"])
+            c["dictionary"] = frozenset(c["dictionary"]) if c["dictionary"] is not None else None
+            columns[c["name"]] = ColumnProfile(**c)
+        return cls(
+            table_name=raw["table_name"],
+            row_count=int(raw["row_count"]),
+            columns=columns,
+            date_min=date.fromisoformat(raw["date_min"]) if raw["date_min"] else None,
+            date_max=date.fromisoformat(raw["date_max"]) if raw["date_max"] else None,
+        )
+
+
+def _fmt(value: Any):
+    if value is None:
+        return None
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return value.isoformat() if isinstance(value, date) else str(value)
+
+
+def profile_table(conn: duckdb.DuckDBPyConnection, table_name: str = "sales"):
+    """Profile ``table_name`` in two scans: per-column counts/cardinality/ranges, then
+    value counts of the low-cardinality text columns (one GROUPING SETS query)."""
+    described = conn.execute(f"DESCRIBE {table_name}").fetchall()
+    all_names = {r[0] for r in described}
+    cols = [
+        (
+            r[0],
+            "VARCHAR" if str(r[1]).startswith("ENUM") else str(r[1]),
+        )  # ENUMs are an ingest detail
+        for r in described
+        if r[0] not in DERIVED_COLUMNS
+    ]
+
+    exprs = ["COUNT(*)"]
+    for name, dtype in cols:
+        q = f'"{name}"'
+        exprs += [f"COUNT({q})", f"approx_count_distinct({q})"]
+        if dtype.startswith(_RANGE_TYPES):
+            exprs += [f"MIN({q})", f"MAX({q})"]
+    if "order_date" in all_names:
+        exprs += ["MIN(order_date)", "MAX(order_date)"]
+    row = list(conn.execute(f"SELECT {', '.join(exprs)} FROM {table_name}").fetchone())
+
+    row_count = int(row.pop(0))
+    stats: Dict[str, Dict[str, Any]] = {}
+    for name, dtype in cols:
+        non_null, distinct = row.pop(0), row.pop(0)
+        s = {"null_count": row_count - int(non_null), "approx_distinct": int(distinct or 0)}
+        if dtype.startswith(_RANGE_TYPES):
+            s["min_value"], s["max_value"] = _fmt(row.pop(0)), _fmt(row.pop(0))
+        stats[name] = s
+    date_min, date_max = (row[0], row[1]) if "order_date" in all_names else (None, None)
+
+    dims = [
+        name
+        for name, dtype in cols
+        if dtype == "VARCHAR" and 0 < stats[name]["approx_distinct"] <= DICTIONARY_MAX
+    ]
+    counts: Dict[str, List[Tuple[str, int]]] = {d: [] for d in dims}
+    if dims:
+        keys = ", ".join(f'CAST("{d}" AS VARCHAR) AS k{i}' for i, d in enumerate(dims))
+        sets = ", ".join(f"(k{i})" for i in range(len(dims)))
+        grouping = ", ".join(f"k{i}" for i in range(len(dims)))
+        rows = conn.execute(
+            f"SELECT GROUPING({grouping}) AS gid, {grouping}, COUNT(*) AS n "
+            f"FROM (SELECT {keys} FROM {table_name}) GROUP BY GROUPING SETS ({sets})"
+        ).fetchall()
+        full = (1 << len(dims)) - 1
+        for r in rows:
+            gid, values, n = r[0], r[1:-1], r[-1]
+            for i, d in enumerate(dims):
+                if gid == full ^ (1 << (len(dims) - 1 - i)) and values[i] is not None:
+                    counts[d].append((values[i], int(n)))
+
+    columns: Dict[str, ColumnProfile] = {}
+    for name, dtype in cols:
+        s = stats[name]
+        if name in counts:
+            ranked = sorted(counts[name], key=lambda vn: (-vn[1], vn[0]))
+            s["approx_distinct"] = len(ranked)
+            s["top_values"] = tuple(ranked[:TOP_K])
+            if len(ranked) <= DICTIONARY_MAX:
+                s["top_values"] = tuple(ranked)
+                s["dictionary"] = frozenset(v for v, _ in ranked)
+        columns[name] = ColumnProfile(name=name, dtype=dtype, **s)
+    return SchemaProfile(
+        table_name=table_name,
+        row_count=row_count,
+        columns=columns,
+        date_min=date_min,
+        date_max=date_max,
+    )
+
+
+def merge_profiles(base: SchemaProfile, delta: SchemaProfile):
+    """Profile of ``base``'s table after the rows profiled in ``delta`` were appended.
+
+    Row and null counts, ranges, dates and the value counts of dictionary columns
+    merge exactly. Other columns' distinct counts become an upper bound (the sum,
+    capped at the row count) and their top values an approximation; a full
+    rebuild profiles the table again.
+    """
+    row_count = base.row_count + delta.row_count
+    columns: Dict[str, ColumnProfile] = {}
+    for name, col in base.columns.items():
+        other = delta.columns.get(name)
+        if other is None:  # not in the appended rows, so NULL there
+            columns[name] = replace(col, null_count=col.null_count + delta.row_count)
+        else:
+            columns[name] = _merge_column(col, other, row_count)
+    dates = [
+        d for d in (base.date_min, base.date_max, delta.date_min, delta.date_max) if d is not None
+    ]
+    return SchemaProfile(
+        table_name=base.table_name,
+        row_count=row_count,
+        columns=columns,
+        date_min=min(dates) if dates else None,
+        date_max=max(dates) if dates else None,
+    )
+
+
+def _merge_column(a: ColumnProfile, b: ColumnProfile, row_count: int):
+    merged = {
+        "null_count": a.null_count + b.null_count,
+        "min_value": _bound(a.dtype, a.min_value, b.min_value, min),
+        "max_value": _bound(a.dtype, a.max_value, b.max_value, max),
+        "approx_distinct": min(row_count, a.approx_distinct + b.approx_distinct),
+        "dictionary": None,
+    }
+    if a.top_values:
+        counts = dict(a.top_values)
+        for v, n in b.top_values:
+            counts[v] = counts.get(v, 0) + n
+        ranked = sorted(counts.items(), key=lambda vn: (-vn[1], vn[0]))
+        merged["top_values"] = tuple(ranked[:TOP_K])
+        if a.dictionary is not None and b.dictionary is not None:
+            # Both sides hold every value count, so the union is exact.
+            merged["approx_distinct"] = len(ranked)
+            if len(ranked) <= DICTIONARY_MAX:
+                merged["top_values"] = tuple(ranked)
+                merged["dictionary"] = frozenset(counts)
+    return replace(a, **merged)
+
+
+def _bound(dtype: str, a: str | None, b: str | None, pick):
+    """min/max of two formatted range values (numbers compare as numbers, dates as ISO text)."""
+    values = [v for v in (a, b) if v is not None]
+    if not values:
+        return None
+    return pick(values, key=str if dtype.startswith(("DATE", "TIMESTAMP")) else float)
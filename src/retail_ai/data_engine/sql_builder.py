@@ -1,16 +1,46 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+from typing import Any, Collection, Dict, List
 
+from retail_ai.data_engine.rollup import ROLLUP_METRICS, RollupInfo
+
+# Metrics target the typed columns materialized at ingest (see data_engine.ingest):
+# order_date DATE, is_shipped / is_cancelled BOOLEAN.
 SAFE_METRICS = {
     "gross_amount": "SUM(COALESCE(Amount, 0))",
-    "shipped_amount": "SUM(CASE WHEN Status LIKE 'Shipped%' THEN COALESCE(Amount,0) ELSE 0 END)",
-    "cancelled_amount": "SUM(CASE WHEN lower(Status) LIKE '%cancelled%' THEN COALESCE(Amount,0) ELSE 0 END)",
+    "shipped_amount": "SUM(CASE WHEN is_shipped THEN COALESCE(Amount,0) ELSE 0 END)",
+    "cancelled_amount": "SUM(CASE WHEN is_cancelled THEN COALESCE(Amount,0) ELSE 0 END)",
     "orders": 'COUNT(DISTINCT "Order ID")',
     "units": "SUM(COALESCE(Qty,0))",
-    "cancel_rate": "AVG(CASE WHEN lower(Status) LIKE '%cancelled%' THEN 1.0 ELSE 0.0 END)",
+    "cancel_rate": "AVG(CASE WHEN is_cancelled THEN 1.0 ELSE 0.0 END)",
 }
 
+# plan["time_grain"]: order_date truncated to this period, selected (and grouped) as a column of that name.
+TIME_GRAINS = ("day", "week", "month", "quarter")
+
+
+def normalize_sql(sql: str):
+    """Canonical form for de-duplication: whitespace collapsed outside quotes, no trailing ';'."""
+    out: List[str] = []
+    quote: str | None = None
+    pending_space = False
+    for ch in (sql or "").strip().rstrip(";").strip():
+        if quote:
+            out.append(ch)
+            if ch == quote:
+                quote = None
+            continue
+        if ch.isspace():
+            pending_space = True
+            continue
+        if pending_space and out:
+            out.append(" ")
+        pending_space = False
+        out.append(ch)
+        if ch in ("'", '"'):
+            quote = ch
+    return "".join(out)
+
 
 def _sql_literal(v: Any):
     if v is None:
@@ -21,37 +51,59 @@ def _sql_literal(v: Any):
     return f"'{s}'"
 
 
-def build_sql(plan: Dict[str, Any], schema_cols: List[str]):
+def build_sql(
+    plan: Dict[str, Any],
+    schema_cols: Collection[str],
+    rollup: RollupInfo | None = None,
+    max_rows: int = 200,
+):
+    """Compile a validated plan to SELECT SQL.
+
+    When ``rollup`` is given and covers the plan's group_by, filters and metrics,
+    the query reads the pre-aggregated cube instead of the base ``sales`` table.
+    """
+    use_rollup = rollup is not None and rollup.covers(plan, schema_cols)
+    table = rollup.table_name if use_rollup else "sales"
+    metric_exprs = ROLLUP_METRICS if use_rollup else SAFE_METRICS
+
     group_by = plan.get("group_by") or []
     filters = plan.get("filters") or {}
     metrics = plan.get("metrics") or ["shipped_amount"]
     sort = plan.get("sort") or []
     limit = int(plan.get("limit") or 10)
 
+    grain = plan.get("time_grain")
+    if grain not in TIME_GRAINS:
+        grain = None
+
     select_parts: List[str] = []
     group_parts: List[str] = []
 
+    if grain:
+        select_parts.append(f"CAST(DATE_TRUNC('{grain}', order_date) AS DATE) AS \"{grain}\"")
+        group_parts.append(f'"{grain}"')
+
     for col in group_by:
         if col in schema_cols:
             select_parts.append(f'"{col}"')
             group_parts.append(f'"{col}"')
 
     for m in metrics:
-        expr = SAFE_METRICS.get(m)
+        expr = metric_exprs.get(m)
         if expr:
             select_parts.append(f"{expr} AS {m}")
 
     if not select_parts:
-        select_parts = [SAFE_METRICS["shipped_amount"] + " AS shipped_amount"]
+        select_parts = [metric_exprs["shipped_amount"] + " AS shipped_amount"]
 
     where_parts: List[str] = []
     time = plan.get("time") or {}
     date_from = time.get("from")
     date_to = time.get("to")
     if date_from:
-        where_parts.append(f"TRY_STRPTIME(Date, '%m-%d-%y') >= DATE {_sql_literal(date_from)}")
+        where_parts.append(f"order_date >= DATE {_sql_literal(date_from)}")
     if date_to:
-        where_parts.append(f"TRY_STRPTIME(Date, '%m-%d-%y') <= DATE {_sql_literal(date_to)}")
+        where_parts.append(f"order_date <= DATE {_sql_literal(date_to)}")
 
     for col, val in filters.items():
         if col not in schema_cols:
@@ -62,7 +114,7 @@ def build_sql(plan: Dict[str, Any], schema_cols: List[str]):
         else:
             where_parts.append(f'"{col}" = {_sql_literal(val)}')
 
-    sql = "SELECT " + ", ".join(select_parts) + "\nFROM sales\n"
+    sql = "SELECT " + ", ".join(select_parts) + f"\nFROM {table}\n"
     if where_parts:
         sql += "WHERE " + " AND ".join(where_parts) + "\n"
     if group_parts:
@@ -73,12 +125,12 @@ def build_sql(plan: Dict[str, Any], schema_cols: List[str]):
         for s in sort:
             by = s.get("by")
             order = (s.get("order") or "desc").lower()
-            if by in schema_cols:
+            if by in schema_cols or (grain and by == grain):
                 order_parts.append(f'"{by}" {order.upper()}')
             elif by in SAFE_METRICS:
                 order_parts.append(f"{by} {order.upper()}")
         if order_parts:
             sql += "ORDER BY " + ", ".join(order_parts) + "\n"
 
-    sql += f"LIMIT {max(1, min(limit, 200))}"
+    sql += f"LIMIT {max(1, min(limit, max_rows))}"
     return sql
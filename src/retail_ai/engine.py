@@ -1,15 +1,34 @@
 from __future__ import annotations
 
+import asyncio
+import contextvars
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
 from dataclasses import dataclass
-from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List
 
 import pandas as pd
 
+from retail_ai.data_engine.connection_pool import ConnectionPool
+from retail_ai.data_engine.dataset import Dataset
+from retail_ai.data_engine.duckdb_service import DuckDBService
+from retail_ai.data_engine.query_limits import QueryLimits
+from retail_ai.data_engine.query_memo import QueryMemo
+from retail_ai.data_engine.result_cache import ResultCache
 from retail_ai.graphs.chat_graph import build_chat_graph
+from retail_ai.graphs.followup import ChatSession
 from retail_ai.graphs.summary_graph import build_summary_graph
-from retail_ai.utils.helpers import get_schema_metadata
-from retail_ai.data_engine.duckdb_service import DuckDBService
+from retail_ai.handlers.error_handler import friendly_error
+from retail_ai.llm.factory import build_llm
+from retail_ai.llm.guard import LLMGuard
+from retail_ai.llm.prompt_budget import PromptBudget
+from retail_ai.llm.response_cache import ResponseCache
+from retail_ai.utils.config_loader import load_yaml
+from retail_ai.utils.helpers import dataset_fingerprint
+from retail_ai.utils.jobs import DONE, Job, JobScheduler
+from retail_ai.utils.tracing import Tracer, profile_queries, profiling_queries
 
 
 @dataclass
@@ -22,37 +41,431 @@ class RetailAssistantEngine:
     - Schema metadata
 
     Keeping orchestration here improves readability and testability.
+
+    Calls take either a DataFrame, which is registered in an in-memory DuckDB once
+    per fingerprint, or a ``Dataset`` from ``DataLoader.open()`` / ``ingest_all()``,
+    which is queried in its on-disk database without loading rows into pandas.
+
+    One engine can serve every session of a process: graphs, configs and the
+    LLM client are built once, each dataset gets one connection (read-only for
+    on-disk datasets) and each call borrows a cursor from that dataset's pool
+    (``connections`` config section). The ``max_datasets`` most recently used
+    datasets stay open.
+
+    Per-user conversation state lives in a ``ChatSession`` the caller passes to
+    ``answer(..., session=...)``: follow-ups such as "now only Maharashtra" are
+    merged into the previous plan and, when exact, answered from its result.
+
+    Summaries are computed by background jobs (``precompute()``, ``precompute``
+    config section), one per dataset fingerprint: ``summarize*`` returns the
+    stored result, or attaches to the running job, instead of recomputing.
+
+    Every call is recorded as a trace (graph nodes, DuckDB queries, LLM calls);
+    see ``last_trace()`` and the ``tracing`` config section.
     """
 
     cfg_path: str = "config/model_config.yaml"
     prompts_path: str = "config/prompt_templates.yaml"
 
     def __post_init__(self):
-        self._chat_graph = build_chat_graph(self.cfg_path, self.prompts_path)
-        self._summary_graph = build_summary_graph(self.cfg_path, self.prompts_path)
+        cfg = load_yaml(self.cfg_path)
+        self._cfg = cfg
+        self._llm_cache = ResponseCache.from_config(cfg)
+        # One client (and guard) for both graphs: rate limit / concurrency are per client, not per graph.
+        self._llm_guard = LLMGuard.from_config(cfg)
+        self.llm = build_llm(
+            cfg, cache=self._llm_cache, guard=self._llm_guard, budget=PromptBudget.from_config(cfg)
+        )
+        self._chat_graph = build_chat_graph(self.cfg_path, self.prompts_path, llm=self.llm)
+        self._summary_graph = build_summary_graph(self.cfg_path, self.prompts_path, llm=self.llm)
+        self._pools: "OrderedDict[str, ConnectionPool]" = OrderedDict()
+        self._max_datasets = max(1, int((cfg.get("connections", {}) or {}).get("max_datasets", 4)))
+        self._result_cache = ResultCache.from_config(cfg)
+        self._limits = QueryLimits.from_config(cfg)
+        self._jobs = JobScheduler.from_config(cfg)
+        # Table rows a precomputed summary's narrator sees; other max_rows values run inline.
+        self._summary_prompt_rows = int((cfg.get("precompute", {}) or {}).get("prompt_rows", 50))
+        self._dataset_lock = threading.Lock()
+        self._planner_counts: Counter = Counter()
+        self._narrator_counts: Counter = Counter()
+        self._stats_lock = threading.Lock()
+        self.tracer = Tracer.from_config(cfg)
+        self._profile_queries = bool((cfg.get("tracing", {}) or {}).get("profile_queries", False))
 
-    def summarize(self, df: pd.DataFrame, max_rows: int = 50):
-        svc = DuckDBService.in_memory()
-        svc.register_sales(df)
-        schema_md = get_schema_metadata(df)
-        state = {"schema": schema_md, "duckdb_service": svc, "max_rows": int(max_rows)}
-        return self._summary_graph.invoke(state)
+    @contextmanager
+    def _trace(self, name: str, **attrs: Any):
+        """Root span of one engine call (a child span when called inside another trace)."""
+        with ExitStack() as stack:
+            stack.enter_context(self.tracer.activate())
+            if self._profile_queries:
+                stack.enter_context(profile_queries())
+            yield stack.enter_context(self.tracer.span(name, **attrs))
 
-    def answer(
+    def _tag(self, res: Dict[str, Any], span: Any):
+        if span.trace_id is not None:
+            res.setdefault("telemetry", {})["trace_id"] = span.trace_id
+        return res
+
+    def _pool(self, data: pd.DataFrame | Dataset):
+        """Connection pool of ``data``, opened on first use (LRU over ``max_datasets``)."""
+        key = data.fingerprint if isinstance(data, Dataset) else dataset_fingerprint(data)
+        with self._dataset_lock:
+            pool = self._pools.get(key)
+            if pool is None or pool.closed:
+                if isinstance(data, Dataset):
+                    svc = DuckDBService.attach(
+                        data.cache_path, data.table_name, fingerprint=key, limits=self._limits
+                    )
+                    svc.result_cache = self._result_cache
+                else:
+                    svc = DuckDBService.in_memory(fingerprint=key, limits=self._limits)
+                    svc.result_cache = self._result_cache
+                    svc.register_sales(data)
+                pool = self._pools[key] = ConnectionPool.from_config(self._cfg, svc)
+            self._pools.move_to_end(key)
+            while len(self._pools) > self._max_datasets:
+                _, evicted = self._pools.popitem(last=False)
+                evicted.close()  # the connection closes when its last request returns
+            return pool
+
+    def _cursor(self, data: pd.DataFrame | Dataset):
+        """Pooled per-request cursor on ``data`` (a context manager)."""
+        return self._pool(data).cursor()
+
+    def pool_stats(self):
+        """Open datasets (by fingerprint prefix) with their cursor pool usage."""
+        with self._dataset_lock:
+            return {key[:12]: pool.stats() for key, pool in self._pools.items()}
+
+    def close(self):
+        """Cancel background jobs and close every dataset connection (after in-flight requests return)."""
+        if self._jobs is not None:
+            self._jobs.cancel_all()
+        with self._dataset_lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            pool.close()
+
+    def _summary_key(self, data: pd.DataFrame | Dataset):
+        fingerprint = data.fingerprint if isinstance(data, Dataset) else dataset_fingerprint(data)
+        return "summary", fingerprint
+
+    def precompute(self, data: pd.DataFrame | Dataset):
+        """Start (or join) the background job computing ``data``'s schema metadata,
+        summary tables and narrative; returns the ``Job`` (None when disabled).
+
+        Call it when a dataset is selected or ingested; ``summarize*`` then returns
+        the stored result or waits on this job instead of running its own. There
+        is one job per dataset, run with ``precompute.prompt_rows`` rows per table.
+        """
+        if self._jobs is None:
+            return None
+        key = self._summary_key(data)
+        return self._jobs.submit(
+            key,
+            lambda job: self._run_summary_job(job, data, self._summary_prompt_rows),
+            name=f"summary:{key[1][:12]}",
+        )
+
+    def summary_job(self, data: pd.DataFrame | Dataset):
+        """The summary job of ``data`` (status, events, result), or None."""
+        return self._jobs.get(self._summary_key(data)) if self._jobs is not None else None
+
+    def cancel_precompute(self, data: pd.DataFrame | Dataset):
+        """Cancel ``data``'s summary job; False when there is none or it already finished."""
+        return self._jobs.cancel(self._summary_key(data)) if self._jobs is not None else False
+
+    def job_stats(self):
+        """Background job counters (submitted, deduplicated, done, failed, cancelled) and current states."""
+        return self._jobs.stats() if self._jobs is not None else {}
+
+    def _run_summary_job(self, job: Job, data: pd.DataFrame | Dataset, max_rows: int):
+        with self._trace("engine.precompute", job=job.name) as span:
+            with self._cursor(data) as svc, job.cancel_hook(svc.interrupt):
+                svc.date_bounds()  # with the schema profile: metadata the chat planner needs
+                state = self._summary_state(svc, max_rows)
+                state["stream"] = True
+                final: Dict[str, Any] = state
+                for mode, chunk in self._summary_graph.stream(
+                    state, stream_mode=["updates", "custom", "values"]
+                ):
+                    job.check_cancelled()
+                    if mode == "updates" and "summary_extractor" in chunk:
+                        job.emit(
+                            {
+                                "type": "tables",
+                                "tables": chunk["summary_extractor"].get("_summary_tables") or {},
+                            }
+                        )
+                    elif mode == "custom":
+                        job.emit({"type": "token", "text": chunk.get("token", "")})
+                    elif mode == "values":
+                        final = chunk
+            # Stored for later callers: no cursor, no per-call flags.
+            final = {k: v for k, v in final.items() if k not in ("duckdb_service", "stream")}
+            return self._tag(final, span)
+
+    def _summary_job(self, data: pd.DataFrame | Dataset):
+        """``(job, source)``; source is warm (stored result), attached (in flight) or started."""
+        existing = self.summary_job(data)
+        job = self.precompute(data)
+        if job is not existing:
+            return job, "started"
+        return job, "warm" if job.status == DONE else "attached"
+
+    def _summary_result(self, job: Job, source: str, span: Any):
+        state = dict(job.result())
+        # telemetry["trace_id"] stays the job's trace, which holds the query and LLM spans.
+        state["telemetry"] = {
+            **(state.get("telemetry") or {}),
+            "precompute": {"source": source, **job.info()},
+        }
+        span.set(precompute=source)
+        return state
+
+    def llm_cache_stats(self):
+        """Per-stage hit/miss counters of the LLM response cache ({} when disabled)."""
+        return self._llm_cache.stats() if self._llm_cache is not None else {}
+
+    def result_cache_stats(self):
+        """Hits, misses, hit rate, entries and bytes of the query result cache ({} when disabled)."""
+        return self._result_cache.stats() if self._result_cache is not None else {}
+
+    def llm_call_stats(self):
+        """Attempts / retries / failures recorded by the shared LLM guard."""
+        return dict(self._llm_guard.stats)
+
+    def planner_stats(self):
+        """How many answers were planned by the fast path vs the LLM planner."""
+        return dict(self._planner_counts)
+
+    def narrator_stats(self):
+        """How many answers were narrated from templates vs by the LLM."""
+        return dict(self._narrator_counts)
+
+    def trace_spans(self, trace_id: str | None = None):
+        """Recorded spans as dicts (all buffered spans, or one trace)."""
+        return self.tracer.spans(trace_id)
+
+    def last_trace(self):
+        """Spans of the most recent top-level call ([] when tracing is off)."""
+        trace_id = self.tracer.last_trace_id
+        return self.tracer.spans(trace_id) if trace_id else []
+
+    def _summary_state(self, svc: DuckDBService, max_rows: int):
+        profile = svc.schema_profile()
+        return {
+            "schema": profile.to_prompt(),
+            "duckdb_service": svc,
+            "dataset_fingerprint": svc.fingerprint,
+            "max_rows": int(max_rows),
+        }
+
+    def _chat_state(
         self,
-        df: pd.DataFrame,
+        svc: DuckDBService,
         question: str,
-        chat_history: List[Dict[str, str]] | None = None,
-        max_rows: int = 50,
+        chat_history: List[Dict[str, str]] | None,
+        max_rows: int,
+        session: ChatSession | None = None,
     ):
-        svc = DuckDBService.in_memory()
-        svc.register_sales(df)
-        schema_md = get_schema_metadata(df)
-        state = {
+        profile = svc.schema_profile()
+        return {
             "user_query": question,
-            "schema": schema_md,
+            "schema": profile.to_prompt(),
+            "schema_profile": profile,
             "chat_history": chat_history or [],
             "duckdb_service": svc,
+            "dataset_fingerprint": svc.fingerprint,
             "max_rows": int(max_rows),
+            "session": session,
         }
-        return self._chat_graph.invoke(state)
+
+    def _record_answer(self, res: Dict[str, Any]):
+        with self._stats_lock:
+            telemetry = res.get("telemetry") or {}
+            self._planner_counts[telemetry.get("planner", "llm")] += 1
+            self._narrator_counts[telemetry.get("narrator", "llm")] += 1
+
+    def _use_summary_job(self, max_rows: int):
+        """True when the dataset's summary job answers this call as asked: its narrator
+        saw ``precompute.prompt_rows`` rows per table, and its queries were profiled
+        only when ``tracing.profile_queries`` is on. Otherwise ``summarize*`` runs inline."""
+        return (
+            self._jobs is not None
+            and max_rows == self._summary_prompt_rows
+            and (self._profile_queries or not profiling_queries())
+        )
+
+    def summarize(self, data: pd.DataFrame | Dataset, max_rows: int = 50):
+        with self._trace("engine.summarize") as span:
+            if self._use_summary_job(max_rows):
+                job, source = self._summary_job(data)
+                return self._summary_result(job, source, span)
+            with self._cursor(data) as svc:
+                return self._tag(
+                    self._summary_graph.invoke(self._summary_state(svc, max_rows)), span
+                )
+
+    async def asummarize(self, data: pd.DataFrame | Dataset, max_rows: int = 50):
+        with self._trace("engine.summarize") as span:
+            if self._use_summary_job(max_rows):
+                job, source = self._summary_job(data)
+                await asyncio.to_thread(job.result)
+                return self._summary_result(job, source, span)
+            pool = await asyncio.to_thread(self._pool, data)
+            svc = await asyncio.to_thread(pool.acquire)
+            try:
+                return self._tag(
+                    await self._summary_graph.ainvoke(self._summary_state(svc, max_rows)), span
+                )
+            finally:
+                pool.release(svc)
+
+    def summarize_stream(self, data: pd.DataFrame | Dataset, max_rows: int = 50):
+        """Yield summary events: ``tables`` first, then narrative ``token``s, then ``done``.
+
+        With precompute on, the events are those of the dataset's summary job:
+        replayed at once when it finished, followed live while it runs. A call with
+        another ``max_rows`` than ``precompute.prompt_rows``, or with query profiling
+        the job did not do, runs inline instead.
+        """
+        with self._trace("engine.summarize", stream=True) as span:
+            if self._use_summary_job(max_rows):
+                job, source = self._summary_job(data)
+                yield from job.follow()
+                yield {"type": "done", "state": self._summary_result(job, source, span)}
+                return
+            with self._cursor(data) as svc:
+                state = self._summary_state(svc, max_rows)
+                state["stream"] = True
+                final: Dict[str, Any] = state
+                for mode, chunk in self._summary_graph.stream(
+                    state, stream_mode=["updates", "custom", "values"]
+                ):
+                    if mode == "updates" and "summary_extractor" in chunk:
+                        yield {
+                            "type": "tables",
+                            "tables": chunk["summary_extractor"].get("_summary_tables") or {},
+                        }
+                    elif mode == "custom":
+                        yield {"type": "token", "text": chunk.get("token", "")}
+                    elif mode == "values":
+                        final = chunk
+                yield {"type": "done", "state": self._tag(final, span)}
+
+    def answer(
+        self,
+        data: pd.DataFrame | Dataset,
+        question: str,
+        chat_history: List[Dict[str, str]] | None = None,
+        max_rows: int = 50,
+        session: ChatSession | None = None,
+    ):
+        with self._trace("engine.answer", question=question) as span:
+            with self._cursor(data) as svc:
+                res = self._chat_graph.invoke(
+                    self._chat_state(svc, question, chat_history, max_rows, session)
+                )
+                self._record_answer(res)
+                return self._tag(res, span)
+
+    async def aanswer(
+        self,
+        data: pd.DataFrame | Dataset,
+        question: str,
+        chat_history: List[Dict[str, str]] | None = None,
+        max_rows: int = 50,
+        session: ChatSession | None = None,
+    ):
+        with self._trace("engine.answer", question=question) as span:
+            pool = await asyncio.to_thread(self._pool, data)
+            svc = await asyncio.to_thread(pool.acquire)
+            try:
+                res = await self._chat_graph.ainvoke(
+                    self._chat_state(svc, question, chat_history, max_rows, session)
+                )
+                self._record_answer(res)
+                return self._tag(res, span)
+            finally:
+                pool.release(svc)
+
+    def answer_stream(
+        self,
+        data: pd.DataFrame | Dataset,
+        question: str,
+        chat_history: List[Dict[str, str]] | None = None,
+        max_rows: int = 50,
+        session: ChatSession | None = None,
+    ):
+        """Yield answer events: ``result`` (sql, result_table as Arrow) first, then narrative ``token``s, then ``done`` with the final state."""
+        with self._trace("engine.answer", question=question, stream=True) as span:
+            with self._cursor(data) as svc:
+                state = self._chat_state(svc, question, chat_history, max_rows, session)
+                state["stream"] = True
+                final: Dict[str, Any] = state
+                for mode, chunk in self._chat_graph.stream(
+                    state, stream_mode=["updates", "custom", "values"]
+                ):
+                    if mode == "updates" and "extractor" in chunk:
+                        upd = chunk["extractor"]
+                        yield {
+                            "type": "result",
+                            "sql": upd.get("sql", ""),
+                            "result_table": upd.get("result_table"),
+                        }
+                    elif mode == "custom":
+                        yield {"type": "token", "text": chunk.get("token", "")}
+                    elif mode == "values":
+                        final = chunk
+                self._record_answer(final)
+                yield {"type": "done", "state": self._tag(final, span)}
+
+    def answer_many(
+        self,
+        data: pd.DataFrame | Dataset,
+        questions: List[str],
+        max_rows: int = 50,
+        max_workers: int | None = None,
+    ):
+        """Answer independent questions as one batch; results are in input order.
+
+        Questions are planned and narrated concurrently (bounded by the shared LLM
+        guard). SQL is de-duplicated after normalization, so each distinct query
+        runs once against the dataset and its result frame is shared (read-only)
+        by every answer that needs it. Batch counters are in ``telemetry["batch"]``
+        of each result. A failing question yields ``{"user_query", "error"}``
+        instead of aborting the batch.
+        """
+        questions = list(questions)
+        if not questions:
+            return []
+        with self._trace("engine.answer_many", questions=len(questions)) as batch_span:
+            self._pool(data)  # open (or register) once before fanning out
+            memo = QueryMemo()
+            workers = max_workers or min(
+                len(questions), max(2, self._llm_guard.max_concurrency * 2)
+            )
+
+            def run(question: str):
+                with self.tracer.span("engine.answer", question=question) as span:
+                    try:
+                        with self._cursor(data) as svc:
+                            state = self._chat_state(svc, question, None, max_rows)
+                            state["query_memo"] = memo
+                            res = self._chat_graph.invoke(state)
+                        self._record_answer(res)
+                        return self._tag(res, span)
+                    except Exception as e:
+                        return {"user_query": question, "error": friendly_error(e)}
+
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="answer-many") as pool:
+                # Copy the context per task so question spans nest under the batch span.
+                futures = [pool.submit(contextvars.copy_context().run, run, q) for q in questions]
+                results = [f.result() for f in futures]
+            batch = {"questions": len(questions), **memo.stats()}
+            batch_span.set(**batch)
+            for res in results:
+                res.setdefault("telemetry", {})["batch"] = dict(batch)
+            return results
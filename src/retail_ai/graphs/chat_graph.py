@@ -1,53 +1,88 @@
 from __future__ import annotations
 
-import os
+import asyncio
+import json
 from typing import Any, Dict, List, TypedDict
 
-import pandas as pd
+import pyarrow as pa
+from langgraph.config import get_stream_writer
 from langgraph.graph import END, StateGraph
 
-from retail_ai.llm.gemini_client import GeminiChat
-from retail_ai.utils.config_loader import load_yaml
-from retail_ai.utils.helpers import df_to_markdown, extract_json
+from retail_ai.data_engine.query_limits import QueryLimits
 from retail_ai.data_engine.sql_builder import build_sql
+from retail_ai.graphs.fast_planner import rule_plan
+from retail_ai.graphs.followup import derivable, derive_sql, plan_followup
+from retail_ai.graphs.narration import anarrate, narrate
+from retail_ai.graphs.narration_templates import NarrationPolicy, template_answer
+from retail_ai.graphs.nodes import traced_node
+from retail_ai.llm.base import LLMClient
+from retail_ai.llm.factory import build_llm
+from retail_ai.llm.guard import LLMGuard
+from retail_ai.llm.prompt_budget import PromptBudget
+from retail_ai.llm.response_cache import ResponseCache
+from retail_ai.utils.config_loader import load_yaml
+from retail_ai.utils.helpers import arrow_to_df, extract_json
 from retail_ai.utils.validators import validate_plan, validate_sql_is_select
 
 
 class ChatState(TypedDict, total=False):
     user_query: str
-    schema: str
+    schema: str  # prompt rendering of schema_profile
+    schema_profile: Any  # SchemaProfile
     chat_history: List[Dict[str, str]]
     duckdb_service: Any  # DuckDBService
+    query_memo: Any  # QueryMemo, set for batches
+    session: Any  # ChatSession: previous turn, for follow-up questions
+    dataset_fingerprint: str
     max_rows: int
+    stream: bool
 
     plan: Dict[str, Any]
+    followup: Dict[str, Any]
     sql: str
-    result_df: pd.DataFrame
+    result_table: Any  # pyarrow.Table, as fetched (or cached); converted only where needed
     answer: str
     warnings: List[str]
+    caveats: List[str]  # validator adjustments the answer should mention
+    telemetry: Dict[str, Any]
 
 
-def _schema_cols(schema_md: str):
-    cols: List[str] = []
-    for line in (schema_md or "").splitlines():
-        if line.startswith("- "):
-            cols.append(line[2:].split(" (dtype=")[0].strip())
-    return cols
+def _profile(state: ChatState):
+    profile = state.get("schema_profile")
+    if profile is None:
+        svc = state.get("duckdb_service")
+        if svc is None:
+            raise RuntimeError("duckdb_service missing in state")
+        profile = state["schema_profile"] = svc.schema_profile()
+    return profile
 
 
 def build_chat_graph(
-    cfg_path: str = "config/model_config.yaml", prompts_path: str = "config/prompt_templates.yaml"
+    cfg_path: str = "config/model_config.yaml",
+    prompts_path: str = "config/prompt_templates.yaml",
+    llm_cache: ResponseCache | None = None,
+    llm_guard: LLMGuard | None = None,
+    llm: LLMClient | None = None,
 ):
     cfg = load_yaml(cfg_path)
     prompts = load_yaml(prompts_path)
 
-    model = os.getenv("GEMINI_MODEL", cfg.get("llm", {}).get("model", "gemini-2.5-flash"))
-    temperature = float(os.getenv("TEMPERATURE", cfg.get("llm", {}).get("temperature", 0.1)))
-
     planner_tokens = int(cfg.get("llm", {}).get("max_output_tokens", {}).get("planner", 900))
     narrator_tokens = int(cfg.get("llm", {}).get("max_output_tokens", {}).get("narrator", 900))
 
-    llm = GeminiChat(model=model, temperature=temperature)
+    if llm is None:
+        llm = build_llm(
+            cfg,
+            cache=llm_cache if llm_cache is not None else ResponseCache.from_config(cfg),
+            guard=llm_guard if llm_guard is not None else LLMGuard.from_config(cfg),
+            budget=PromptBudget.from_config(cfg),
+        )
+    use_rollup = bool(cfg.get("rollup", {}).get("enabled", True))
+    fast_path = bool(cfg.get("planner", {}).get("fast_path", True))
+    fast_path_min_confidence = float(cfg.get("planner", {}).get("fast_path_min_confidence", 1.0))
+    followups = bool(cfg.get("planner", {}).get("followups", True))
+    narration = NarrationPolicy.from_config(cfg)
+    limits = QueryLimits.from_config(cfg)
 
     few_shots = [
         '{"q":"Top categories by shipped revenue","hint":"metrics=[shipped_amount], group_by=[Category], sort shipped_amount desc"}',
@@ -55,60 +90,207 @@ def build_chat_graph(
         '{"q":"Service level comparison","hint":"metrics=[shipped_amount], group_by=[ship-service-level]"}',
     ]
 
-    def planner(state: ChatState):
+    def _fast_plan(state: ChatState):
+        """Try the follow-up merger, then the rule planner; returns True when one produced the plan."""
+        state.setdefault("warnings", [])
+        telemetry = state.setdefault("telemetry", {})
+        svc = state.get("duckdb_service")
+        session = state.get("session")
+        if followups and session is not None:
+            bounds = svc.date_bounds() if svc is not None else None
+            merged = plan_followup(
+                state.get("user_query") or "",
+                session,
+                _profile(state),
+                state.get("dataset_fingerprint"),
+                bounds,
+            )
+            if merged is not None:
+                state["plan"], state["followup"] = merged
+                telemetry["planner"] = "followup"
+                telemetry["followup"] = merged[1]["kinds"]
+                state["warnings"].append(
+                    "Read as a refinement of the previous question (no planner call)."
+                )
+                return True
+        if fast_path:
+            bounds = svc.date_bounds() if svc is not None else None
+            plan, confidence = rule_plan(
+                state.get("user_query") or "", _profile(state).names, date_bounds=bounds
+            )
+            telemetry["planner_confidence"] = round(confidence, 3)
+            if plan is not None and confidence >= fast_path_min_confidence:
+                telemetry["planner"] = "fast_path"
+                state["plan"] = plan
+                state["warnings"].append(
+                    "Plan produced by the fast-path rule planner (no LLM call)."
+                )
+                return True
+        telemetry["planner"] = "llm"
+        return False
+
+    def _planner_msgs(state: ChatState):
         msgs = [
             {"role": "system", "content": prompts.get("system_guardrails", "")},
             {"role": "system", "content": "You are the Planner agent."},
             {"role": "system", "content": prompts.get("planner_instructions", "")},
             {"role": "system", "content": "SCHEMA\n" + (state.get("schema") or "")},
             {"role": "system", "content": "FEW_SHOT_HINTS\n" + "\n".join(few_shots)},
-            {"role": "user", "content": state.get("user_query") or ""},
         ]
-        out = llm.complete(msgs, max_output_tokens=planner_tokens)
+        session = state.get("session")
+        prev = session.previous(state.get("dataset_fingerprint")) if session is not None else None
+        if prev is not None:
+            # Lets the LLM resolve follow-ups the rules could not ("and the worst ones?").
+            previous = {"question": session.question, "plan": prev[0]}
+            msgs.append(
+                {"role": "system", "content": "PREVIOUS_TURN\n" + json.dumps(previous, default=str)}
+            )
+        msgs.append({"role": "user", "content": state.get("user_query") or ""})
+        return msgs
+
+    def planner(state: ChatState):
+        if _fast_plan(state):
+            return state
+        out = llm.complete(
+            _planner_msgs(state),
+            max_output_tokens=planner_tokens,
+            stage="planner",
+            cache_scope=state.get("dataset_fingerprint"),
+        )
+        state["plan"] = extract_json(out)
+        return state
+
+    async def aplanner(state: ChatState):
+        if _fast_plan(state):
+            return state
+        out = await llm.acomplete(
+            _planner_msgs(state),
+            max_output_tokens=planner_tokens,
+            stage="planner",
+            cache_scope=state.get("dataset_fingerprint"),
+        )
         state["plan"] = extract_json(out)
-        state.setdefault("warnings", [])
         return state
 
     def validator(state: ChatState):
-        schema_cols = _schema_cols(state.get("schema") or "")
-        plan, warns = validate_plan(state.get("plan") or {}, schema_cols)
+        profile = _profile(state)
+        plan, warns = validate_plan(
+            state.get("plan") or {}, profile, max_limit=limits.max_result_rows
+        )
+        plan["filters"], filter_warns = profile.validate_filters(plan["filters"])
+        # Too many estimated groups: coarsened / narrowed here (or QueryRejected).
+        plan, budget_warns = limits.check_plan(plan, profile)
+        adjusted = filter_warns + budget_warns
+        if adjusted:
+            # The narrator sees the plan, so it can say which filters / groupings were adjusted.
+            plan["notes"] = "; ".join([n for n in [plan.get("notes")] if n] + adjusted)
         state["plan"] = plan
-        state.setdefault("warnings", []).extend(warns)
+        state.setdefault("warnings", []).extend(warns + adjusted)
+        state["caveats"] = warns + adjusted
         return state
 
     def extractor(state: ChatState):
         svc = state.get("duckdb_service")
         if svc is None:
             raise RuntimeError("duckdb_service missing in state")
-        schema_cols = _schema_cols(state.get("schema") or "")
-        sql = build_sql(state.get("plan") or {}, schema_cols)
-        validate_sql_is_select(sql)
-        df = svc.query_df(sql)
+        plan = state.get("plan") or {}
+        session = state.get("session")
+        prev = session.previous(state.get("dataset_fingerprint")) if session is not None else None
+        if state.get("followup") and prev is not None and derivable(plan, *prev):
+            # Exact from the previous answer's rows: no scan of the dataset.
+            sql = derive_sql(plan, prev[0])
+            validate_sql_is_select(sql)
+            table = svc.query_frames(sql, previous_result=prev[1])
+            state.setdefault("telemetry", {})["followup_source"] = "previous_result"
+        else:
+            rollup = getattr(svc, "rollup", None) if use_rollup else None
+            sql = build_sql(plan, _profile(state), rollup=rollup, max_rows=limits.max_result_rows)
+            validate_sql_is_select(sql)
+            memo = state.get("query_memo")
+            if memo is not None:
+                table, shared = memo.run(
+                    sql, lambda: svc.query_arrow(sql, max_rows=limits.max_result_rows)
+                )
+                state.setdefault("telemetry", {})["sql_shared"] = shared
+            else:
+                table = svc.query_arrow(sql, max_rows=limits.max_result_rows)
+            if state.get("followup"):
+                state.setdefault("telemetry", {})["followup_source"] = "query"
+        if session is not None:
+            session.remember(
+                state.get("dataset_fingerprint"), state.get("user_query") or "", plan, sql, table
+            )
         state["sql"] = sql
-        state["result_df"] = df
+        state["result_table"] = table
         return state
 
-    def narrator(state: ChatState):
-        df = state.get("result_df")
+    def _narrator_msgs(state: ChatState):
+        table = state.get("result_table")
         max_rows = int(state.get("max_rows") or 10)
-        md = df_to_markdown(df, max_rows=max_rows) if isinstance(df, pd.DataFrame) else str(df)
-        msgs = [
+        if isinstance(table, pa.Table):
+            # Only the rows the prompt shows leave Arrow.
+            rows = arrow_to_df(table.slice(0, max_rows))
+            result = {"role": "system", "content": "RESULT_TABLE (CSV)", "table": rows}
+        else:
+            result = {"role": "system", "content": "RESULT_TABLE\n" + str(table)}
+        plan_json = json.dumps(state.get("plan"), separators=(",", ":"), default=str)
+        return [
             {"role": "system", "content": prompts.get("system_guardrails", "")},
             {"role": "system", "content": "You are the Narrator agent."},
             {"role": "system", "content": prompts.get("narrator_instructions", "")},
             {"role": "system", "content": "USER_QUESTION\n" + (state.get("user_query") or "")},
-            {"role": "system", "content": "PLAN_JSON\n" + str(state.get("plan"))},
+            {"role": "system", "content": "PLAN_JSON\n" + plan_json},
             {"role": "system", "content": "SQL\n" + (state.get("sql") or "")},
-            {"role": "system", "content": "RESULT_TABLE\n" + md},
+            result,
         ]
-        state["answer"] = llm.complete(msgs, max_output_tokens=narrator_tokens)
+
+    def _template(state: ChatState):
+        """Templated answer for simple result shapes (no LLM call); True when used."""
+        text = template_answer(
+            state.get("user_query") or "",
+            state.get("plan") or {},
+            state.get("result_table"),
+            narration,
+            caveats=state.get("caveats"),
+        )
+        telemetry = state.setdefault("telemetry", {})
+        telemetry["narrator"] = "llm" if text is None else "template"
+        if text is None:
+            return False
+        state["answer"] = text
+        if state.get("stream"):
+            get_stream_writer()({"stage": "narrator", "token": text})
+        return True
+
+    def narrator(state: ChatState):
+        if _template(state):
+            return state
+        msgs = _narrator_msgs(state)
+        state["answer"] = narrate(
+            llm, msgs, state, stage="narrator", max_output_tokens=narrator_tokens
+        )
         return state
 
+    async def anarrator(state: ChatState):
+        if _template(state):
+            return state
+        msgs = _narrator_msgs(state)
+        state["answer"] = await anarrate(
+            llm, msgs, state, stage="narrator", max_output_tokens=narrator_tokens
+        )
+        return state
+
+    async def aextractor(state: ChatState):
+        # DuckDB calls block; keep them off the event loop.
+        return await asyncio.to_thread(extractor, state)
+
     g = StateGraph(ChatState)
-    g.add_node("planner", planner)
-    g.add_node("validator", validator)
-    g.add_node("extractor", extractor)
-    g.add_node("narrator", narrator)
+    # Each node has a sync and an async body: invoke() runs the former,
+    # ainvoke() the latter (non-blocking LLM calls under the shared guard).
+    g.add_node("planner", traced_node("planner", planner, aplanner))
+    g.add_node("validator", traced_node("validator", validator))
+    g.add_node("extractor", traced_node("extractor", extractor, aextractor))
+    g.add_node("narrator", traced_node("narrator", narrator, anarrator))
     g.set_entry_point("planner")
     g.add_edge("planner", "validator")
     g.add_edge("validator", "extractor")
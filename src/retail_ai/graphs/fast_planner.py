@@ -0,0 +1,387 @@
+from __future__ import annotations
+
+import calendar
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Collection, Dict, List, Tuple
+
+# Deterministic planner for common question shapes ("top 5 categories by shipped
+# revenue", "cancellation rate by state in May"). It returns a plan in the shape
+# validate_plan() accepts plus a confidence score: the share of question tokens it
+# understood. Anything it cannot account for (e.g. a value filter such as a state
+# name) lowers confidence so the LLM planner handles the question instead.
+# parse_question() is the shared scanner; graphs.followup also uses it, with value
+# phrases from the column dictionaries, to read refinements of the previous plan.
+
+METRIC_PHRASES = {
+    "shipped_amount": [
+        "shipped revenue",
+        "shipped sales",
+        "shipped amount",
+        "shipped value",
+        "net sales",
+        "revenue",
+        "sales",
+        "sales value",
+    ],
+    "gross_amount": [
+        "gross revenue",
+        "gross sales",
+        "gross amount",
+        "gross value",
+        "gmv",
+        "total amount",
+    ],
+    "cancelled_amount": [
+        "cancelled amount",
+        "cancelled revenue",
+        "cancelled sales",
+        "cancelled value",
+        "cancellation amount",
+        "cancellation value",
+        "canceled amount",
+        "canceled revenue",
+    ],
+    "orders": ["orders", "order count", "number of orders", "order volume"],
+    "units": ["units", "units sold", "quantity", "qty", "items sold"],
+    "cancel_rate": [
+        "cancellation rate",
+        "cancel rate",
+        "cancellation ratio",
+        "cancellation percentage",
+        "canceled rate",
+        "cancelled rate",
+        "cancellation rates",
+    ],
+}
+
+DIMENSION_ALIASES = {
+    "Category": ["category", "categories", "product category", "product categories"],
+    "ship-state": ["state", "states", "ship state", "shipping state"],
+    "ship-city": ["city", "cities", "ship city", "shipping city"],
+    "Fulfilment": ["fulfilment", "fulfillment", "fulfilment channel", "fulfillment channel"],
+    "ship-service-level": [
+        "service level",
+        "service levels",
+        "ship service level",
+        "shipping service level",
+    ],
+}
+
+# Measures and identifiers are never grouping dimensions for the fast path.
+NON_DIMENSIONS = {"Amount", "Qty", "Date", "Order ID", "index"}
+
+STOPWORDS = {
+    "a",
+    "an",
+    "the",
+    "of",
+    "by",
+    "per",
+    "for",
+    "in",
+    "on",
+    "during",
+    "what",
+    "whats",
+    "is",
+    "are",
+    "was",
+    "were",
+    "which",
+    "show",
+    "me",
+    "list",
+    "give",
+    "get",
+    "and",
+    "each",
+    "total",
+    "overall",
+    "across",
+    "with",
+    "has",
+    "have",
+    "how",
+    "much",
+    "many",
+    "wise",
+    "breakdown",
+    "split",
+    "all",
+    "my",
+    "our",
+    "us",
+    "tell",
+    "to",
+    "compare",
+    "comparison",
+    "do",
+    "does",
+    "did",
+    "ranked",
+    "rank",
+}
+
+ORDER_WORDS = {
+    "top": "desc",
+    "highest": "desc",
+    "most": "desc",
+    "best": "desc",
+    "largest": "desc",
+    "biggest": "desc",
+    "bottom": "asc",
+    "lowest": "asc",
+    "least": "asc",
+    "worst": "asc",
+    "smallest": "asc",
+    "fewest": "asc",
+}
+
+_MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_name) if name}
+_MONTHS.update({name.lower(): i for i, name in enumerate(calendar.month_abbr) if name})
+_MONTHS["sept"] = 9
+
+GRAIN_WORDS = {
+    "day": "day",
+    "daily": "day",
+    "week": "week",
+    "weekly": "week",
+    "month": "month",
+    "monthly": "month",
+    "quarter": "quarter",
+    "quarterly": "quarter",
+}
+
+
+def _tokenize(text: str):
+    text = re.sub(r"[-_/]", " ", (text or "").lower())
+    text = re.sub(r"[^a-z0-9' ]", " ", text)
+    # Apostrophes go ("women's" -> "womens") except in a two-digit year ("'22").
+    text = re.sub(r"'(?!\d\d(?!\d))", "", text)
+    return text.split()
+
+
+def _phrase_table(schema_cols: List[str]):
+    table: List[Tuple[List[str], str, str]] = []
+    for metric, phrases in METRIC_PHRASES.items():
+        for p in phrases:
+            table.append((p.split(), "metric", metric))
+    for col in schema_cols:
+        if col in NON_DIMENSIONS:
+            continue
+        aliases = list(DIMENSION_ALIASES.get(col, []))
+        aliases.append(" ".join(_tokenize(col)))
+        for p in set(aliases):
+            if p:
+                table.append((p.split(), "dim", col))
+    # Longest phrases first so "shipped revenue" wins over "revenue".
+    table.sort(key=lambda t: -len(t[0]))
+    return table
+
+
+def _month_range(year: int, month: int):
+    last = calendar.monthrange(year, month)[1]
+    return date(year, month, 1).isoformat(), date(year, month, last).isoformat()
+
+
+def _resolve_year(month: int, date_bounds: Tuple[Any, Any] | None):
+    """Latest year in the dataset that contains ``month``."""
+    if not date_bounds or date_bounds[0] is None or date_bounds[1] is None:
+        return None
+    lo, hi = date_bounds
+    for year in range(hi.year, lo.year - 1, -1):
+        first, last = _month_range(year, month)
+        if date.fromisoformat(last) >= lo and date.fromisoformat(first) <= hi:
+            return year
+    return None
+
+
+@dataclass
+class ParsedQuestion:
+    """What the rule scanner recognised in a question (see parse_question)."""
+
+    tokens: List[str]
+    understood: List[bool]
+    metrics: List[str] = field(default_factory=list)
+    group_by: List[str] = field(default_factory=list)
+    filters: Dict[str, List[str]] = field(default_factory=dict)
+    order: str | None = None
+    limit: int | None = None
+    time: Dict[str, Any] | None = None  # None when the question names no period
+    time_grain: str | None = None
+    notes: List[str] = field(default_factory=list)
+    unresolved_time: bool = False
+
+    @property
+    def confidence(self):
+        return sum(self.understood) / len(self.understood) if self.understood else 0.0
+
+
+def _match_phrase(p: ParsedQuestion, tokens: List[str], i: int, table):
+    """Record the longest phrase of ``table`` starting at ``tokens[i]``; its length (0 if none)."""
+    for words, kind, target in table:
+        n = len(words)
+        if tokens[i : i + n] == words:
+            if kind == "metric" and target not in p.metrics:
+                p.metrics.append(target)
+            elif kind == "dim" and target not in p.group_by:
+                p.group_by.append(target)
+            elif kind == "value" and target[1] not in p.filters.setdefault(target[0], []):
+                p.filters[target[0]].append(target[1])
+            for j in range(i, i + n):
+                p.understood[j] = True
+            return n
+    return 0
+
+
+def parse_question(
+    question: str,
+    schema_cols: List[str],
+    date_bounds: Tuple[Any, Any] | None = None,
+    values: List[Tuple[List[str], str, str]] | None = None,
+    extra_words: Collection[str] = (),
+):
+    """Scan ``question`` for metrics, dimensions, order/limit, periods and time grains.
+
+    ``values`` are ``(words, column, value)`` phrases recognised as filters;
+    ``extra_words`` count as understood (like stopwords).
+    """
+    tokens = _tokenize(question)
+    value_table = [(words, "value", (col, v)) for words, col, v in values or []]
+    value_table.sort(key=lambda t: -len(t[0]))
+    table = _phrase_table(schema_cols) + value_table
+    table.sort(key=lambda t: -len(t[0]))
+    p = ParsedQuestion(tokens=tokens, understood=[False] * len(tokens))
+
+    i = 0
+    while i < len(tokens):
+        tok = tokens[i]
+
+        # A column value that is also an order word ("Top" is a Category) is a
+        # filter, unless a count follows ("top 3").
+        if tok in ORDER_WORDS and not (i + 1 < len(tokens) and tokens[i + 1].isdigit()):
+            n = _match_phrase(p, tokens, i, value_table)
+            if n:
+                i += n
+                continue
+
+        # top N / bottom N / highest ...
+        if tok in ORDER_WORDS:
+            p.order = ORDER_WORDS[tok]
+            p.understood[i] = True
+            if i + 1 < len(tokens) and tokens[i + 1].isdigit():
+                p.limit = int(tokens[i + 1])
+                p.understood[i + 1] = True
+                i += 1
+            i += 1
+            continue
+
+        # last quarter / last month (anchored to the latest date in the data)
+        if (
+            tok in ("last", "latest", "recent")
+            and i + 1 < len(tokens)
+            and tokens[i + 1] in ("quarter", "month")
+        ):
+            p.understood[i] = p.understood[i + 1] = True
+            if date_bounds and date_bounds[1] is not None:
+                hi = date_bounds[1]
+                if tokens[i + 1] == "quarter":
+                    q_start = 3 * ((hi.month - 1) // 3) + 1
+                    p.time = {
+                        "from": _month_range(hi.year, q_start)[0],
+                        "to": _month_range(hi.year, q_start + 2)[1],
+                    }
+                else:
+                    p.time = {
+                        "from": _month_range(hi.year, hi.month)[0],
+                        "to": _month_range(hi.year, hi.month)[1],
+                    }
+                p.notes.append(
+                    f"'last {tokens[i + 1]}' taken as the latest {tokens[i + 1]} in the data"
+                )
+            else:
+                p.unresolved_time = True
+            i += 2
+            continue
+
+        # <month> [year]; "may" only counts as a month after in/for/during
+        if tok in _MONTHS and (
+            tok != "may" or (i > 0 and tokens[i - 1] in ("in", "for", "during", "of"))
+        ):
+            month = _MONTHS[tok]
+            p.understood[i] = True
+            year = None
+            # "May 2022" or "May '22"; a bare "May 10" is left unrecognised (a day?).
+            if i + 1 < len(tokens) and re.fullmatch(r"(19|20)\d\d|'\d\d", tokens[i + 1]):
+                y = int(tokens[i + 1].lstrip("'"))
+                year = y if y >= 100 else 2000 + y
+                p.understood[i + 1] = True
+                i += 1
+            year = year or _resolve_year(month, date_bounds)
+            if year is None:
+                p.unresolved_time = True
+            else:
+                p.time = {"from": _month_range(year, month)[0], "to": _month_range(year, month)[1]}
+            i += 1
+            continue
+
+        # "by month", "per week", "monthly"
+        if tok in GRAIN_WORDS and (
+            tok.endswith("ly") or (i > 0 and tokens[i - 1] in ("by", "per", "each", "every"))
+        ):
+            p.time_grain = GRAIN_WORDS[tok]
+            p.understood[i] = True
+            i += 1
+            continue
+
+        n = _match_phrase(p, tokens, i, table)
+        if n:
+            i += n
+            continue
+
+        if tok in STOPWORDS or tok in extra_words:
+            p.understood[i] = True
+        i += 1
+    return p
+
+
+def rule_plan(question: str, schema_cols: List[str], date_bounds: Tuple[Any, Any] | None = None):
+    """Return ``(plan | None, confidence)`` for ``question``.
+
+    ``date_bounds`` is the dataset's (min, max) order date; it anchors "in May" and
+    "last quarter" since the data is historical.
+    """
+    p = parse_question(question, schema_cols, date_bounds)
+    if not p.tokens:
+        return None, 0.0
+
+    metrics, notes = p.metrics, p.notes
+    if not metrics and (p.group_by or p.time_grain):
+        # e.g. "service level comparison": same default as the LLM planner's rules
+        metrics = ["shipped_amount"]
+        notes.append("no metric named; defaulted to shipped_amount")
+    if not metrics or p.unresolved_time:
+        return None, p.confidence
+
+    if p.time_grain:
+        # Periods in date order; a time series is not cut at the default top-10.
+        sort = [{"by": p.time_grain, "order": "asc"}]
+        limit = p.limit or 200
+    else:
+        sort = [{"by": metrics[0], "order": p.order or "desc"}] if p.group_by else []
+        limit = p.limit or 10
+    plan: Dict[str, Any] = {
+        "intent": "qa",
+        "metrics": metrics,
+        "group_by": p.group_by,
+        "filters": {},
+        "time": p.time or {"from": None, "to": None},
+        "sort": sort,
+        "limit": limit,
+        "notes": "; ".join(["fast-path rule planner"] + notes),
+    }
+    if p.time_grain:
+        plan["time_grain"] = p.time_grain
+    return plan, p.confidence
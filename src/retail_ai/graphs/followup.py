@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import copy
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+import pandas as pd
+import pyarrow as pa
+
+from retail_ai.data_engine.sql_builder import SAFE_METRICS, TIME_GRAINS, _sql_literal
+from retail_ai.graphs.fast_planner import _tokenize, parse_question
+
+# Follow-up questions ("now only Maharashtra", "split that by month", "what about
+# orders?") are read as a delta on the previous turn's validated plan instead of
+# being planned from scratch. The merged plan either runs over the previous
+# result itself (registered as ``previous_result``) when that is exact, or as a
+# regular query narrowed to the previous answer's rows.
+
+# Words that mark a question as a refinement of the previous answer. Without one,
+# only a bare value, period or "top N" is (a question naming a metric, a dimension
+# or a time grain is planned as a new question).
+SIGNAL_WORDS = {
+    "now",
+    "only",
+    "just",
+    "instead",
+    "rather",
+    "that",
+    "those",
+    "these",
+    "them",
+    "same",
+    "also",
+    "too",
+    "split",
+    "break",
+    "again",
+    "then",
+}
+SIGNAL_PHRASES = (("what", "about"), ("how", "about"), ("and", "by"), ("and", "for"), ("and", "in"))
+# Further words a follow-up may contain without lowering the scanner's confidence.
+REFINE_WORDS = SIGNAL_WORDS | {
+    "about",
+    "it",
+    "this",
+    "down",
+    "into",
+    "out",
+    "please",
+    "filter",
+    "plus",
+    "but",
+}
+ADDING_WORDS = {"also", "too", "plus"}
+SPLITTING_WORDS = {"split", "break", "down", "also", "too", "plus", "each"}
+
+# Metrics whose group values add up to the coarser group's value.
+ADDITIVE_METRICS = {"gross_amount", "shipped_amount", "cancelled_amount", "units"}
+MAX_LIMIT = 200
+
+
+@dataclass
+class ChatSession:
+    """The previous turn of one chat session: its question, validated plan, SQL
+    and result. Held by the caller (one per user session) and passed to
+    ``RetailAssistantEngine.answer(..., session=...)``; the engine itself stays
+    shared and stateless."""
+
+    fingerprint: str | None = None
+    question: str | None = None
+    plan: Dict[str, Any] | None = None
+    sql: str | None = None
+    result: pa.Table | None = None
+    _lock: Any = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def remember(
+        self, fingerprint: str | None, question: str, plan: Dict[str, Any], sql: str, result: Any
+    ):
+        if not isinstance(result, pa.Table):
+            return
+        with self._lock:
+            self.fingerprint = fingerprint
+            self.question = question
+            self.plan = copy.deepcopy(plan)
+            self.sql = sql
+            self.result = result
+
+    def previous(self, fingerprint: str | None):
+        """``(plan, result)`` of the previous turn on this dataset, or None."""
+        with self._lock:
+            if self.plan is None or self.result is None or fingerprint != self.fingerprint:
+                return None
+            return copy.deepcopy(self.plan), self.result
+
+    def clear(self):
+        with self._lock:
+            self.fingerprint = self.question = self.plan = self.sql = self.result = None
+
+
+def _complete(plan: Dict[str, Any], result: pa.Table):
+    """True when ``result`` holds every group of ``plan`` (the limit did not cut it)."""
+    return result.num_rows < int(plan.get("limit") or 10)
+
+
+def value_phrases(profile: Any):
+    """``(words, column, value)`` for every dictionary value of the profile's text
+    columns, so a bare "Maharashtra" or "Amazon" reads as a filter."""
+    out: List[Tuple[List[str], str, str]] = []
+    for name, col in profile.columns.items():
+        for v in col.dictionary or ():
+            words = _tokenize(v)
+            if words and len(" ".join(words)) > 1:
+                out.append((words, name, v))
+    return out
+
+
+def plan_followup(
+    question: str, session: ChatSession, profile: Any, fingerprint: str | None, date_bounds=None
+):
+    """Merge ``question`` into the session's previous plan.
+
+    Returns ``(plan, info)`` when the question is a refinement that the rule
+    scanner fully understood, else None (it is then planned as a new question).
+    ``info["kinds"]`` lists what changed (filter, metric, split, regroup, time,
+    rerank).
+    """
+    prev = session.previous(fingerprint)
+    if prev is None:
+        return None
+    prev_plan, prev_result = prev
+    p = parse_question(
+        question,
+        profile.names,
+        date_bounds,
+        values=value_phrases(profile),
+        extra_words=REFINE_WORDS,
+    )
+    if not p.tokens or p.confidence < 1.0 or p.unresolved_time:
+        return None
+    markers = set(p.tokens)
+    pairs = set(zip(p.tokens, p.tokens[1:]))
+    signal = (
+        bool(markers & SIGNAL_WORDS)
+        or any(ph in pairs for ph in SIGNAL_PHRASES)
+        or p.tokens[0] in ("and", "but")
+    )
+    if not signal and (p.metrics or p.group_by or p.time_grain):
+        return None  # a new question ("orders by city", "top categories", "units in May")
+    if not (p.metrics or p.group_by or p.filters or p.time or p.time_grain or p.order or p.limit):
+        return None
+
+    plan = prev_plan
+    kinds: List[str] = []
+    prev_groups = list(prev_plan.get("group_by") or [])
+    if p.metrics:
+        if markers & ADDING_WORDS or p.tokens[0] == "and":
+            plan["metrics"] = plan["metrics"] + [m for m in p.metrics if m not in plan["metrics"]]
+        else:
+            plan["metrics"] = p.metrics
+        kinds.append("metric")
+    if p.group_by:
+        if markers & SPLITTING_WORDS and not markers & {"instead", "rather"}:
+            plan["group_by"] = prev_groups + [c for c in p.group_by if c not in prev_groups]
+            kinds.append("split")
+        else:  # "by city", "by city instead"
+            plan["group_by"] = p.group_by
+            kinds.append("regroup")
+    if p.time_grain and p.time_grain != prev_plan.get("time_grain"):
+        plan["time_grain"] = p.time_grain
+        kinds.append("split")
+    if p.filters:
+        filters = dict(plan.get("filters") or {})
+        for col, vals in p.filters.items():
+            filters[col] = vals[0] if len(vals) == 1 else vals
+        plan["filters"] = filters
+        kinds.append("filter")
+    if p.time:
+        plan["time"] = p.time
+        kinds.append("time")
+    if p.order or p.limit:
+        kinds.append("rerank")
+
+    metric = plan["metrics"][0]
+    prev_sort = prev_plan.get("sort") or []
+    order = p.order or next(
+        (s.get("order") for s in prev_sort if s.get("by") in SAFE_METRICS), "desc"
+    )
+    if "split" in kinds or "regroup" in kinds:
+        plan["limit"] = p.limit or MAX_LIMIT
+        if "split" in kinds and prev_groups and not _complete(prev_plan, prev_result):
+            _narrow_to_previous(plan, prev_groups, prev_result)
+    elif p.limit:
+        plan["limit"] = p.limit
+    if plan.get("time_grain") in TIME_GRAINS and ("split" in kinds or not plan.get("group_by")):
+        plan["sort"] = [{"by": plan["time_grain"], "order": "asc"}, {"by": metric, "order": order}]
+    elif "metric" in kinds or p.order or "regroup" in kinds or not prev_sort:
+        plan["sort"] = [{"by": metric, "order": order}]
+
+    plan["notes"] = f"follow-up to {session.question!r}: {', '.join(kinds)}"
+    return plan, {"kinds": kinds, "previous_question": session.question}
+
+
+def _narrow_to_previous(plan: Dict[str, Any], prev_groups: List[str], prev_result: pa.Table):
+    """Keep a split to the previous answer's groups ("top 5 categories" split by
+    month stays those 5 categories). Only for a single grouping column."""
+    if (
+        len(prev_groups) != 1
+        or prev_groups[0] not in prev_result.column_names
+        or prev_groups[0] in plan["filters"]
+    ):
+        return
+    keys = [
+        v
+        for v in prev_result.column(prev_groups[0]).to_pylist()
+        if v is not None and not pd.isna(v)
+    ]
+    if keys:
+        plan["filters"] = {**(plan.get("filters") or {}), prev_groups[0]: [str(k) for k in keys]}
+
+
+def derivable(plan: Dict[str, Any], prev_plan: Dict[str, Any], prev_result: pa.Table):
+    """True when ``plan``'s answer can be computed exactly from the previous result."""
+    if (plan.get("time") or {}) != (prev_plan.get("time") or {}):
+        return False
+    if plan.get("time_grain") != prev_plan.get("time_grain"):
+        return False
+    metrics, groups = plan.get("metrics") or [], plan.get("group_by") or []
+    prev_groups = prev_plan.get("group_by") or []
+    if not set(metrics) <= set(prev_plan.get("metrics") or []) or not set(groups) <= set(
+        prev_groups
+    ):
+        return False
+    if any(c not in prev_result.column_names for c in list(groups) + list(metrics)):
+        return False
+
+    filters, prev_filters = plan.get("filters") or {}, prev_plan.get("filters") or {}
+    if any(filters.get(col) != val for col, val in prev_filters.items()):
+        return False  # a previous filter was removed or changed
+    added = {c: v for c, v in filters.items() if c not in prev_filters}
+    if any(c not in prev_groups for c in added):
+        return False
+    keys = ([plan["time_grain"]] if plan.get("time_grain") else []) + list(groups)
+    if any(s.get("by") not in keys + list(metrics) for s in plan.get("sort") or []):
+        return False
+    regroup = len(groups) < len(prev_groups)
+    if regroup and not set(metrics) <= ADDITIVE_METRICS:
+        return False
+    if added or regroup:
+        return _complete(prev_plan, prev_result)
+    # Same rows, re-sorted or cut shorter: a prefix of the previous ranking, or any
+    # order of a complete result.
+    same_order = (plan.get("sort") or []) == (prev_plan.get("sort") or [])
+    return _complete(prev_plan, prev_result) or (
+        same_order and int(plan.get("limit") or 10) <= prev_result.num_rows
+    )
+
+
+def derive_sql(plan: Dict[str, Any], prev_plan: Dict[str, Any], relation: str = "previous_result"):
+    """SELECT over the previous result (see ``derivable``) that yields ``plan``'s answer."""
+    groups = plan.get("group_by") or []
+    grain = plan.get("time_grain")
+    keys = ([grain] if grain else []) + list(groups)
+    regroup = len(groups) < len(prev_plan.get("group_by") or [])
+    select = [f'"{k}"' for k in keys]
+    for m in plan.get("metrics") or []:
+        select.append(f'SUM("{m}") AS "{m}"' if regroup else f'"{m}"')
+
+    where: List[str] = []
+    for col, val in (plan.get("filters") or {}).items():
+        if col in (prev_plan.get("filters") or {}):
+            continue  # already applied to the previous result
+        if isinstance(val, list):
+            where.append(f'"{col}" IN ({",".join(_sql_literal(v) for v in val)})')
+        else:
+            where.append(f'"{col}" = {_sql_literal(val)}')
+
+    sql = "SELECT " + ", ".join(select) + f"\nFROM {relation}\n"
+    if where:
+        sql += "WHERE " + " AND ".join(where) + "\n"
+    if regroup and keys:
+        sql += "GROUP BY " + ", ".join(f'"{k}"' for k in keys) + "\n"
+    order = [
+        f'"{s["by"]}" {(s.get("order") or "desc").upper()}'
+        for s in plan.get("sort") or []
+        if s.get("by") in keys or s.get("by") in (plan.get("metrics") or [])
+    ]
+    if order:
+        sql += "ORDER BY " + ", ".join(order) + "\n"
+    sql += f"LIMIT {max(1, min(int(plan.get('limit') or 10), MAX_LIMIT))}"
+    return sql
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+from langgraph.config import get_stream_writer
+
+
+def narrate(
+    llm: Any, msgs: List[Dict[str, str]], state: Dict[str, Any], stage: str, max_output_tokens: int
+):
+    """Run a narrator LLM call.
+
+    When the graph runs with ``state["stream"]`` set, text chunks are emitted to the
+    LangGraph custom stream as ``{"stage": ..., "token": ...}`` while generating.
+    """
+    kwargs = {
+        "max_output_tokens": max_output_tokens,
+        "stage": stage,
+        "cache_scope": state.get("dataset_fingerprint"),
+    }
+    if not state.get("stream"):
+        return llm.complete(msgs, **kwargs)
+
+    writer = get_stream_writer()
+    parts: List[str] = []
+    for text in llm.stream(msgs, **kwargs):
+        parts.append(text)
+        writer({"stage": stage, "token": text})
+    return "".join(parts).strip()
+
+
+async def anarrate(
+    llm: Any, msgs: List[Dict[str, str]], state: Dict[str, Any], stage: str, max_output_tokens: int
+):
+    """Async ``narrate``; when streaming, the full text is emitted as one chunk."""
+    text = await llm.acomplete(
+        msgs,
+        max_output_tokens=max_output_tokens,
+        stage=stage,
+        cache_scope=state.get("dataset_fingerprint"),
+    )
+    if state.get("stream"):
+        get_stream_writer()({"stage": stage, "token": text})
+    return text
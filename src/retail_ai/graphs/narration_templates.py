@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+import pandas as pd
+import pyarrow as pa
+
+from retail_ai.graphs.followup import ADDITIVE_METRICS
+from retail_ai.utils.helpers import arrow_to_df
+
+# Deterministic answers for result shapes that need no LLM: an empty result, a
+# single value, a top-N ranking and a two-group comparison. template_answer()
+# returns None for anything else (several grouping columns, time series, "why"
+# questions, a grouped result not sorted on its metric), and the chat narrator
+# then calls the LLM as before.
+
+SHAPES = ("empty", "scalar", "ranking", "comparison")
+
+METRIC_LABELS = {
+    "shipped_amount": "shipped revenue",
+    "gross_amount": "gross sales",
+    "cancelled_amount": "cancelled amount",
+    "orders": "orders",
+    "units": "units sold",
+    "cancel_rate": "cancellation rate",
+}
+COUNT_METRICS = {"orders", "units"}
+RATE_METRICS = {"cancel_rate"}
+
+
+@dataclass(frozen=True)
+class NarrationPolicy:
+    """Which result shapes the chat narrator answers from templates (``narration`` section)."""
+
+    templates: bool = True
+    shapes: Tuple[str, ...] = SHAPES
+    max_ranked_rows: int = 10
+    currency: str = ""
+    # Questions containing one of these words still go to the LLM narrator.
+    llm_keywords: Tuple[str, ...] = (
+        "why",
+        "explain",
+        "insight",
+        "insights",
+        "recommend",
+        "should",
+        "trend",
+    )
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any]):
+        c = cfg.get("narration", {}) or {}
+        return cls(
+            templates=bool(c.get("templates", True)),
+            shapes=tuple(s for s in c.get("shapes", SHAPES) if s in SHAPES),
+            max_ranked_rows=int(c.get("max_ranked_rows", 10)),
+            currency=str(c.get("currency", "") or ""),
+            llm_keywords=tuple(str(w).lower() for w in c.get("llm_keywords", cls.llm_keywords)),
+        )
+
+
+def format_value(metric: str, value: Any, currency: str = ""):
+    if value is None or pd.isna(value):
+        return "n/a"
+    value = float(value)
+    if metric in RATE_METRICS:
+        return f"{100 * value:.1f}%"
+    if metric in COUNT_METRICS:
+        return f"{value:,.0f}"
+    return f"{currency}{value:,.2f}"
+
+
+def _pct(x: float):
+    return f"{100 * x:.2f}%" if abs(x) < 0.01 else f"{100 * x:.1f}%"
+
+
+def _label(value: Any):
+    return "(missing)" if value is None or pd.isna(value) else str(value)
+
+
+def _context(plan: Dict[str, Any], skip: str | None = None):
+    """Filters and period as ' for ship-state MAHARASHTRA, 2022-05-01 to 2022-05-31' ('' when none)."""
+    parts: List[str] = []
+    for col, val in (plan.get("filters") or {}).items():
+        if col == skip:
+            continue
+        vals = val if isinstance(val, list) else [val]
+        shown = ", ".join(map(str, vals[:5])) + (
+            f" (+{len(vals) - 5} more)" if len(vals) > 5 else ""
+        )
+        parts.append(f"{col} {shown}")
+    time = plan.get("time") or {}
+    if time.get("from") and time.get("to"):
+        parts.append(f"{time['from']} to {time['to']}")
+    elif time.get("from"):
+        parts.append(f"from {time['from']}")
+    elif time.get("to"):
+        parts.append(f"up to {time['to']}")
+    return f" for {', '.join(parts)}" if parts else ""
+
+
+def _metric_sort(plan: Dict[str, Any], metric: str):
+    """The plan's sort entry on ``metric`` (None when the result is not ordered by it)."""
+    return next((s for s in plan.get("sort") or [] if s.get("by") == metric), None)
+
+
+def _shape(plan: Dict[str, Any], df: pd.DataFrame, policy: NarrationPolicy):
+    groups = [c for c in plan.get("group_by") or [] if c in df.columns]
+    metrics = [m for m in plan.get("metrics") or [] if m in df.columns]
+    if not metrics or plan.get("time_grain") or len(groups) != len(plan.get("group_by") or []):
+        return None
+    if len(groups) > 1:
+        return None
+    if df.empty:
+        return "empty"
+    if not groups:
+        if len(df) == 1 and df[metrics].isna().all(axis=None):
+            return "empty"  # an aggregate over no rows (e.g. a filter value that does not occur)
+        return "scalar" if len(df) == 1 else None
+    if pd.to_numeric(df[metrics[0]], errors="coerce").isna().any():
+        return None  # a missing value has no place in a ranking or a gap
+    if len(df) == 2 and "comparison" in policy.shapes:
+        return "comparison"
+    if len(df) > 1 and _metric_sort(plan, metrics[0]) is None:
+        return None
+    return "ranking" if len(df) <= policy.max_ranked_rows else None
+
+
+def template_answer(
+    question: str,
+    plan: Dict[str, Any],
+    result: Any,
+    policy: NarrationPolicy,
+    caveats: List[str] | None = None,
+):
+    """Answer text for a simple result (an Arrow table or a DataFrame), or None when the
+    LLM should narrate it. An Arrow result is converted only when it is small enough to
+    have a template shape."""
+    if not policy.templates:
+        return None
+    if isinstance(result, pa.Table):
+        if result.num_rows > max(2, policy.max_ranked_rows):
+            return None
+        result = arrow_to_df(result)
+    if not isinstance(result, pd.DataFrame):
+        return None
+    df = result
+    words = set(re.findall(r"[a-z]+", (question or "").lower()))
+    if words & set(policy.llm_keywords):
+        return None
+    shape = _shape(plan, df, policy)
+    if shape is None or shape not in policy.shapes:
+        return None
+
+    metrics = [m for m in plan.get("metrics") or [] if m in df.columns]
+    render = {"empty": _empty, "scalar": _scalar, "ranking": _ranking, "comparison": _comparison}[
+        shape
+    ]
+    lines = render(plan, df, metrics, policy)
+    for c in caveats or []:
+        lines.append(f"_Note: {c}_")
+    return "\n".join(lines)
+
+
+def _empty(plan, df, metrics, policy):
+    label = METRIC_LABELS[metrics[0]]
+    return [f"No rows match{_context(plan) or ' the question'}, so there is no {label} to report."]
+
+
+def _scalar(plan, df, metrics, policy):
+    row = df.iloc[0]
+    ctx = _context(plan)
+    first = metrics[0]
+    value = format_value(first, row[first], policy.currency)
+    if first in ADDITIVE_METRICS:
+        lines = [f"Total {METRIC_LABELS[first]}{ctx} is **{value}**."]
+    else:  # a rate or a distinct count is not a total
+        lines = [f"{METRIC_LABELS[first].capitalize()}{ctx}: **{value}**."]
+    for m in metrics[1:]:
+        lines.append(
+            f"- {METRIC_LABELS[m].capitalize()}: {format_value(m, row[m], policy.currency)}"
+        )
+    return lines
+
+
+def _shares(df: pd.DataFrame, metric: str):
+    """Share of each row in the column total (None for non-additive metrics or non-positive totals)."""
+    if metric not in ADDITIVE_METRICS:
+        return None
+    values = pd.to_numeric(df[metric], errors="coerce").fillna(0).astype(float)
+    total = values.sum()
+    return None if total <= 0 else values / total
+
+
+def _others(row: pd.Series, metrics: List[str], policy: NarrationPolicy):
+    extra = [f"{METRIC_LABELS[m]} {format_value(m, row[m], policy.currency)}" for m in metrics[1:]]
+    return f"; {', '.join(extra)}" if extra else ""
+
+
+def _ranking(plan, df, metrics, policy):
+    group = plan["group_by"][0]
+    metric = metrics[0]
+    label = METRIC_LABELS[metric]
+    lead = df.iloc[0]
+    if len(df) == 1:
+        # Nothing to rank against: state the value for the one group.
+        value = format_value(metric, lead[metric], policy.currency)
+        return [f"**{_label(lead[group])}**: {label}{_context(plan, skip=group)} is **{value}**."]
+
+    sort = _metric_sort(plan, metric)
+    lowest = (sort.get("order") or "desc").lower() == "asc"
+    complete = len(df) < int(plan.get("limit") or 10)
+    shares = _shares(df, metric)
+    of_what = "of the total" if complete else f"of these {len(df)}"
+
+    head = f"**{_label(lead[group])}** has the {'lowest' if lowest else 'highest'} {label}{_context(plan)}"
+    head += f" at **{format_value(metric, lead[metric], policy.currency)}**"
+    if shares is not None:
+        head += f" ({_pct(shares.iloc[0])} {of_what})"
+    second = df.iloc[1]
+    head += f", followed by {_label(second[group])} ({format_value(metric, second[metric], policy.currency)})."
+    lines = [head]
+    a, b = float(lead[metric]), float(second[metric])
+    if metric not in RATE_METRICS and b:
+        lines.append(f"- The gap between the first two is {_pct(abs(a - b) / abs(b))}.")
+    elif metric in RATE_METRICS:
+        lines.append(
+            f"- The gap between the first two is {100 * abs(a - b):.1f} percentage points."
+        )
+    if shares is not None and len(df) > 3:
+        lines.append(f"- The first 3 account for {_pct(shares.iloc[:3].sum())} {of_what}.")
+    lines.append("")
+    for i, (_, row) in enumerate(df.iterrows(), start=1):
+        share = f" ({_pct(shares.iloc[i - 1])})" if shares is not None else ""
+        value = format_value(metric, row[metric], policy.currency)
+        lines.append(f"{i}. {_label(row[group])}: {value}{share}{_others(row, metrics, policy)}")
+    return lines
+
+
+def _comparison(plan, df, metrics, policy):
+    group = plan["group_by"][0]
+    metric = metrics[0]
+    ordered = df.assign(_v=pd.to_numeric(df[metric], errors="coerce")).sort_values(
+        "_v", ascending=False
+    )
+    hi, lo = ordered.iloc[0], ordered.iloc[1]
+    a, b = float(hi["_v"]), float(lo["_v"])
+    label = METRIC_LABELS[metric]
+    fa, fb = format_value(metric, a, policy.currency), format_value(metric, b, policy.currency)
+    lines = [
+        f"{label.capitalize()}{_context(plan)}: **{_label(hi[group])}** {fa} vs **{_label(lo[group])}** {fb}."
+    ]
+    if metric in RATE_METRICS:
+        lines.append(f"- {_label(hi[group])} is {100 * (a - b):.1f} percentage points higher.")
+    elif b:
+        diff = format_value(metric, a - b, policy.currency)
+        lines.append(f"- {_label(hi[group])} is {_pct((a - b) / abs(b))} higher ({diff} more).")
+    shares = _shares(ordered, metric)
+    if shares is not None and len(df) < int(plan.get("limit") or 10):
+        lines.append(
+            f"- {_label(hi[group])} accounts for {_pct(shares.iloc[0])} of the combined total."
+        )
+    for m in metrics[1:]:
+        lines.append(
+            f"- {METRIC_LABELS[m].capitalize()}: {_label(hi[group])} {format_value(m, hi[m], policy.currency)}, "
+            f"{_label(lo[group])} {format_value(m, lo[m], policy.currency)}"
+        )
+    return lines
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict
+
+from langchain_core.runnables import RunnableLambda
+
+from retail_ai.utils.tracing import span
+
+State = Dict[str, Any]
+
+
+def _node_attrs(state: State):
+    attrs: Dict[str, Any] = {}
+    telemetry = state.get("telemetry") or {}
+    if "planner" in telemetry:
+        attrs["planner"] = telemetry["planner"]
+    if "narrator" in telemetry:
+        attrs["narrator"] = telemetry["narrator"]
+    if "sql_shared" in telemetry:
+        attrs["sql_shared"] = telemetry["sql_shared"]
+    table = state.get("result_table")
+    if table is not None:
+        attrs["rows"] = table.num_rows
+    tables = state.get("_summary_tables")
+    if tables:
+        attrs["tables"] = {name: len(t) for name, t in tables.items()}
+    return attrs
+
+
+def traced_node(
+    name: str,
+    func: Callable[[State], State],
+    afunc: Callable[[State], Awaitable[State]] | None = None,
+):
+    """Graph node running ``func`` (``invoke``) / ``afunc`` (``ainvoke``) in a ``node.<name>`` span."""
+
+    def run(state: State):
+        with span(f"node.{name}") as s:
+            out = func(state)
+            s.set(**_node_attrs(out))
+            return out
+
+    if afunc is None:
+        return RunnableLambda(run, name=name)
+
+    async def arun(state: State):
+        with span(f"node.{name}") as s:
+            out = await afunc(state)
+            s.set(**_node_attrs(out))
+            return out
+
+    return RunnableLambda(run, afunc=arun, name=name)
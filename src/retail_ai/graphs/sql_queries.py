@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from typing import Dict
+
+import pandas as pd
+
+# Deterministic summary queries. Each one is a full scan of `sales`; they are kept
+# as the reference definitions and for the concurrent fallback.
+KPI_SQL = """SELECT
+  COUNT(*) AS rows,
+  COUNT(DISTINCT "Order ID") AS orders,
+  SUM(COALESCE(Qty,0)) AS units,
+  SUM(COALESCE(Amount,0)) AS gross_amount,
+  SUM(CASE WHEN is_shipped THEN COALESCE(Amount,0) ELSE 0 END) AS shipped_amount,
+  SUM(CASE WHEN is_cancelled THEN COALESCE(Amount,0) ELSE 0 END) AS cancelled_amount,
+  AVG(CASE WHEN is_cancelled THEN 1.0 ELSE 0.0 END) AS cancel_rate,
+  MIN(order_date) AS min_date,
+  MAX(order_date) AS max_date
+FROM sales;"""
+
+TREND_SQL = """SELECT
+  STRFTIME(order_date, '%Y-%m') AS month,
+  COUNT(DISTINCT "Order ID") AS orders,
+  SUM(COALESCE(Amount,0)) AS gross_amount,
+  SUM(CASE WHEN is_shipped THEN COALESCE(Amount,0) ELSE 0 END) AS shipped_amount,
+  AVG(CASE WHEN is_cancelled THEN 1.0 ELSE 0.0 END) AS cancel_rate
+FROM sales
+GROUP BY month
+ORDER BY month;"""
+
+TOP_CATEGORIES_SQL = """SELECT Category,
+  SUM(CASE WHEN is_shipped THEN COALESCE(Amount,0) ELSE 0 END) AS shipped_amount,
+  COUNT(DISTINCT "Order ID") AS orders,
+  SUM(COALESCE(Qty,0)) AS units
+FROM sales
+GROUP BY Category
+ORDER BY shipped_amount DESC
+LIMIT 10;"""
+
+TOP_STATES_SQL = """SELECT "ship-state" AS ship_state,
+  SUM(CASE WHEN is_shipped THEN COALESCE(Amount,0) ELSE 0 END) AS shipped_amount,
+  COUNT(DISTINCT "Order ID") AS orders
+FROM sales
+GROUP BY ship_state
+ORDER BY shipped_amount DESC
+LIMIT 10;"""
+
+SERVICE_LEVELS_SQL = """SELECT "ship-service-level" AS ship_service_level,
+  SUM(CASE WHEN is_shipped THEN COALESCE(Amount,0) ELSE 0 END) AS shipped_amount,
+  COUNT(DISTINCT "Order ID") AS orders
+FROM sales
+GROUP BY ship_service_level
+ORDER BY shipped_amount DESC
+LIMIT 10;"""
+
+SUMMARY_QUERIES = {
+    "kpi": KPI_SQL,
+    "trend": TREND_SQL,
+    "top_categories": TOP_CATEGORIES_SQL,
+    "top_states": TOP_STATES_SQL,
+    "service_levels": SERVICE_LEVELS_SQL,
+}
+
+# All summary tables in a single scan. `gid` is the GROUPING() bitmask over
+# (month_start, Category, ship_state, ship_service_level) and identifies the set.
+# Months are grouped as truncated dates and only formatted once per group.
+FUSED_SUMMARY_SQL = """WITH base AS (
+  SELECT
+    date_trunc('month', order_date) AS month_start,
+    Category,
+    "ship-state" AS ship_state,
+    "ship-service-level" AS ship_service_level,
+    "Order ID" AS order_id,
+    COALESCE(Qty,0) AS qty,
+    COALESCE(Amount,0) AS amount,
+    is_shipped,
+    is_cancelled,
+    order_date
+  FROM sales
+)
+SELECT
+  GROUPING(month_start, Category, ship_state, ship_service_level) AS gid,
+  STRFTIME(month_start, '%Y-%m') AS month, Category, ship_state, ship_service_level,
+  COUNT(*) AS rows,
+  COUNT(DISTINCT order_id) AS orders,
+  SUM(qty) AS units,
+  SUM(amount) AS gross_amount,
+  SUM(CASE WHEN is_shipped THEN amount ELSE 0 END) AS shipped_amount,
+  SUM(CASE WHEN is_cancelled THEN amount ELSE 0 END) AS cancelled_amount,
+  AVG(CASE WHEN is_cancelled THEN 1.0 ELSE 0.0 END) AS cancel_rate,
+  MIN(order_date) AS min_date,
+  MAX(order_date) AS max_date
+FROM base
+GROUP BY GROUPING SETS ((), (month_start), (Category), (ship_state), (ship_service_level));"""
+
+# gid bit layout: month=8, Category=4, ship_state=2, ship_service_level=1 (1 = rolled up).
+_FUSED_SPLITS = {
+    "kpi": (
+        0b1111,
+        [
+            "rows",
+            "orders",
+            "units",
+            "gross_amount",
+            "shipped_amount",
+            "cancelled_amount",
+            "cancel_rate",
+            "min_date",
+            "max_date",
+        ],
+        None,
+    ),
+    "trend": (
+        0b0111,
+        ["month", "orders", "gross_amount", "shipped_amount", "cancel_rate"],
+        "month",
+    ),
+    "top_categories": (0b1011, ["Category", "shipped_amount", "orders", "units"], "shipped_amount"),
+    "top_states": (0b1101, ["ship_state", "shipped_amount", "orders"], "shipped_amount"),
+    "service_levels": (
+        0b1110,
+        ["ship_service_level", "shipped_amount", "orders"],
+        "shipped_amount",
+    ),
+}
+
+
+def split_fused_summary(df: pd.DataFrame):
+    """Split the FUSED_SUMMARY_SQL result into the per-table frames of SUMMARY_QUERIES."""
+    tables: Dict[str, pd.DataFrame] = {}
+    for name, (gid, cols, sort_by) in _FUSED_SPLITS.items():
+        part = df.loc[df["gid"] == gid, cols]
+        if sort_by == "month":
+            part = part.sort_values("month", na_position="last")
+        elif sort_by:
+            part = part.sort_values(sort_by, ascending=False).head(10)
+        tables[name] = part.reset_index(drop=True)
+    return tables
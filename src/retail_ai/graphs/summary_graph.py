@@ -1,114 +1,132 @@
 from __future__ import annotations
 
-import os
-from typing import Any, Dict, List, TypedDict
+import asyncio
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, TypedDict
 
+import duckdb
 import pandas as pd
 from langgraph.graph import END, StateGraph
 
-from retail_ai.llm.gemini_client import GeminiChat
+from retail_ai.graphs.narration import anarrate, narrate
+from retail_ai.graphs.nodes import traced_node
+from retail_ai.graphs.sql_queries import FUSED_SUMMARY_SQL, SUMMARY_QUERIES, split_fused_summary
+from retail_ai.llm.base import LLMClient
+from retail_ai.llm.factory import build_llm
+from retail_ai.llm.guard import LLMGuard
+from retail_ai.llm.prompt_budget import PromptBudget
+from retail_ai.llm.response_cache import ResponseCache
 from retail_ai.utils.config_loader import load_yaml
-from retail_ai.utils.helpers import df_to_markdown
+
+logger = logging.getLogger(__name__)
 
 
 class SummaryState(TypedDict, total=False):
     schema: str
     duckdb_service: Any
+    dataset_fingerprint: str
     max_rows: int
+    stream: bool
 
     answer: str
     _summary_tables: Dict[str, pd.DataFrame]
 
 
 def build_summary_graph(
-    cfg_path: str = "config/model_config.yaml", prompts_path: str = "config/prompt_templates.yaml"
+    cfg_path: str = "config/model_config.yaml",
+    prompts_path: str = "config/prompt_templates.yaml",
+    llm_cache: ResponseCache | None = None,
+    llm_guard: LLMGuard | None = None,
+    llm: LLMClient | None = None,
 ):
     cfg = load_yaml(cfg_path)
     prompts = load_yaml(prompts_path)
 
-    model = os.getenv("GEMINI_MODEL", cfg.get("llm", {}).get("model", "gemini-2.5-flash"))
-    temperature = float(os.getenv("TEMPERATURE", cfg.get("llm", {}).get("temperature", 0.1)))
-    llm = GeminiChat(model=model, temperature=temperature)
+    if llm is None:
+        llm = build_llm(
+            cfg,
+            cache=llm_cache if llm_cache is not None else ResponseCache.from_config(cfg),
+            guard=llm_guard if llm_guard is not None else LLMGuard.from_config(cfg),
+            budget=PromptBudget.from_config(cfg),
+        )
 
     summary_tokens = int(cfg.get("llm", {}).get("max_output_tokens", {}).get("summary", 1100))
 
+    summary_mode = str(cfg.get("summary", {}).get("execution", "fused")).lower()
+
+    def _run_concurrent(svc):
+        def run(sql: str):
+            cur = svc.cursor()
+            try:
+                return cur.query_df(sql)
+            finally:
+                cur.close()
+
+        with ThreadPoolExecutor(max_workers=len(SUMMARY_QUERIES)) as pool:
+            # Each task runs in a copy of the caller's context so its spans nest under the node.
+            futures = {
+                name: pool.submit(contextvars.copy_context().run, run, sql)
+                for name, sql in SUMMARY_QUERIES.items()
+            }
+            return {name: f.result() for name, f in futures.items()}
+
     def extractor(state: SummaryState):
         svc = state.get("duckdb_service")
         if svc is None:
             raise RuntimeError("duckdb_service missing in state")
-        kpi_sql = """SELECT
-          COUNT(*) AS rows,
-          COUNT(DISTINCT \"Order ID\") AS orders,
-          SUM(COALESCE(Qty,0)) AS units,
-          SUM(COALESCE(Amount,0)) AS gross_amount,
-          SUM(CASE WHEN Status LIKE 'Shipped%' THEN COALESCE(Amount,0) ELSE 0 END) AS shipped_amount,
-          SUM(CASE WHEN lower(Status) LIKE '%cancelled%' THEN COALESCE(Amount,0) ELSE 0 END) AS cancelled_amount,
-          AVG(CASE WHEN lower(Status) LIKE '%cancelled%' THEN 1.0 ELSE 0.0 END) AS cancel_rate,
-          MIN(TRY_STRPTIME(Date, '%m-%d-%y')) AS min_date,
-          MAX(TRY_STRPTIME(Date, '%m-%d-%y')) AS max_date
-        FROM sales;"""
-
-        trend_sql = """SELECT
-          STRFTIME(TRY_STRPTIME(Date, '%m-%d-%y'), '%Y-%m') AS month,
-          COUNT(DISTINCT \"Order ID\") AS orders,
-          SUM(COALESCE(Amount,0)) AS gross_amount,
-          SUM(CASE WHEN Status LIKE 'Shipped%' THEN COALESCE(Amount,0) ELSE 0 END) AS shipped_amount,
-          AVG(CASE WHEN lower(Status) LIKE '%cancelled%' THEN 1.0 ELSE 0.0 END) AS cancel_rate
-        FROM sales
-        GROUP BY month
-        ORDER BY month;"""
-
-        top_cat_sql = """SELECT Category,
-          SUM(CASE WHEN Status LIKE 'Shipped%' THEN COALESCE(Amount,0) ELSE 0 END) AS shipped_amount,
-          COUNT(DISTINCT \"Order ID\") AS orders,
-          SUM(COALESCE(Qty,0)) AS units
-        FROM sales
-        GROUP BY Category
-        ORDER BY shipped_amount DESC
-        LIMIT 10;"""
-
-        top_state_sql = """SELECT \"ship-state\" AS ship_state,
-          SUM(CASE WHEN Status LIKE 'Shipped%' THEN COALESCE(Amount,0) ELSE 0 END) AS shipped_amount,
-          COUNT(DISTINCT \"Order ID\") AS orders
-        FROM sales
-        GROUP BY ship_state
-        ORDER BY shipped_amount DESC
-        LIMIT 10;"""
-
-        svc_sql = """SELECT \"ship-service-level\" AS ship_service_level,
-          SUM(CASE WHEN Status LIKE 'Shipped%' THEN COALESCE(Amount,0) ELSE 0 END) AS shipped_amount,
-          COUNT(DISTINCT \"Order ID\") AS orders
-        FROM sales
-        GROUP BY ship_service_level
-        ORDER BY shipped_amount DESC
-        LIMIT 10;"""
-
-        state["_summary_tables"] = {
-            "kpi": svc.query_df(kpi_sql),
-            "trend": svc.query_df(trend_sql),
-            "top_categories": svc.query_df(top_cat_sql),
-            "top_states": svc.query_df(top_state_sql),
-            "service_levels": svc.query_df(svc_sql),
-        }
+
+        if summary_mode == "fused":
+            try:
+                tables = split_fused_summary(svc.query_df(FUSED_SUMMARY_SQL))
+            except duckdb.Error:
+                logger.warning(
+                    "Fused summary query failed; running queries concurrently", exc_info=True
+                )
+                tables = _run_concurrent(svc)
+        elif summary_mode == "concurrent":
+            tables = _run_concurrent(svc)
+        else:
+            tables = {name: svc.query_df(sql) for name, sql in SUMMARY_QUERIES.items()}
+
+        state["_summary_tables"] = tables
         return state
 
-    def narrator(state: SummaryState):
+    def _narrator_msgs(state: SummaryState):
         tables = state.get("_summary_tables") or {}
         max_rows = int(state.get("max_rows") or 10)
-        payload = {k: df_to_markdown(v, max_rows=max_rows) for k, v in tables.items()}
-
-        msgs = [
+        return [
             {"role": "system", "content": prompts.get("system_guardrails", "")},
             {"role": "system", "content": "You are the Summarization Narrator agent."},
             {"role": "system", "content": prompts.get("summary_instructions", "")},
-            {"role": "system", "content": "SUMMARY_TABLES_MARKDOWN\n" + str(payload)},
+            {"role": "system", "content": "SUMMARY_TABLES (CSV)"},
+            *(
+                {"role": "system", "content": f"TABLE {name}", "table": df.head(max_rows)}
+                for name, df in tables.items()
+            ),
         ]
-        state["answer"] = llm.complete(msgs, max_output_tokens=summary_tokens)
+
+    def narrator(state: SummaryState):
+        msgs = _narrator_msgs(state)
+        state["answer"] = narrate(
+            llm, msgs, state, stage="summary", max_output_tokens=summary_tokens
+        )
         return state
 
+    async def anarrator(state: SummaryState):
+        msgs = _narrator_msgs(state)
+        state["answer"] = await anarrate(
+            llm, msgs, state, stage="summary", max_output_tokens=summary_tokens
+        )
+        return state
+
+    async def aextractor(state: SummaryState):
+        return await asyncio.to_thread(extractor, state)
+
     g = StateGraph(SummaryState)
-    g.add_node("summary_extractor", extractor)
-    g.add_node("summary_narrator", narrator)
+    g.add_node("summary_extractor", traced_node("summary_extractor", extractor, aextractor))
+    g.add_node("summary_narrator", traced_node("summary_narrator", narrator, anarrator))
     g.set_entry_point("summary_extractor")
     g.add_edge("summary_extractor", "summary_narrator")
     g.add_edge("summary_narrator", END)
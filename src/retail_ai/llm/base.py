@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Protocol, runtime_checkable
+
+from retail_ai.llm.guard import LLMGuard
+from retail_ai.llm.prompt_budget import PromptBudget, estimate_tokens, render_messages
+from retail_ai.llm.response_cache import ResponseCache, cache_key
+from retail_ai.utils.tracing import span
+
+
+@runtime_checkable
+class LLMClient(Protocol):
+    """What the graphs need from an LLM backend (see ``llm.factory.build_llm``)."""
+
+    model: str
+
+    def complete(
+        self,
+        messages: List[Dict[str, Any]],
+        max_output_tokens: int = 900,
+        stage: str = "default",
+        cache_scope: str | None = None,
+    ) -> str: ...
+
+    def stream(
+        self,
+        messages: List[Dict[str, Any]],
+        max_output_tokens: int = 900,
+        stage: str = "default",
+        cache_scope: str | None = None,
+    ) -> Iterator[str]: ...
+
+    async def acomplete(
+        self,
+        messages: List[Dict[str, Any]],
+        max_output_tokens: int = 900,
+        stage: str = "default",
+        cache_scope: str | None = None,
+    ) -> str: ...
+
+
+def flatten_messages(messages: List[Dict[str, str]]):
+    system = []
+    convo = []
+    for m in messages:
+        role = m.get("role")
+        content = m.get("content", "")
+        if role == "system":
+            system.append(content)
+        elif role == "user":
+            convo.append(f"User: {content}")
+        else:
+            convo.append(f"Assistant: {content}")
+    out = ""
+    if system:
+        out += "\n".join(system).strip() + "\n\n"
+    out += "\n".join(convo).strip()
+    return out
+
+
+@dataclass
+class BaseChat:
+    """Prompt rendering, response cache, call guard and tracing shared by all backends.
+
+    Subclasses implement ``_generate`` (and optionally ``_generate_stream`` /
+    ``_agenerate``) on the flattened prompt string.
+    """
+
+    model: str
+    temperature: float = 0.1
+    cache: ResponseCache | None = None
+    guard: LLMGuard | None = None
+    budget: PromptBudget | None = None
+
+    def _generate(self, prompt: str, max_output_tokens: int, stage: str) -> str:
+        raise NotImplementedError
+
+    def _generate_stream(self, prompt: str, max_output_tokens: int, stage: str) -> Iterator[str]:
+        yield self._generate(prompt, max_output_tokens, stage)
+
+    async def _agenerate(self, prompt: str, max_output_tokens: int, stage: str) -> str:
+        return await asyncio.to_thread(self._generate, prompt, max_output_tokens, stage)
+
+    def _prompt(self, messages: List[Dict[str, Any]], stage: str):
+        return flatten_messages(render_messages(messages, self.budget, stage=stage))
+
+    def _span(self, kind: str, prompt: str, stage: str):
+        return span(
+            f"llm.{kind}",
+            stage=stage,
+            model=self.model,
+            backend=type(self).__name__,
+            prompt_chars=len(prompt),
+            prompt_tokens_est=estimate_tokens(prompt),
+        )
+
+    def _key(self, prompt: str, max_output_tokens: int, cache_scope: str | None):
+        if self.cache is None:
+            return None
+        return cache_key(prompt, self.model, self.temperature, max_output_tokens, cache_scope)
+
+    def complete(
+        self,
+        messages: List[Dict[str, Any]],
+        max_output_tokens: int = 900,
+        stage: str = "default",
+        cache_scope: str | None = None,
+    ):
+        """Generate a completion. ``cache_scope`` (dataset/schema fingerprint) is part
+        of the response-cache key; ``stage`` selects the hit/miss counter. Messages
+        may carry a ``table`` DataFrame, serialized under the prompt budget."""
+        prompt = self._prompt(messages, stage)
+        with self._span("complete", prompt, stage) as s:
+            key = self._key(prompt, max_output_tokens, cache_scope)
+            if key is not None:
+                cached = self.cache.get(key, stage=stage)
+                if cached is not None:
+                    s.set(cache_hit=True, response_chars=len(cached))
+                    return cached
+
+            def call():
+                return self._generate(prompt, max_output_tokens, stage)
+
+            text = (self.guard.call(call) if self.guard is not None else call()).strip()
+            s.set(cache_hit=False, response_chars=len(text))
+            if key is not None and text:
+                self.cache.put(key, text)
+            return text
+
+    def stream(
+        self,
+        messages: List[Dict[str, Any]],
+        max_output_tokens: int = 900,
+        stage: str = "default",
+        cache_scope: str | None = None,
+    ):
+        """Yield the completion text as it is generated (a cache hit yields once).
+
+        Opening the stream (up to its first chunk) goes through the guard like
+        ``complete``: it holds a slot, and 429/5xx/timeouts are retried with
+        backoff. The slot is released before chunks are handed to the consumer,
+        so a slow reader does not block other calls; an error after the first
+        chunk is raised as is, since the text already yielded cannot be retried.
+        """
+        prompt = self._prompt(messages, stage)
+        t0 = time.perf_counter()
+        with self._span("stream", prompt, stage) as s:
+            key = self._key(prompt, max_output_tokens, cache_scope)
+            if key is not None:
+                cached = self.cache.get(key, stage=stage)
+                if cached is not None:
+                    s.set(cache_hit=True, response_chars=len(cached))
+                    yield cached
+                    return
+
+            s.set(cache_hit=False)
+
+            def start():
+                chunks = self._generate_stream(prompt, max_output_tokens, stage)
+                return next(chunks, None), chunks
+
+            first, chunks = self.guard.call(start) if self.guard is not None else start()
+            parts: List[str] = []
+            for text in itertools.chain([first] if first is not None else [], chunks):
+                if text:
+                    if not parts:
+                        s.set(first_token_ms=round((time.perf_counter() - t0) * 1000, 3))
+                    parts.append(text)
+                    yield text
+            full = "".join(parts).strip()
+            s.set(response_chars=len(full))
+            if key is not None and full:
+                self.cache.put(key, full)
+
+    async def acomplete(
+        self,
+        messages: List[Dict[str, Any]],
+        max_output_tokens: int = 900,
+        stage: str = "default",
+        cache_scope: str | None = None,
+    ):
+        """Async ``complete`` using the shared guard (rate limit, concurrency,
+        timeout, retry with backoff)."""
+        prompt = self._prompt(messages, stage)
+        with self._span("complete", prompt, stage) as s:
+            key = self._key(prompt, max_output_tokens, cache_scope)
+            if key is not None:
+                cached = await asyncio.to_thread(self.cache.get, key, stage)
+                if cached is not None:
+                    s.set(cache_hit=True, response_chars=len(cached))
+                    return cached
+
+            def call():
+                return self._agenerate(prompt, max_output_tokens, stage)
+
+            text = (await (self.guard.acall(call) if self.guard is not None else call())).strip()
+            s.set(cache_hit=False, response_chars=len(text))
+            if key is not None and text:
+                await asyncio.to_thread(self.cache.put, key, text)
+            return text
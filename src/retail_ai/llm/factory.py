@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Any, Dict
+
+from retail_ai.llm.base import LLMClient
+from retail_ai.llm.gemini_client import GeminiChat
+from retail_ai.llm.guard import LLMGuard
+from retail_ai.llm.prompt_budget import PromptBudget
+from retail_ai.llm.replay_client import RecordReplayChat
+from retail_ai.llm.response_cache import ResponseCache
+from retail_ai.llm.stub_client import StubChat
+
+PROVIDERS = ("gemini", "stub", "record", "replay")
+
+
+def build_llm(
+    cfg: Dict[str, Any],
+    cache: ResponseCache | None = None,
+    guard: LLMGuard | None = None,
+    budget: PromptBudget | None = None,
+) -> LLMClient:
+    """LLM client for ``llm.provider`` (``LLM_PROVIDER`` overrides it).
+
+    - gemini: Google Gemini (needs ``GEMINI_API_KEY``)
+    - stub: deterministic offline answers (``llm.stub``); never uses the response cache
+    - record: Gemini, plus every prompt/response appended to ``llm.replay.path``
+    - replay: answers from ``llm.replay.path`` with simulated latency, no network
+
+    record and replay never use the response cache either: a cache hit would
+    skip the recording, or the simulated latency of a replay.
+    """
+    c = cfg.get("llm", {}) or {}
+    provider = str(os.getenv("LLM_PROVIDER", c.get("provider", "gemini"))).lower()
+    model = os.getenv("GEMINI_MODEL", c.get("model", "gemini-2.5-flash"))
+    temperature = float(os.getenv("TEMPERATURE", c.get("temperature", 0.1)))
+    common = {"model": model, "temperature": temperature, "guard": guard, "budget": budget}
+
+    if provider == "gemini":
+        return GeminiChat(cache=cache, **common)
+
+    if provider == "stub":
+        s = c.get("stub", {}) or {}
+        return StubChat(
+            responses={str(k): str(v) for k, v in (s.get("responses") or {}).items()},
+            latency_ms=float(s.get("latency_ms", 0) or 0),
+            **common,
+        )
+
+    if provider in ("record", "replay"):
+        r = c.get("replay", {}) or {}
+        inner = None
+        if provider == "record":
+            inner = GeminiChat(model=model, temperature=temperature, guard=guard)
+        latency = r.get("latency", "recorded")
+        return RecordReplayChat(
+            path=Path(r.get("path", "data/llm_recordings.jsonl")),
+            mode=provider,
+            inner=inner,
+            latency=latency if latency == "recorded" else float(latency or 0),
+            latency_scale=float(r.get("latency_scale", 1.0)),
+            on_miss=str(r.get("on_miss", "error")),
+            **common,
+        )
+
+    raise ValueError(f"Unknown llm.provider {provider!r}; expected one of {', '.join(PROVIDERS)}")
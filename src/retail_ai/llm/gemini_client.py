@@ -2,34 +2,15 @@ from __future__ import annotations
 
 import os
 from dataclasses import dataclass
-from typing import Dict, List
 
 import google.generativeai as genai
 
-
-def _flatten(messages: List[Dict[str, str]]):
-    system = []
-    convo = []
-    for m in messages:
-        role = m.get("role")
-        content = m.get("content", "")
-        if role == "system":
-            system.append(content)
-        elif role == "user":
-            convo.append(f"User: {content}")
-        else:
-            convo.append(f"Assistant: {content}")
-    out = ""
-    if system:
-        out += "\n".join(system).strip() + "\n\n"
-    out += "\n".join(convo).strip()
-    return out
+from retail_ai.llm.base import BaseChat
 
 
 @dataclass
-class GeminiChat:
-    model: str
-    temperature: float = 0.1
+class GeminiChat(BaseChat):
+    """Google Gemini backend (``llm.provider: gemini``); needs ``GEMINI_API_KEY``."""
 
     def __post_init__(self):
         key = os.getenv("GEMINI_API_KEY")
@@ -38,13 +19,45 @@ class GeminiChat:
         genai.configure(api_key=key)
         self._model = genai.GenerativeModel(self.model)
 
-    def complete(self, messages: List[Dict[str, str]], max_output_tokens: int = 900):
-        prompt = _flatten(messages)
+    def _generation_config(self, max_output_tokens: int):
+        return {
+            "temperature": float(self.temperature),
+            "max_output_tokens": int(max_output_tokens),
+        }
+
+    def _request_options(self):
+        if self.guard is None:
+            return {}
+        return {"request_options": {"timeout": self.guard.timeout_s}}
+
+    def _generate(self, prompt: str, max_output_tokens: int, stage: str):
         resp = self._model.generate_content(
             prompt,
-            generation_config={
-                "temperature": float(self.temperature),
-                "max_output_tokens": int(max_output_tokens),
-            },
+            generation_config=self._generation_config(max_output_tokens),
+            **self._request_options(),
+        )
+        return getattr(resp, "text", "") or ""
+
+    def _generate_stream(self, prompt: str, max_output_tokens: int, stage: str):
+        resp = self._model.generate_content(
+            prompt,
+            generation_config=self._generation_config(max_output_tokens),
+            stream=True,
+            **self._request_options(),
+        )
+        for chunk in resp:
+            try:
+                text = chunk.text or ""
+            except ValueError:
+                # Chunks without text parts (e.g. the final finish_reason chunk).
+                continue
+            if text:
+                yield text
+
+    async def _agenerate(self, prompt: str, max_output_tokens: int, stage: str):
+        resp = await self._model.generate_content_async(
+            prompt,
+            generation_config=self._generation_config(max_output_tokens),
+            **self._request_options(),
         )
-        return (getattr(resp, "text", "") or "").strip()
+        return getattr(resp, "text", "") or ""
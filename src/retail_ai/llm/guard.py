@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+import random
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict
+
+from google.api_core import exceptions as gexc
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_ERRORS = (
+    gexc.TooManyRequests,
+    gexc.ResourceExhausted,
+    gexc.ServiceUnavailable,
+    gexc.InternalServerError,
+    gexc.DeadlineExceeded,
+    TimeoutError,
+    asyncio.TimeoutError,
+)
+
+
+class TokenBucket:
+    """Thread-safe token bucket; ``reserve()`` returns how long the caller must wait.
+
+    Waiting is left to the caller so the same bucket works for threads and for any
+    number of event loops.
+    """
+
+    def __init__(self, rate_per_sec: float, burst: int):
+        self.rate = float(rate_per_sec)
+        self.capacity = float(max(1, burst))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1.0
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class ConcurrencyLimiter:
+    """Caps in-flight calls across threads and event loops (FIFO hand-over)."""
+
+    def __init__(self, limit: int):
+        self.limit = max(1, int(limit))
+        self._active = 0
+        self._waiters: deque = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self._active
+
+    def _enter_or_queue(self, waiter: Callable[[], bool]):
+        with self._lock:
+            if self._active < self.limit and not self._waiters:
+                self._active += 1
+                return True
+            self._waiters.append(waiter)
+            return False
+
+    def _dequeue(self, waiter: Callable[[], bool]):
+        with self._lock:
+            try:
+                self._waiters.remove(waiter)
+                return True
+            except ValueError:
+                return False
+
+    def acquire(self):
+        event = threading.Event()
+
+        def wake():
+            event.set()
+            return True
+
+        if not self._enter_or_queue(wake):
+            event.wait()
+
+    async def acquire_async(self):
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+
+        def resolve():
+            if fut.cancelled():
+                self.release()  # the waiter went away; pass the slot on
+            else:
+                fut.set_result(None)
+
+        def wake():
+            if fut.done():
+                return False
+            try:
+                loop.call_soon_threadsafe(resolve)
+            except RuntimeError:  # loop already closed
+                return False
+            return True
+
+        if self._enter_or_queue(wake):
+            return
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if not self._dequeue(wake) and fut.done() and not fut.cancelled():
+                self.release()  # slot was handed over just before cancellation
+            raise
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                if self._waiters.popleft()():
+                    return  # slot handed over; _active unchanged
+            self._active -= 1
+
+
+@dataclass
+class LLMGuard:
+    """Client-level call policy shared by every LLM client of an engine:
+    token-bucket rate limit, concurrency cap, per-call timeout and jittered
+    exponential backoff on retryable errors (429/5xx/timeouts)."""
+
+    rate_per_sec: float = 2.0
+    burst: int = 4
+    max_concurrency: int = 4
+    timeout_s: float = 60.0
+    max_retries: int = 3
+    backoff_base_s: float = 0.5
+    backoff_max_s: float = 20.0
+    stats: Dict[str, int] = field(
+        default_factory=lambda: {"attempts": 0, "retries": 0, "failures": 0}
+    )
+
+    def __post_init__(self):
+        self._bucket = TokenBucket(self.rate_per_sec, self.burst)
+        self._limiter = ConcurrencyLimiter(self.max_concurrency)
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any]):
+        c = cfg.get("llm_limits", {}) or {}
+        return cls(
+            rate_per_sec=float(c.get("rate_per_sec", 2.0)),
+            burst=int(c.get("burst", 4)),
+            max_concurrency=int(c.get("max_concurrency", 4)),
+            timeout_s=float(c.get("timeout_seconds", 60.0)),
+            max_retries=int(c.get("max_retries", 3)),
+            backoff_base_s=float(c.get("backoff_base_seconds", 0.5)),
+            backoff_max_s=float(c.get("backoff_max_seconds", 20.0)),
+        )
+
+    def _bump(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _backoff(self, attempt: int):
+        # "Full jitter": uniform in [0, min(cap, base * 2^attempt)].
+        return random.uniform(0, min(self.backoff_max_s, self.backoff_base_s * (2**attempt)))
+
+    def _acquire(self):
+        """Take one concurrency slot and one rate-limit token (sync); the slot is
+        given back with ``_limiter.release()``."""
+        self._limiter.acquire()
+        try:
+            wait = self._bucket.reserve()
+            if wait:
+                time.sleep(wait)
+        except BaseException:
+            self._limiter.release()
+            raise
+
+    @contextmanager
+    def slot(self):
+        """Hold one rate-limit token and one concurrency slot (sync)."""
+        self._acquire()
+        try:
+            yield
+        finally:
+            self._limiter.release()
+
+    @asynccontextmanager
+    async def aslot(self):
+        await self._limiter.acquire_async()
+        try:
+            wait = self._bucket.reserve()
+            if wait:
+                await asyncio.sleep(wait)
+            yield
+        finally:
+            self._limiter.release()
+
+    def _with_deadline(self, fn: Callable[[], Any]):
+        """``fn()`` in one slot, or TimeoutError once it has run ``timeout_s``.
+
+        ``fn`` runs on a daemon thread (in the caller's context) that owns the
+        slot: past the deadline the caller gets TimeoutError, while the abandoned
+        request keeps its slot until the client actually returns, so it still
+        counts against ``max_concurrency``.
+        """
+        if not self.timeout_s or self.timeout_s <= 0:
+            with self.slot():
+                return fn()
+        out: Dict[str, Any] = {}
+        done = threading.Event()
+        ctx = contextvars.copy_context()
+
+        def run():
+            try:
+                out["value"] = ctx.run(fn)
+            except BaseException as e:  # re-raised in the caller
+                out["error"] = e
+            finally:
+                self._limiter.release()
+                done.set()
+
+        self._acquire()
+        try:
+            threading.Thread(target=run, name="llm-call", daemon=True).start()
+        except BaseException:
+            self._limiter.release()
+            raise
+        if not done.wait(self.timeout_s):
+            raise TimeoutError(f"LLM call did not return within {self.timeout_s:g}s")
+        if "error" in out:
+            raise out["error"]
+        return out["value"]
+
+    def call(self, fn: Callable[[], Any]):
+        """Run ``fn`` under the limits, retrying retryable errors; each attempt is
+        bounded by ``timeout_s``."""
+        attempt = 0
+        while True:
+            self._bump("attempts")
+            try:
+                return self._with_deadline(fn)
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    self._bump("failures")
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(
+                    "LLM call failed (%s); retry %d in %.2fs", type(e).__name__, attempt + 1, delay
+                )
+                self._bump("retries")
+                attempt += 1
+                time.sleep(delay)
+
+    async def acall(self, fn: Callable[[], Awaitable[Any]]):
+        """Async ``call``: ``fn`` returns a fresh awaitable per attempt; each attempt
+        is bounded by ``timeout_s``."""
+        attempt = 0
+        while True:
+            self._bump("attempts")
+            try:
+                async with self.aslot():
+                    return await asyncio.wait_for(fn(), timeout=self.timeout_s)
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    self._bump("failures")
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(
+                    "LLM call failed (%s); retry %d in %.2fs", type(e).__name__, attempt + 1, delay
+                )
+                self._bump("retries")
+                attempt += 1
+                await asyncio.sleep(delay)
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import logging
+import math
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from retail_ai.utils.helpers import df_to_markdown
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str):
+    """Rough token count (~4 characters per token for Gemini on English/CSV text)."""
+    return math.ceil(len(text or "") / 4)
+
+
+def _format_float(x: float, digits: int):
+    if pd.isna(x):
+        return ""
+    if x != 0 and abs(x) < 1:
+        return f"{x:.{max(digits, 3)}g}"  # keep rates/shares meaningful
+    return f"{x:.{digits}f}".rstrip("0").rstrip(".") if digits else f"{x:.0f}"
+
+
+def _alias(name: str, taken: set):
+    words = [w for w in re.split(r"[^0-9a-zA-Z]+", name) if w]
+    base = "".join(w[0] for w in words).lower() if len(words) > 1 else name[:6].lower()
+    alias, n = base, 2
+    while alias in taken:
+        alias, n = f"{base}{n}", n + 1
+    taken.add(alias)
+    return alias
+
+
+def compact_csv_lines(df: pd.DataFrame, float_digits: int = 2, alias_columns: bool = False):
+    """Serialize ``df`` as CSV lines with rounded floats; returns ``(header_lines, row_lines)``.
+
+    With ``alias_columns`` long column names are replaced by short aliases and a
+    legend line is added (only pays off for wide tables).
+    """
+    out = df.copy()
+    for col in out.columns:
+        if pd.api.types.is_float_dtype(out[col]):
+            out[col] = out[col].map(lambda x: _format_float(x, float_digits))
+        elif pd.api.types.is_datetime64_any_dtype(out[col]):
+            out[col] = out[col].dt.strftime("%Y-%m-%d")
+    header: List[str] = []
+    if alias_columns:
+        taken: set = set()
+        names = {c: (_alias(str(c), taken) if len(str(c)) > 8 else str(c)) for c in out.columns}
+        legend = [f"{a}={c}" for c, a in names.items() if a != str(c)]
+        if legend:
+            header.append("# columns: " + ", ".join(legend))
+        out = out.rename(columns=names)
+    lines = out.to_csv(index=False, lineterminator="\n").rstrip("\n").split("\n")
+    return header + lines[:1], lines[1:]
+
+
+def _omitted_note(df: pd.DataFrame, shown: int, float_digits: int):
+    rest = df.iloc[shown:]
+    totals = []
+    for col in rest.columns:
+        # Rates, averages and bounds are not additive; only sum the rest.
+        if pd.api.types.is_numeric_dtype(rest[col]) and not pd.api.types.is_bool_dtype(rest[col]):
+            if not re.search(r"rate|avg|mean|share|pct|min|max", str(col), re.IGNORECASE):
+                totals.append(f"{col}={_format_float(float(rest[col].sum()), float_digits)}")
+    note = f"# {len(rest)} more rows omitted"
+    return note + (f"; their totals: {', '.join(totals)}" if totals else "")
+
+
+@dataclass
+class PromptBudget:
+    """Token budget for LLM prompts that embed result tables.
+
+    Message dicts may carry a ``table`` DataFrame next to their ``content`` header.
+    ``render`` serializes tables as compact CSV and trims tail rows (with a totals
+    line for what was cut) so the whole prompt fits ``max_prompt_tokens``; the
+    text sections are never cut.
+    """
+
+    max_prompt_tokens: int = 3000
+    float_digits: int = 2
+    alias_columns: bool = False
+    min_table_tokens: int = 80
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any]):
+        """Build from the ``prompt_budget`` section of model_config.yaml; None when disabled."""
+        c = cfg.get("prompt_budget", {}) or {}
+        if not c.get("enabled", True):
+            return None
+        return cls(
+            max_prompt_tokens=int(c.get("max_prompt_tokens", 3000)),
+            float_digits=int(c.get("float_digits", 2)),
+            alias_columns=bool(c.get("alias_columns", False)),
+            min_table_tokens=int(c.get("min_table_tokens", 80)),
+        )
+
+    def _allocate(self, sizes: List[int], available: int):
+        """Water-filling: small tables keep everything, large ones share the rest."""
+        budgets = [0] * len(sizes)
+        remaining = max(available, self.min_table_tokens * len(sizes))
+        order = sorted(range(len(sizes)), key=lambda i: sizes[i])
+        for n, i in enumerate(order):
+            share = remaining // (len(sizes) - n)
+            budgets[i] = max(min(sizes[i], share), self.min_table_tokens)
+            remaining -= budgets[i]
+        return budgets
+
+    def _fit_table(self, df: pd.DataFrame, budget: int):
+        header, rows = compact_csv_lines(df, self.float_digits, self.alias_columns)
+        full = "\n".join(header + rows)
+        if estimate_tokens(full) <= budget:
+            return full
+        used = estimate_tokens("\n".join(header))
+        kept = 0
+        for line in rows:
+            cost = estimate_tokens(line) + 1
+            # Keep room for the omitted-rows note unless this is the last row.
+            reserve = 0 if kept == len(rows) - 1 else 40
+            if used + cost + reserve > budget and kept > 0:
+                break
+            used += cost
+            kept += 1
+        text = "\n".join(header + rows[:kept])
+        if kept < len(rows):
+            text += "\n" + _omitted_note(df, kept, self.float_digits)
+        return text
+
+    def render(self, messages: List[Dict[str, Any]], stage: str = "default"):
+        """Return plain ``{"role", "content"}`` messages fitted to the budget."""
+        tables = [i for i, m in enumerate(messages) if isinstance(m.get("table"), pd.DataFrame)]
+        fixed = sum(estimate_tokens(m.get("content", "")) for m in messages)
+        if not tables:
+            logger.info("prompt tokens [%s]: %d -> %d", stage, fixed, fixed)
+            return [{"role": m.get("role"), "content": m.get("content", "")} for m in messages]
+
+        sizes = []
+        for i in tables:
+            header, rows = compact_csv_lines(
+                messages[i]["table"], self.float_digits, self.alias_columns
+            )
+            sizes.append(estimate_tokens("\n".join(header + rows)))
+        budgets = self._allocate(sizes, self.max_prompt_tokens - fixed)
+        fitted = {i: self._fit_table(messages[i]["table"], b) for i, b in zip(tables, budgets)}
+
+        out = []
+        before = after = fixed
+        sections = []
+        for i, m in enumerate(messages):
+            content = m.get("content", "")
+            if i in fitted:
+                md = estimate_tokens(df_to_markdown(m["table"], max_rows=len(m["table"])))
+                now = estimate_tokens(fitted[i])
+                before, after = before + md, after + now
+                sections.append(f"{content.splitlines()[0] if content else i}={md}->{now}")
+                content = f"{content}\n{fitted[i]}" if content else fitted[i]
+            out.append({"role": m.get("role"), "content": content})
+        logger.info("prompt tokens [%s]: %d -> %d (%s)", stage, before, after, ", ".join(sections))
+        return out
+
+
+def render_messages(
+    messages: List[Dict[str, Any]], budget: PromptBudget | None, stage: str = "default"
+):
+    """Plain messages for the LLM; tables as markdown when no budget is configured."""
+    if budget is not None:
+        return budget.render(messages, stage=stage)
+    out = []
+    for m in messages:
+        content = m.get("content", "")
+        if isinstance(m.get("table"), pd.DataFrame):
+            md = df_to_markdown(m["table"], max_rows=len(m["table"]))
+            content = f"{content}\n{md}" if content else md
+        out.append({"role": m.get("role"), "content": content})
+    return out
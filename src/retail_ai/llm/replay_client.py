@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List
+
+from retail_ai.llm.base import BaseChat
+from retail_ai.llm.stub_client import StubChat, simulated_stream
+
+logger = logging.getLogger(__name__)
+
+
+def recording_key(prompt: str, stage: str):
+    """Recordings are keyed on stage + flattened prompt (not the model), so a capture
+    can be replayed under another model name."""
+    return hashlib.sha256(f"{stage}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+@dataclass
+class RecordReplayChat(BaseChat):
+    """Record/replay backend (``llm.provider: record`` / ``replay``).
+
+    ``record`` forwards calls to ``inner`` (normally Gemini) and appends prompt,
+    response and latency to ``path`` as JSON lines. ``replay`` answers from that
+    file without network access, sleeping for the recorded latency (``latency:
+    recorded``), a fixed number of milliseconds, or not at all (``0``), scaled by
+    ``latency_scale``. A prompt that was never recorded raises ``LookupError``,
+    or gets a stub answer with ``on_miss: stub``.
+    """
+
+    path: Path = Path("data/llm_recordings.jsonl")
+    mode: str = "replay"
+    inner: BaseChat | None = None
+    latency: Any = "recorded"
+    latency_scale: float = 1.0
+    on_miss: str = "error"
+    _entries: Dict[str, Dict[str, Any]] = field(default_factory=dict, init=False, repr=False)
+    _lock: Any = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self):
+        self.path = Path(self.path)
+        if self.mode not in ("record", "replay"):
+            raise ValueError(f"mode must be 'record' or 'replay', not {self.mode!r}")
+        if self.mode == "record" and self.inner is None:
+            raise ValueError("record mode needs an inner backend")
+        self._fallback = StubChat(model=self.model) if self.on_miss == "stub" else None
+        self.stats = {"replayed": 0, "recorded": 0, "missed": 0}
+        if self.path.exists():
+            with self.path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]] = entry
+        elif self.mode == "replay":
+            logger.warning("No LLM recordings at %s; every replayed call will miss", self.path)
+
+    def __len__(self):
+        return len(self._entries)
+
+    # -- recording ---------------------------------------------------------
+
+    def _record(
+        self,
+        prompt: str,
+        stage: str,
+        text: str,
+        latency_s: float,
+        first_token_s: float | None = None,
+    ):
+        entry = {
+            "key": recording_key(prompt, stage),
+            "stage": stage,
+            "model": self.model,
+            "prompt": prompt,
+            "response": text,
+            "latency_ms": round(latency_s * 1000, 1),
+            "first_token_ms": round(first_token_s * 1000, 1) if first_token_s is not None else None,
+        }
+        with self._lock:
+            self._entries[entry["key"]] = entry
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            self.stats["recorded"] += 1
+
+    # -- replay ------------------------------------------------------------
+
+    def _lookup(self, prompt: str, stage: str):
+        entry = self._entries.get(recording_key(prompt, stage))
+        with self._lock:
+            self.stats["replayed" if entry is not None else "missed"] += 1
+        if entry is None and self._fallback is None:
+            raise LookupError(
+                f"No recorded {stage} response for this prompt in {self.path}; "
+                "capture it first with llm.provider: record"
+            )
+        return entry
+
+    def _delays(self, entry: Dict[str, Any]):
+        """(first_token_s, total_s) to simulate for ``entry``."""
+        if self.latency == "recorded":
+            total = float(entry.get("latency_ms") or 0) / 1000
+            first = entry.get("first_token_ms")
+            first = float(first) / 1000 if first is not None else total
+        else:
+            total = first = float(self.latency or 0) / 1000
+        return first * self.latency_scale, total * self.latency_scale
+
+    def _generate(self, prompt: str, max_output_tokens: int, stage: str):
+        if self.mode == "record":
+            t0 = time.perf_counter()
+            text = self.inner._generate(prompt, max_output_tokens, stage)
+            self._record(prompt, stage, text, time.perf_counter() - t0)
+            return text
+        entry = self._lookup(prompt, stage)
+        if entry is None:
+            return self._fallback._text(prompt, stage)
+        _, total = self._delays(entry)
+        if total:
+            time.sleep(total)
+        return entry["response"]
+
+    def _generate_stream(self, prompt: str, max_output_tokens: int, stage: str):
+        if self.mode == "record":
+            t0 = time.perf_counter()
+            first: float | None = None
+            parts: List[str] = []
+            for text in self.inner._generate_stream(prompt, max_output_tokens, stage):
+                if first is None:
+                    first = time.perf_counter() - t0
+                parts.append(text)
+                yield text
+            self._record(prompt, stage, "".join(parts), time.perf_counter() - t0, first)
+            return
+        entry = self._lookup(prompt, stage)
+        if entry is None:
+            yield self._fallback._text(prompt, stage)
+            return
+        first, total = self._delays(entry)
+        yield from simulated_stream(entry["response"], first, total)
+
+    async def _agenerate(self, prompt: str, max_output_tokens: int, stage: str):
+        if self.mode == "record":
+            t0 = time.perf_counter()
+            text = await self.inner._agenerate(prompt, max_output_tokens, stage)
+            await asyncio.to_thread(self._record, prompt, stage, text, time.perf_counter() - t0)
+            return text
+        entry = self._lookup(prompt, stage)
+        if entry is None:
+            return self._fallback._text(prompt, stage)
+        _, total = self._delays(entry)
+        if total:
+            await asyncio.sleep(total)
+        return entry["response"]
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict
+
+
+def cache_key(
+    prompt: str, model: str, temperature: float, max_output_tokens: int, scope: str | None
+):
+    """Key a completion on everything that can change its output."""
+    raw = json.dumps(
+        {
+            "prompt": prompt,
+            "model": model,
+            "temperature": round(float(temperature), 4),
+            "max_output_tokens": int(max_output_tokens),
+            "scope": scope or "",
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class ResponseCache:
+    """Disk-backed (SQLite) cache of LLM completions with LRU eviction and TTL.
+
+    Hit/miss counters are kept per stage (planner, narrator, summary, ...).
+    """
+
+    path: Path
+    max_entries: int = 5000
+    ttl_seconds: float = 7 * 24 * 3600
+    _counters: Dict[str, Dict[str, int]] = field(default_factory=dict, init=False, repr=False)
+    _lock: Any = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self):
+        self.path = Path(self.path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access)")
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any]):
+        """Build from the ``llm_cache`` section of model_config.yaml; None when disabled."""
+        c = cfg.get("llm_cache", {}) or {}
+        if not c.get("enabled", False):
+            return None
+        return cls(
+            path=Path(c.get("path", "data/cache/llm_responses.sqlite")),
+            max_entries=int(c.get("max_entries", 5000)),
+            ttl_seconds=float(c.get("ttl_seconds", 7 * 24 * 3600)),
+        )
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(str(self.path), timeout=30)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _count(self, stage: str, outcome: str):
+        with self._lock:
+            c = self._counters.setdefault(stage, {"hits": 0, "misses": 0})
+            c[outcome] += 1
+
+    def get(self, key: str, stage: str = "default"):
+        now = time.time()
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is not None:
+                db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        self._count(stage, "hits" if row is not None else "misses")
+        return row[0] if row is not None else None
+
+    def put(self, key: str, value: str):
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+            db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (int(self.max_entries),),
+            )
+
+    def clear(self):
+        with self._connect() as db:
+            db.execute("DELETE FROM responses")
+
+    def stats(self):
+        with self._lock:
+            return {stage: dict(c) for stage, c in self._counters.items()}
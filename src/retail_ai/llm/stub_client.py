@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Dict
+
+from retail_ai.llm.base import BaseChat
+
+# Planner output of the stub when no response is configured for the stage.
+DEFAULT_PLAN = {
+    "intent": "qa",
+    "metrics": ["shipped_amount"],
+    "group_by": ["Category"],
+    "filters": {},
+    "time": {"from": None, "to": None},
+    "sort": [{"by": "shipped_amount", "order": "desc"}],
+    "limit": 10,
+    "notes": "stub planner",
+}
+
+
+def chunked(text: str, parts: int = 8):
+    """Split ``text`` into about ``parts`` chunks at word boundaries (for simulated streaming)."""
+    words = text.split(" ")
+    step = max(1, -(-len(words) // parts))
+    return [
+        " ".join(words[i : i + step]) + (" " if i + step < len(words) else "")
+        for i in range(0, len(words), step)
+    ]
+
+
+def simulated_stream(text: str, first_token_s: float, total_s: float):
+    """Yield ``text`` in chunks: the first after ``first_token_s``, the rest spread until ``total_s``."""
+    chunks = chunked(text) or [""]
+    if first_token_s > 0:
+        time.sleep(first_token_s)
+    gap = max(0.0, total_s - first_token_s) / max(1, len(chunks) - 1)
+    for i, chunk in enumerate(chunks):
+        if i and gap:
+            time.sleep(gap)
+        yield chunk
+
+
+@dataclass
+class StubChat(BaseChat):
+    """Deterministic offline backend (``llm.provider: stub``).
+
+    Returns ``responses[stage]`` when configured, a fixed plan for the planner and
+    a short text derived from the prompt hash otherwise; ``latency_ms`` simulates
+    the model's response time. Needs no API key.
+    """
+
+    responses: Dict[str, str] = field(default_factory=dict)
+    latency_ms: float = 0.0
+
+    def _text(self, prompt: str, stage: str):
+        if stage in self.responses:
+            return self.responses[stage]
+        if stage == "planner":
+            return json.dumps(DEFAULT_PLAN)
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+        return f"Stub {stage} response {digest} ({len(prompt)} prompt characters)."
+
+    def _generate(self, prompt: str, max_output_tokens: int, stage: str):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return self._text(prompt, stage)
+
+    def _generate_stream(self, prompt: str, max_output_tokens: int, stage: str):
+        latency = self.latency_ms / 1000
+        yield from simulated_stream(self._text(prompt, stage), latency / 2, latency)
+
+    async def _agenerate(self, prompt: str, max_output_tokens: int, stage: str):
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return self._text(prompt, stage)
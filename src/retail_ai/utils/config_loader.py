@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import logging.config
 from pathlib import Path
 from typing import Any, Dict
 
@@ -10,3 +11,15 @@ def load_yaml(path: str | Path):
     p = Path(path)
     with p.open("r", encoding="utf-8") as f:
         return yaml.safe_load(f) or {}
+
+
+def configure_logging(path: str | Path = "config/logging_config.yaml"):
+    """Apply the dictConfig in ``path`` (skipped when the file does not exist)."""
+    p = Path(path)
+    if not p.exists():
+        return False
+    cfg: Dict[str, Any] = load_yaml(p)
+    # Module loggers are created at import time; keep them enabled.
+    cfg.setdefault("disable_existing_loggers", False)
+    logging.config.dictConfig(cfg)
+    return True
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import re
-from typing import Any, Dict, List
 
 import pandas as pd
+import pyarrow as pa
 
 
 def extract_json(text: str):
@@ -31,8 +32,63 @@ def get_schema_metadata(df: pd.DataFrame):
     )
 
 
-def df_to_markdown(df: pd.DataFrame, max_rows: int = 10):
+_NULLABLE_INTS = {
+    pa.int8(): pd.Int8Dtype(),
+    pa.int16(): pd.Int16Dtype(),
+    pa.int32(): pd.Int32Dtype(),
+    pa.int64(): pd.Int64Dtype(),
+    pa.uint8(): pd.UInt8Dtype(),
+    pa.uint16(): pd.UInt16Dtype(),
+    pa.uint32(): pd.UInt32Dtype(),
+    pa.uint64(): pd.UInt64Dtype(),
+}
+
+
+def _fetchdf_types(table: pa.Table):
+    """Cast ``table`` to the types ``fetchdf()`` produces: DECIMAL / HUGEINT as
+    float64, DATE as datetime64[us]."""
+    fields = []
+    for f in table.schema:
+        if pa.types.is_decimal(f.type):
+            f = f.with_type(pa.float64())
+        elif pa.types.is_date(f.type):
+            f = f.with_type(pa.timestamp("us"))
+        fields.append(f)
+    schema = pa.schema(fields, metadata=table.schema.metadata)
+    return table if schema.equals(table.schema) else table.cast(schema)
+
+
+def arrow_to_df(table: pa.Table):
+    """DataFrame copy of an Arrow result, typed as ``fetchdf()`` would, for callers that need pandas."""
+    table = _fetchdf_types(table)
+    df = table.to_pandas()
+    # Integer columns with NULLs stay integers (pandas' nullable dtypes), not float64.
+    for f in table.schema:
+        if pa.types.is_integer(f.type) and table.column(f.name).null_count:
+            df[f.name] = table.column(f.name).to_pandas(types_mapper=_NULLABLE_INTS.get)
+    # Categorical codes are zero-copy views of Arrow's read-only dictionary indices.
+    for col in df.select_dtypes("category").columns:
+        df[col] = df[col].copy()
+    return df
+
+
+def df_to_markdown(df: pd.DataFrame | pa.Table, max_rows: int = 10):
+    if isinstance(df, pa.Table):
+        # Only the rows shown leave Arrow (slicing is zero-copy).
+        df = arrow_to_df(df.slice(0, max_rows))
     try:
         return df.head(max_rows).to_markdown(index=False)
     except Exception:
         return df.head(max_rows).to_string(index=False)
+
+
+def dataset_fingerprint(df: pd.DataFrame):
+    """Stable identity of a dataset; uses the loader's fingerprint when present."""
+    fp = df.attrs.get("fingerprint")
+    if not fp:
+        digest = hashlib.sha256()
+        digest.update(",".join(map(str, df.columns)).encode("utf-8"))
+        digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+        fp = digest.hexdigest()
+        df.attrs["fingerprint"] = fp
+    return fp
@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+PENDING, RUNNING, DONE, FAILED, CANCELLED = "pending", "running", "done", "failed", "cancelled"
+
+
+class JobCancelled(Exception):
+    """Raised inside a job (``Job.check_cancelled``) once it was cancelled."""
+
+
+@dataclass(eq=False)
+class Job:
+    """One background computation: status, result, and the events it emitted.
+
+    Any number of callers can ``follow()`` a job (replaying earlier events, then
+    waiting for new ones) or block on ``result()``.
+    """
+
+    key: Hashable
+    name: str = ""
+    status: str = PENDING
+    error: BaseException | None = None
+    submitted_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    _value: Any = field(default=None, repr=False)
+    _events: List[Dict[str, Any]] = field(default_factory=list, repr=False)
+    _cancel: bool = field(default=False, repr=False)
+    _future: Any = field(default=None, repr=False)
+    _on_finish: Callable[["Job"], None] | None = field(default=None, repr=False)
+    _cancel_hooks: List[Callable[[], None]] = field(default_factory=list, repr=False)
+
+    def __post_init__(self):
+        self._cond = threading.Condition(threading.Lock())
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    @property
+    def cancel_requested(self):
+        return self._cancel
+
+    def emit(self, event: Dict[str, Any]):
+        """Publish a progress event to everyone following the job."""
+        with self._cond:
+            self._events.append(event)
+            self._cond.notify_all()
+
+    def follow(self, timeout: float | None = None) -> Iterator[Dict[str, Any]]:
+        """Events emitted so far, then new ones as they come, until the job finishes."""
+        i = 0
+        while True:
+            with self._cond:
+                if not self._cond.wait_for(
+                    lambda: len(self._events) > i or self.finished, timeout=timeout
+                ):
+                    raise TimeoutError(
+                        f"job {self.name or self.key!r} did not progress in {timeout}s"
+                    )
+                events, finished = self._events[i:], self.finished
+            i += len(events)
+            yield from events
+            if finished and not events:
+                return
+
+    def result(self, timeout: float | None = None):
+        """Wait for the job; returns its value or re-raises its error."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.finished, timeout=timeout):
+                raise TimeoutError(
+                    f"job {self.name or self.key!r} still {self.status} after {timeout}s"
+                )
+        if self.status == CANCELLED:
+            raise JobCancelled(f"job {self.name or self.key!r} was cancelled")
+        if self.error is not None:
+            raise self.error
+        return self._value
+
+    def cancel(self):
+        """Request cancellation: a pending job never starts, a running one stops at
+        its next ``check_cancelled()`` (or when a ``cancel_hook`` interrupts it).
+        Returns False when it already finished."""
+        with self._cond:
+            if self.finished:
+                return False
+            self._cancel = True
+            hooks = list(self._cancel_hooks)
+        if self._future is not None and self._future.cancel():
+            self._finish(CANCELLED)
+        for hook in hooks:
+            hook()
+        return True
+
+    def check_cancelled(self):
+        if self._cancel:
+            raise JobCancelled(f"job {self.name or self.key!r} was cancelled")
+
+    @contextmanager
+    def cancel_hook(self, fn: Callable[[], None]):
+        """Call ``fn`` (e.g. a cursor's ``interrupt``) if the job is cancelled inside the block."""
+        with self._cond:
+            self._cancel_hooks.append(fn)
+        try:
+            self.check_cancelled()
+            yield
+        finally:
+            with self._cond:
+                self._cancel_hooks.remove(fn)
+
+    def info(self):
+        end = self.finished_at or time.time()
+        return {
+            "name": self.name,
+            "status": self.status,
+            "error": None if self.error is None else f"{type(self.error).__name__}: {self.error}",
+            "queued_ms": round(1000 * ((self.started_at or end) - self.submitted_at), 1),
+            "run_ms": round(1000 * (end - self.started_at), 1) if self.started_at else None,
+            "events": len(self._events),
+        }
+
+    def _finish(self, status: str, value: Any = None, error: BaseException | None = None):
+        with self._cond:
+            if self.finished:
+                return
+            self.status, self._value, self.error = status, value, error
+            self.finished_at = time.time()
+            self._cond.notify_all()
+        if self._on_finish is not None:
+            self._on_finish(self)
+
+
+@dataclass
+class JobScheduler:
+    """Runs jobs on a small worker pool, one job per key.
+
+    ``submit`` returns the existing job while one with the same key is pending,
+    running or done, so concurrent requests for the same work share one run and
+    later ones get the stored result. Failed and cancelled jobs are replaced on
+    the next submit. The ``max_jobs`` most recent finished jobs are kept.
+    """
+
+    workers: int = 2
+    max_jobs: int = 32
+    _jobs: "OrderedDict[Hashable, Job]" = field(default_factory=OrderedDict, init=False, repr=False)
+    _lock: Any = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, int(self.workers)), thread_name_prefix="job"
+        )
+        self._counts = {"submitted": 0, "deduplicated": 0, "done": 0, "failed": 0, "cancelled": 0}
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any]):
+        """Build from the ``precompute`` section of model_config.yaml; None when disabled."""
+        c = cfg.get("precompute", {}) or {}
+        if not c.get("enabled", True):
+            return None
+        return cls(workers=int(c.get("workers", 2)), max_jobs=int(c.get("max_jobs", 32)))
+
+    def submit(self, key: Hashable, fn: Callable[[Job], Any], name: str = ""):
+        """Job for ``key``; ``fn(job)`` runs on a worker unless a live job already exists."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.status in (PENDING, RUNNING, DONE):
+                self._jobs.move_to_end(key)
+                self._counts["deduplicated"] += 1
+                return job
+            job = self._jobs[key] = Job(key=key, name=name, _on_finish=self._count)
+            self._counts["submitted"] += 1
+            self._evict()
+        job._future = self._executor.submit(self._run, job, fn)
+        return job
+
+    def get(self, key: Hashable):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def cancel(self, key: Hashable):
+        job = self.get(key)
+        return job.cancel() if job is not None else False
+
+    def cancel_all(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job.cancel()
+
+    def forget(self, key: Hashable):
+        """Drop a stored job (e.g. its dataset changed); a running one keeps running."""
+        with self._lock:
+            self._jobs.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            states: Dict[str, int] = {}
+            for job in self._jobs.values():
+                states[job.status] = states.get(job.status, 0) + 1
+            return {**self._counts, "jobs": states}
+
+    def _evict(self):
+        finished = [k for k, j in self._jobs.items() if j.finished]
+        while len(self._jobs) > self.max_jobs and finished:
+            self._jobs.pop(finished.pop(0), None)
+
+    def _run(self, job: Job, fn: Callable[[Job], Any]):
+        if job.cancel_requested:
+            job._finish(CANCELLED)
+            return
+        job.started_at = time.time()
+        job.status = RUNNING
+        try:
+            value = fn(job)
+        except JobCancelled:
+            job._finish(CANCELLED)
+        except Exception as e:  # noqa: BLE001 - kept on the job, re-raised by result()
+            if job.cancel_requested:  # e.g. the query a cancel_hook interrupted
+                job._finish(CANCELLED)
+                return
+            logger.warning("Background job %s failed: %s", job.name or job.key, e)
+            job._finish(FAILED, error=e)
+        else:
+            job._finish(DONE, value=value)
+
+    def _count(self, job: Job):
+        with self._lock:
+            self._counts[job.status] += 1
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+# Spans nest through context variables, so child spans opened in LangGraph nodes,
+# DuckDB calls and LLM calls attach to the request's root span. Worker threads
+# must run under ``contextvars.copy_context()`` to keep the parent.
+_current_span: ContextVar["Span | None"] = ContextVar("retail_ai_span", default=None)
+_active_tracer: ContextVar["Tracer | None"] = ContextVar("retail_ai_tracer", default=None)
+_profile_queries: ContextVar[bool] = ContextVar("retail_ai_profile_queries", default=False)
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None = None
+    start: float = 0.0  # wall clock (epoch seconds)
+    duration_ms: float | None = None
+    attrs: Dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+
+    def set(self, **attrs: Any):
+        self.attrs.update(attrs)
+
+    def to_dict(self):
+        return asdict(self)
+
+
+class _NoopSpan:
+    """Returned when tracing is off, so call sites can ``set()`` unconditionally."""
+
+    trace_id = span_id = parent_id = None
+
+    def set(self, **attrs: Any):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+@dataclass
+class Tracer:
+    """In-process span recorder.
+
+    Finished spans are kept in a bounded ring buffer (``max_spans``) and, when
+    ``export_path`` is set, appended to that file as JSON lines.
+    """
+
+    enabled: bool = True
+    max_spans: int = 5000
+    export_path: str | None = None
+
+    def __post_init__(self):
+        self._spans: deque = deque(maxlen=max(1, int(self.max_spans)))
+        self._lock = threading.Lock()
+        self._last_trace: str | None = None
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any]):
+        c = cfg.get("tracing", {}) or {}
+        return cls(
+            enabled=bool(c.get("enabled", True)),
+            max_spans=int(c.get("max_spans", 5000)),
+            export_path=c.get("export_path") or None,
+        )
+
+    @contextmanager
+    def activate(self):
+        """Make this the tracer used by ``span()`` in the current context."""
+        token = _active_tracer.set(self)
+        try:
+            yield self
+        finally:
+            _active_tracer.reset(token)
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[Span | _NoopSpan]:
+        """Time a block as a child of the current span (or as a new trace)."""
+        if not self.enabled:
+            yield _NOOP
+            return
+        parent = _current_span.get()
+        s = Span(
+            name=name,
+            trace_id=parent.trace_id if parent is not None else uuid.uuid4().hex[:16],
+            span_id=uuid.uuid4().hex[:16],
+            parent_id=parent.span_id if parent is not None else None,
+            start=time.time(),
+            attrs=dict(attrs),
+        )
+        token = _current_span.set(s)
+        t0 = time.perf_counter()
+        try:
+            yield s
+        except BaseException as e:
+            s.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            s.duration_ms = round((time.perf_counter() - t0) * 1000, 3)
+            _current_span.reset(token)
+            self._record(s)
+
+    def _record(self, s: Span):
+        with self._lock:
+            self._spans.append(s)
+            if s.parent_id is None:
+                self._last_trace = s.trace_id
+                logger.info("%s took %.1f ms (trace %s)", s.name, s.duration_ms, s.trace_id)
+            if self.export_path:
+                try:
+                    path = Path(self.export_path)
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    with path.open("a", encoding="utf-8") as f:
+                        f.write(json.dumps(s.to_dict(), default=str) + "\n")
+                except OSError:
+                    logger.warning("Could not export span to %s", self.export_path, exc_info=True)
+
+    @property
+    def last_trace_id(self):
+        return self._last_trace
+
+    def spans(self, trace_id: str | None = None):
+        """Finished spans (oldest first) as dicts, optionally of one trace."""
+        with self._lock:
+            items = list(self._spans)
+        return [s.to_dict() for s in items if trace_id is None or s.trace_id == trace_id]
+
+    def to_jsonl(self, trace_id: str | None = None):
+        return "".join(json.dumps(s, default=str) + "\n" for s in self.spans(trace_id))
+
+    def export_jsonl(self, path: str | Path, trace_id: str | None = None):
+        """Append the buffered spans (or one trace) to ``path``; returns the count."""
+        spans = self.spans(trace_id)
+        p = Path(path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        with p.open("a", encoding="utf-8") as f:
+            for s in spans:
+                f.write(json.dumps(s, default=str) + "\n")
+        return len(spans)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+            self._last_trace = None
+
+
+def current_tracer():
+    return _active_tracer.get()
+
+
+@contextmanager
+def span(name: str, **attrs: Any):
+    """Span on the active tracer; a no-op outside ``Tracer.activate()``."""
+    tracer = _active_tracer.get()
+    if tracer is None:
+        yield _NOOP
+        return
+    with tracer.span(name, **attrs) as s:
+        yield s
+
+
+@contextmanager
+def profile_queries(enabled: bool = True):
+    """Attach DuckDB query profiles (EXPLAIN ANALYZE trees) to ``duckdb.query`` spans."""
+    token = _profile_queries.set(bool(enabled))
+    try:
+        yield
+    finally:
+        _profile_queries.reset(token)
+
+
+def profiling_queries():
+    return _profile_queries.get()
+
+
+def span_table(spans: List[Dict[str, Any]]):
+    """Flatten spans into display rows, depth-first (children under their parent,
+    name indented by depth), with start offsets relative to the first span."""
+    by_id = {s["span_id"]: s for s in spans}
+    children: Dict[str | None, List[Dict[str, Any]]] = {}
+    for s in spans:
+        parent = s.get("parent_id") if s.get("parent_id") in by_id else None
+        children.setdefault(parent, []).append(s)
+
+    t0 = min((s["start"] for s in spans), default=0.0)
+    rows: List[Dict[str, Any]] = []
+
+    def visit(parent: str | None, depth: int):
+        for s in sorted(children.get(parent, []), key=lambda s: s["start"]):
+            attrs = {k: v for k, v in s["attrs"].items() if k != "profile"}
+            rows.append(
+                {
+                    "span": "  " * depth + s["name"],
+                    "start_ms": round((s["start"] - t0) * 1000, 1),
+                    "duration_ms": s["duration_ms"],
+                    "attrs": json.dumps(attrs, default=str),
+                    "error": s["error"] or "",
+                }
+            )
+            visit(s["span_id"], depth + 1)
+
+    visit(None, 0)
+    return rows
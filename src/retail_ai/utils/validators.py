@@ -1,8 +1,8 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Tuple
+from typing import Any, Collection, Dict, List
 
-from retail_ai.data_engine.sql_builder import SAFE_METRICS
+from retail_ai.data_engine.sql_builder import SAFE_METRICS, TIME_GRAINS
 
 
 def validate_sql_is_select(sql: str):
@@ -14,7 +14,7 @@ def validate_sql_is_select(sql: str):
         raise ValueError("Potentially unsafe SQL detected.")
 
 
-def validate_plan(plan: Dict[str, Any], schema_cols: List[str]):
+def validate_plan(plan: Dict[str, Any], schema_cols: Collection[str], max_limit: int = 200):
     warnings: List[str] = []
 
     if not isinstance(plan, dict):
@@ -46,11 +46,17 @@ def validate_plan(plan: Dict[str, Any], schema_cols: List[str]):
     time.setdefault("to", None)
     plan["time"] = time
 
+    grain = plan.pop("time_grain", None)
+    if grain in TIME_GRAINS:
+        plan["time_grain"] = grain
+    elif grain is not None:
+        warnings.append(f"Unsupported time_grain {grain!r}; results are not split by period.")
+
     try:
         plan["limit"] = int(plan.get("limit") or 10)
     except Exception:
         plan["limit"] = 10
-    plan["limit"] = max(1, min(plan["limit"], 200))
+    plan["limit"] = max(1, min(plan["limit"], max_limit))
 
     notes = (plan.get("notes") or "").lower()
     if "yoy" in notes or "year over year" in notes:
@@ -0,0 +1,54 @@
+"""Deterministic raw sales rows in the Amazon sale-report shape, for tests."""
+
+from __future__ import annotations
+
+import duckdb
+
+CATEGORIES = ["Set", "kurta", "Western Dress", "Top", "Ethnic Dress", "Blouse", "Saree"]
+STATES = ["MAHARASHTRA", "KARNATAKA", "TAMIL NADU", "TELANGANA", "DELHI", "KERALA", "GOA"]
+RAW_COLUMNS = (
+    '"Order ID" VARCHAR, Date VARCHAR, Status VARCHAR, Fulfilment VARCHAR, '
+    '"ship-service-level" VARCHAR, Category VARCHAR, Qty BIGINT, Amount DOUBLE, '
+    '"ship-city" VARCHAR, "ship-state" VARCHAR'
+)
+CITIES = ["MUMBAI", "PUNE", "BENGALURU", "CHENNAI", "HYDERABAD", "NEW DELHI", "KOCHI"]
+
+
+def _pick(values, key: str, salt: int):
+    arr = "[" + ", ".join(f"'{v}'" for v in values) + "]"
+    return f"{arr}[1 + CAST(hash({key}, {salt}) % {len(values)} AS INTEGER)]"
+
+
+def create_raw_sales(
+    conn: duckdb.DuckDBPyConnection,
+    rows: int,
+    table_name: str = "sales_raw",
+    days: int = 90,
+    cities=CITIES,
+):
+    """Create ``table_name`` with ``rows`` raw rows, two lines per order.
+
+    Date, state, city, fulfilment and service level are drawn per order, the
+    category, status and measures per line.
+    """
+    order = "(i // 2)"
+    conn.execute(f"""CREATE OR REPLACE TABLE {table_name} AS SELECT
+  'O' || CAST({order} AS VARCHAR) AS "Order ID",
+  STRFTIME(DATE '2022-04-01' + CAST(hash({order}, 1) % {int(days)} AS INTEGER), '%m-%d-%y') AS Date,
+  {_pick(["Shipped", "Shipped - Delivered to Buyer", "Cancelled", "Pending"], "i", 2)} AS Status,
+  {_pick(["Amazon", "Merchant"], order, 3)} AS Fulfilment,
+  {_pick(["Expedited", "Standard"], order, 4)} AS "ship-service-level",
+  {_pick(CATEGORIES, "i", 5)} AS Category,
+  CAST(hash(i, 6) % 3 AS BIGINT) AS Qty,
+  ROUND(199 + hash(i, 7) % 200000 / 100.0, 2) AS Amount,
+  {_pick(cities, order, 8)} AS "ship-city",
+  {_pick(STATES, order, 9)} AS "ship-state"
+FROM range({int(rows)}) t(i)""")
+    return table_name
+
+
+def insert_raw_rows(conn: duckdb.DuckDBPyConnection, table_name: str, rows):
+    """Create ``table_name`` in the raw shape holding ``rows`` (tuples in RAW_COLUMNS order)."""
+    conn.execute(f"CREATE TABLE {table_name} ({RAW_COLUMNS})")
+    conn.executemany(f"INSERT INTO {table_name} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    return table_name
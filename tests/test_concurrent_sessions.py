@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from retail_ai.data_engine.data_loader import DataLoader
+from retail_ai.engine import RetailAssistantEngine
+from retail_ai.graphs.followup import ChatSession
+
+ROOT = Path(__file__).resolve().parents[1]
+STATES = ["MAHARASHTRA", "KARNATAKA", "DELHI", "GOA"]
+# (first question, follow-up answered from that session's previous plan)
+CONVERSATIONS = [
+    ("Top 5 categories by revenue", "now only MAHARASHTRA"),
+    ("Units sold by state", "what about orders?"),
+    ("Revenue by ship-service-level", "now only KARNATAKA"),
+    ("Cancellation rate by category", "split that by month"),
+]
+
+
+def _csv(path: Path, rows: int = 5000):
+    rng = np.random.default_rng(7)
+    pd.DataFrame(
+        {
+            "Order ID": [f"O{i // 2}" for i in range(rows)],
+            "Date": pd.to_datetime("2022-04-01")
+            + pd.to_timedelta(rng.integers(0, 90, rows), unit="D"),
+            "Status": rng.choice(["Shipped", "Cancelled", "Shipped - Delivered to Buyer"], rows),
+            "Fulfilment": rng.choice(["Amazon", "Merchant"], rows),
+            "ship-service-level": rng.choice(["Expedited", "Standard"], rows),
+            "Category": rng.choice(["Set", "kurta", "Top", "Blouse", "Saree", "Dupatta"], rows),
+            "Qty": rng.integers(0, 4, rows),
+            "Amount": rng.uniform(100, 2000, rows).round(2),
+            "ship-city": rng.choice(["PUNE", "MUMBAI", "BENGALURU", "NEW DELHI", "PANAJI"], rows),
+            "ship-state": rng.choice(STATES, rows),
+        }
+    ).assign(Date=lambda d: d["Date"].dt.strftime("%m-%d-%y")).to_csv(path, index=False)
+
+
+def _engine(tmp_path: Path):
+    cfg = yaml.safe_load((ROOT / "config/model_config.yaml").read_text(encoding="utf-8"))
+    cfg["llm"]["provider"] = "stub"
+    cfg["llm"]["stub"] = {"latency_ms": 20, "responses": {}}
+    cfg["llm_cache"]["enabled"] = False
+    cfg["result_cache"] = {"enabled": False}
+    cfg["connections"] = {"pool_size": 2, "acquire_timeout_seconds": 60, "max_datasets": 2}
+    cfg["tracing"]["enabled"] = False
+    path = tmp_path / "model_config.yaml"
+    path.write_text(yaml.safe_dump(cfg), encoding="utf-8")
+    return RetailAssistantEngine(cfg_path=str(path))
+
+
+def _converse(engine, dataset, conversation):
+    session = ChatSession()
+    out = []
+    for question in conversation:
+        res = engine.answer(dataset, question, session=session)
+        out.append((res.get("error"), res.get("sql"), res.get("result_table")))
+    return session, out
+
+
+def test_concurrent_sessions_are_isolated(tmp_path):
+    (tmp_path / "input").mkdir()
+    _csv(tmp_path / "input" / "sales.csv")
+    dataset = DataLoader(tmp_path / "input", tmp_path / "cache").open(
+        tmp_path / "input" / "sales.csv"
+    )
+    engine = _engine(tmp_path)
+    reference = [_converse(engine, dataset, c)[1] for c in CONVERSATIONS]
+
+    runs = 4  # per conversation, all at once on two pooled read-only connections
+    results = {}
+    barrier = threading.Barrier(runs * len(CONVERSATIONS))
+
+    def run(key, conversation):
+        barrier.wait()
+        results[key] = _converse(engine, dataset, conversation)
+
+    threads = [
+        threading.Thread(target=run, args=((i, r), c))
+        for i, c in enumerate(CONVERSATIONS)
+        for r in range(runs)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(results) == len(threads)
+    for (i, _), (session, answers) in results.items():
+        assert [a[0] for a in answers] == [None, None]
+        for (_, sql, table), (_, ref_sql, ref_table) in zip(answers, reference[i]):
+            assert sql == ref_sql
+            assert table.equals(ref_table)
+        assert session.question == CONVERSATIONS[i][1]
+    assert engine.pool_stats()
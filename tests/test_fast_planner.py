@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import datetime as dt
+
+import pytest
+
+from retail_ai.graphs.fast_planner import rule_plan
+
+COLUMNS = ["Order ID", "order_date", "Category", "Amount", "Qty", "ship-state"]
+BOUNDS = (dt.date(2022, 3, 31), dt.date(2022, 6, 29))
+
+
+@pytest.mark.parametrize("question", ["gross sales in May 2022", "gross sales in May '22"])
+def test_month_with_a_year(question):
+    plan, confidence = rule_plan(question, COLUMNS, BOUNDS)
+    assert plan["time"] == {"from": "2022-05-01", "to": "2022-05-31"}
+    assert confidence == 1.0
+
+
+@pytest.mark.parametrize("question", ["gross sales in May 10", "gross sales in May 22"])
+def test_a_bare_two_digit_number_is_not_read_as_a_year(question):
+    plan, confidence = rule_plan(question, COLUMNS, BOUNDS)
+    assert plan["time"]["from"] == "2022-05-01"  # the month, anchored to the data
+    assert confidence < 1.0
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import duckdb
+import pyarrow as pa
+from sales_data import create_raw_sales
+
+from retail_ai.data_engine.ingest import materialize_sales
+from retail_ai.data_engine.schema_profile import profile_table
+from retail_ai.graphs.followup import ChatSession, plan_followup
+
+PREVIOUS = {
+    "metrics": ["gross_amount"],
+    "group_by": ["ship-state"],
+    "filters": {},
+    "time": {},
+    "time_grain": None,
+    "sort": [{"by": "gross_amount", "order": "desc"}],
+    "limit": 10,
+}
+
+
+def _profile():
+    conn = duckdb.connect()
+    create_raw_sales(conn, 2_000)
+    materialize_sales(conn, "sales_raw")
+    return profile_table(conn, "sales")
+
+
+PROFILE = _profile()
+
+
+def _followup(question):
+    session = ChatSession()
+    result = pa.table({"ship-state": ["GOA", "KERALA"], "gross_amount": [2.0, 1.0]})
+    session.remember("fp", "gross sales by state", PREVIOUS, "SELECT 1", result)
+    return plan_followup(question, session, PROFILE, "fp")
+
+
+def test_a_dimension_without_a_signal_word_is_a_new_question():
+    assert _followup("top categories") is None
+    assert _followup("by Category") is None
+    plan, info = _followup("by Category instead")
+    assert (plan["group_by"], info["kinds"]) == (["Category"], ["regroup"])
+
+
+def test_bare_values_and_counts_are_follow_ups():
+    plan, info = _followup("MAHARASHTRA")
+    assert (plan["filters"], info["kinds"]) == ({"ship-state": "MAHARASHTRA"}, ["filter"])
+    plan, info = _followup("top 3")
+    assert (plan["limit"], info["kinds"]) == (3, ["rerank"])
+
+
+def test_order_words_that_are_values_filter():
+    plan, info = _followup("now only Top")
+    assert plan["filters"] == {"Category": "Top"}
+    assert info["kinds"] == ["filter"]
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import logging
+
+import duckdb
+import pandas as pd
+from sales_data import create_raw_sales, insert_raw_rows
+
+from retail_ai.data_engine.data_loader import DataLoader
+from retail_ai.data_engine.ingest import append_sales, materialize_sales, new_enum_values
+
+# Appended rows: known ENUM values, a city the first ingest did not see.
+DELTA = [
+    ("N1", "06-30-22", "Shipped", "Amazon", "Standard", "Blouse", 1, 70.0, "GUWAHATI", "GOA"),
+    ("N1", "06-30-22", "Shipped", "Amazon", "Standard", "Set", 2, 30.0, "GUWAHATI", "GOA"),
+    ("N2", "04-02-22", "Cancelled", "Merchant", "Expedited", "Top", 1, None, "PUNE", "KERALA"),
+]
+
+
+def _rows(conn, table):
+    df = conn.execute(f"SELECT * FROM {table}").fetchdf()
+    df = df.astype({c: str for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)})
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+def _types(conn, table):
+    return {r[0]: str(r[1]) for r in conn.execute(f"DESCRIBE {table}").fetchall()}
+
+
+def test_append_matches_a_full_ingest():
+    conn = duckdb.connect()
+    create_raw_sales(conn, 20_000, "base", days=30, cities=["PUNE"])
+    insert_raw_rows(conn, "delta", DELTA)
+    conn.execute("CREATE TABLE everything AS SELECT * FROM base UNION ALL SELECT * FROM delta")
+    assert materialize_sales(conn, "everything", "reference") is not None
+
+    assert materialize_sales(conn, "base") is not None
+    assert new_enum_values(conn, "delta") == []
+    assert append_sales(conn, "delta") == len(DELTA)
+
+    pd.testing.assert_frame_equal(_rows(conn, "sales"), _rows(conn, "reference"))
+    pd.testing.assert_frame_equal(
+        _rows(conn, "sales_rollup"), _rows(conn, "reference_rollup"), check_dtype=False
+    )
+    assert _types(conn, "sales")["ship-city"] == "VARCHAR"
+
+
+def _write_csv(conn, table, path, mode="w"):
+    text = conn.execute(f"SELECT * FROM {table}").fetchdf().to_csv(index=False, header=mode == "w")
+    with path.open(mode, encoding="utf-8") as f:
+        f.write(text)
+
+
+def _sales(dataset):
+    with duckdb.connect(str(dataset.cache_path), read_only=True) as conn:
+        rows = conn.execute('SELECT COUNT(*), COUNT(DISTINCT "Order ID") FROM sales').fetchone()
+        categories = conn.execute(
+            "SELECT CAST(Category AS VARCHAR), SUM(Amount) FROM sales GROUP BY ALL ORDER BY 1"
+        ).fetchall()
+        return rows, categories, _types(conn, "sales")["Category"]
+
+
+def test_unseen_category_rebuilds_instead_of_widening_the_enum(tmp_path, caplog):
+    conn = duckdb.connect()
+    create_raw_sales(conn, 2_000, "base")
+    insert_raw_rows(conn, "known", DELTA)
+    insert_raw_rows(
+        conn,
+        "unseen",
+        [("N3", "05-01-22", "Shipped", "Amazon", "Standard", "Kurta", 1, 55.0, "PUNE", "GOA")],
+    )
+    (tmp_path / "input").mkdir()
+    csv = tmp_path / "input" / "sales.csv"
+    _write_csv(conn, "base", csv)
+    loader = DataLoader(tmp_path / "input", tmp_path / "cache")
+    loader.ingest_all()
+
+    caplog.set_level(logging.INFO, logger="retail_ai.data_engine.data_loader")
+    _write_csv(conn, "known", csv, mode="a")
+    loader.ingest_all()
+    assert "rebuilding" not in caplog.text  # appended in place
+
+    _write_csv(conn, "unseen", csv, mode="a")
+    dataset = loader.ingest_all()
+    assert "New rows bring new Category values; rebuilding" in caplog.text
+
+    conn.execute("CREATE TABLE everything AS FROM base UNION ALL FROM known UNION ALL FROM unseen")
+    materialize_sales(conn, "everything", "reference")
+    expected = (
+        conn.execute('SELECT COUNT(*), COUNT(DISTINCT "Order ID") FROM reference').fetchone(),
+        conn.execute(
+            "SELECT CAST(Category AS VARCHAR), SUM(Amount) FROM reference GROUP BY ALL ORDER BY 1"
+        ).fetchall(),
+    )
+    rows, categories, category_type = _sales(dataset)
+    assert (rows, categories) == expected
+    assert "'Kurta'" in category_type
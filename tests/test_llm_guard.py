@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+
+import pytest
+from google.api_core import exceptions as gexc
+
+from retail_ai.llm.base import BaseChat
+from retail_ai.llm.guard import LLMGuard
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def _guard(**kw):
+    return LLMGuard(**{"rate_per_sec": 0, "max_concurrency": 1, "backoff_base_s": 0.001, **kw})
+
+
+@dataclass
+class FlakyChat(BaseChat):
+    """Fails the first ``failures`` requests with a 429, then streams ``chunks``."""
+
+    failures: int = 0
+    chunks: tuple = ("a", "b", "c")
+
+    def _generate(self, prompt, max_output_tokens, stage):
+        return "done"
+
+    def _generate_stream(self, prompt, max_output_tokens, stage):
+        if self.failures:
+            self.failures -= 1
+            raise gexc.TooManyRequests("slow down")
+        yield from self.chunks
+
+
+def test_stream_releases_the_slot_before_the_consumer_reads():
+    chat = FlakyChat(model="m", guard=_guard())
+    stream = chat.stream(MESSAGES)
+    assert next(stream) == "a"  # the reader pauses here, mid-stream
+
+    done = []
+    other = threading.Thread(target=lambda: done.append(chat.complete(MESSAGES)), daemon=True)
+    other.start()
+    other.join(timeout=5)
+    assert done == ["done"]
+    assert list(stream) == ["b", "c"]
+
+
+def test_stream_retries_a_rate_limited_request():
+    guard = _guard()
+    chat = FlakyChat(model="m", guard=guard, failures=2)
+    assert "".join(chat.stream(MESSAGES)) == "abc"
+    assert guard.stats == {"attempts": 3, "retries": 2, "failures": 0}
+
+
+def _wait_idle(guard, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while guard._limiter.active and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return guard._limiter.active
+
+
+def test_sync_call_is_bounded_by_the_guard_timeout():
+    guard = _guard(timeout_s=0.2, max_retries=1, max_concurrency=2)
+    release = threading.Event()
+    calls = []
+
+    def hung_then_ok():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(10)  # a client that never returns on its own
+        return "ok"
+
+    assert guard.call(hung_then_ok) == "ok"
+    assert guard.stats == {"attempts": 2, "retries": 1, "failures": 0}
+    assert guard._limiter.active == 1  # the abandoned request still holds its slot
+    release.set()
+    assert _wait_idle(guard) == 0
+
+
+def test_sync_call_timeout_fails_after_the_retries():
+    guard = _guard(timeout_s=0.1, max_retries=0)
+    release = threading.Event()
+    with pytest.raises(TimeoutError):
+        guard.call(lambda: release.wait(10))
+    assert guard.stats["failures"] == 1
+    release.set()
+    assert _wait_idle(guard) == 0
+
+
+def test_timed_out_calls_stay_within_max_concurrency():
+    guard = _guard(timeout_s=0.05, max_retries=2, max_concurrency=2)
+    lock = threading.Lock()
+    in_flight = [0]
+    peak = [0]
+
+    def slow_request():
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.2)  # outlives the guard timeout, like a client ignoring it
+        with lock:
+            in_flight[0] -= 1
+        return "late"
+
+    errors = []
+
+    def session():
+        try:
+            guard.call(slow_request)
+        except TimeoutError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=session) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(errors) == 4
+    assert guard.stats["attempts"] == 12
+    assert _wait_idle(guard) == 0
+    assert peak[0] == 2
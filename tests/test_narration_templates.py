@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import pandas as pd
+import pyarrow as pa
+
+from retail_ai.graphs.narration_templates import NarrationPolicy, template_answer
+
+POLICY = NarrationPolicy()
+STATES = pd.DataFrame({"ship-state": ["A", "B", "C"], "gross_amount": [10.0, 50.0, 30.0]})
+
+
+def _plan(metric="gross_amount", sort=None, **extra):
+    return {
+        "metrics": [metric],
+        "group_by": ["ship-state"],
+        "sort": sort or [],
+        "limit": 10,
+        **extra,
+    }
+
+
+def _sorted(df, metric, ascending=False):
+    return df.sort_values(metric, ascending=ascending).reset_index(drop=True)
+
+
+def test_sorted_ranking_names_the_highest():
+    df = _sorted(STATES, "gross_amount")
+    text = template_answer(
+        "gross sales by state", _plan(sort=[{"by": "gross_amount", "order": "desc"}]), df, POLICY
+    )
+    assert text.startswith(
+        "**B** has the highest gross sales at **50.00** (55.6% of the total), followed by C"
+    )
+    assert "The first" not in text  # three rows: "the first 3" would be all of them
+
+
+def test_ascending_ranking_names_the_lowest():
+    df = _sorted(STATES, "gross_amount", ascending=True)
+    text = template_answer(
+        "lowest gross sales by state",
+        _plan(sort=[{"by": "gross_amount", "order": "asc"}]),
+        df,
+        POLICY,
+    )
+    assert text.startswith("**A** has the lowest gross sales at **10.00**")
+
+
+def test_unsorted_result_goes_to_the_llm():
+    assert template_answer("gross sales by state", _plan(), STATES, POLICY) is None
+    other_sort = _plan(sort=[{"by": "ship-state", "order": "asc"}])
+    assert template_answer("gross sales by state", other_sort, STATES, POLICY) is None
+
+
+def test_top_three_share_needs_more_than_three_rows():
+    df = pd.DataFrame({"ship-state": list("ABCD"), "gross_amount": [40.0, 30.0, 20.0, 10.0]})
+    text = template_answer(
+        "gross sales by state", _plan(sort=[{"by": "gross_amount", "order": "desc"}]), df, POLICY
+    )
+    assert "- The first 3 account for 90.0% of the total." in text
+
+
+def test_one_row_is_not_ranked():
+    df = pd.DataFrame({"ship-state": ["X"], "gross_amount": [12.5]})
+    plan = _plan(filters={"ship-state": "X"}, time={"from": "2022-05-01", "to": "2022-05-31"})
+    text = template_answer("gross sales for X", plan, df, POLICY)
+    assert text == "**X**: gross sales for 2022-05-01 to 2022-05-31 is **12.50**."
+
+
+def test_non_additive_metric_has_no_shares():
+    df = pd.DataFrame({"ship-state": list("ABCD"), "orders": [40, 30, 20, 10]})
+    text = template_answer(
+        "orders by state", _plan("orders", sort=[{"by": "orders", "order": "desc"}]), df, POLICY
+    )
+    assert text.startswith("**A** has the highest orders at **40**, followed by B (30).")
+    assert "of the total" not in text
+    assert "account for" not in text
+
+
+def test_comparison_shares_only_for_additive_metrics():
+    df = pd.DataFrame(
+        {"ship-state": ["A", "B"], "orders": [30, 10], "gross_amount": [300.0, 100.0]}
+    )
+    orders = template_answer("orders A vs B", _plan("orders"), df, POLICY)
+    amount = template_answer("sales A vs B", _plan("gross_amount"), df, POLICY)
+    assert "combined total" not in orders
+    assert "- A accounts for 75.0% of the combined total." in amount
+
+
+def test_aggregate_over_no_rows_says_nothing_matches():
+    df = pd.DataFrame({"gross_amount": [None]})
+    plan = {"metrics": ["gross_amount"], "group_by": [], "filters": {"ship-state": "Atlantis"}}
+    text = template_answer("gross sales in Atlantis", plan, df, POLICY)
+    assert text == "No rows match for ship-state Atlantis, so there is no gross sales to report."
+
+
+def test_scalar_names_the_total():
+    df = pd.DataFrame({"gross_amount": [1234.5], "units": [42]})
+    plan = {"metrics": ["gross_amount", "units"], "group_by": [], "filters": {"ship-state": "GOA"}}
+    text = template_answer("gross sales in GOA", plan, df, POLICY)
+    assert text == "Total gross sales for ship-state GOA is **1,234.50**.\n- Units sold: 42"
+
+
+def test_empty_result_says_nothing_matches():
+    df = STATES.iloc[0:0]
+    text = template_answer(
+        "gross sales by state", _plan(filters={"ship-state": "Atlantis"}), df, POLICY
+    )
+    assert text == "No rows match for ship-state Atlantis, so there is no gross sales to report."
+
+
+def test_why_questions_go_to_the_llm():
+    df = _sorted(STATES, "gross_amount")
+    plan = _plan(sort=[{"by": "gross_amount", "order": "desc"}])
+    assert template_answer("why is B ahead on gross sales?", plan, df, POLICY) is None
+
+
+def test_arrow_results_are_answered_and_large_ones_left_to_the_llm():
+    plan = _plan(sort=[{"by": "gross_amount", "order": "desc"}])
+    table = pa.Table.from_pandas(_sorted(STATES, "gross_amount"), preserve_index=False)
+    assert template_answer("gross sales by state", plan, table, POLICY).startswith("**B**")
+    many = pa.table({"ship-state": [str(i) for i in range(50)], "gross_amount": [1.0] * 50})
+    assert template_answer("gross sales by state", plan, many, POLICY) is None
+
+
+def test_scalar_rate_is_not_called_a_total():
+    df = pd.DataFrame({"cancel_rate": [0.125]})
+    plan = {"metrics": ["cancel_rate"], "group_by": [], "filters": {"ship-state": "GOA"}}
+    text = template_answer("cancellation rate in GOA", plan, df, POLICY)
+    assert text == "Cancellation rate for ship-state GOA: **12.5%**."
+
+
+def test_missing_values_go_to_the_llm():
+    plan = _plan("cancel_rate", sort=[{"by": "cancel_rate", "order": "desc"}])
+    ranking = pd.DataFrame({"ship-state": list("ABC"), "cancel_rate": [0.3, float("nan"), 0.1]})
+    comparison = pd.DataFrame({"ship-state": ["A", "B"], "cancel_rate": [None, 0.2]})
+    assert template_answer("cancellation rate by state", plan, ranking, POLICY) is None
+    assert template_answer("cancellation rate A vs B", plan, comparison, POLICY) is None
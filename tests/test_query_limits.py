@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from retail_ai.data_engine.duckdb_service import DuckDBService
+from retail_ai.data_engine.query_limits import QueryInterrupted, QueryLimits, QueryTimeout
+
+SLOW_SQL = "SELECT SUM(hash(i)) FROM range(100000000000) t(i)"
+
+
+class SlowInterrupt:
+    """Connection whose interrupt() returns only after the query has failed,
+    so the caller handles the interrupt before a Timer could mark itself finished."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def interrupt(self):
+        self._conn.interrupt()
+        time.sleep(0.3)
+
+
+def _service(timeout=None):
+    return DuckDBService.in_memory(limits=QueryLimits(query_timeout_seconds=timeout))
+
+
+def test_slow_query_times_out():
+    svc = _service(timeout=0.05)
+    with pytest.raises(QueryTimeout):
+        svc.query_arrow(SLOW_SQL)
+    assert svc.query_arrow("SELECT 42 AS x").column("x").to_pylist() == [42]
+
+
+def test_timeout_is_reported_even_when_interrupt_returns_late():
+    svc = _service(timeout=0.05)
+    svc.conn = SlowInterrupt(svc.conn)
+    with pytest.raises(QueryTimeout):
+        svc.query_arrow(SLOW_SQL)
+
+
+def test_interrupt_before_the_deadline_is_a_cancel():
+    svc = _service(timeout=30)
+    done = threading.Event()
+
+    def cancel():
+        while not done.wait(0.05):  # until the query is running to be interrupted
+            svc.interrupt()
+
+    threading.Thread(target=cancel, daemon=True).start()
+    try:
+        with pytest.raises(QueryInterrupted) as e:
+            svc.query_arrow(SLOW_SQL)
+    finally:
+        done.set()
+    assert not isinstance(e.value, QueryTimeout)
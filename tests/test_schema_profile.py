@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import duckdb
+
+from retail_ai.data_engine.schema_profile import merge_profiles, profile_table
+
+
+def test_merged_profile_matches_a_full_profile():
+    conn = duckdb.connect()
+    conn.execute(
+        "CREATE TABLE sales AS SELECT i AS id, ['A', 'B', 'C'][i % 3 + 1] AS kind, "
+        "CASE WHEN i % 10 = 0 THEN NULL ELSE i * 1.5 END AS amount, "
+        "DATE '2022-04-01' + CAST(i % 30 AS INTEGER) AS order_date FROM range(1000) t(i)"
+    )
+    conn.execute(
+        "CREATE TABLE delta AS SELECT i AS id, ['C', 'D'][i % 2 + 1] AS kind, "
+        "CAST(i AS DOUBLE) AS amount, DATE '2022-06-01' + CAST(i % 5 AS INTEGER) AS order_date FROM range(1000, 1100) t(i)"
+    )
+    merged = merge_profiles(profile_table(conn, "sales"), profile_table(conn, "delta"))
+    conn.execute("INSERT INTO sales SELECT * FROM delta")
+    full = profile_table(conn, "sales")
+
+    assert (merged.row_count, merged.date_min, merged.date_max) == (
+        full.row_count,
+        full.date_min,
+        full.date_max,
+    )
+    for name, col in full.columns.items():
+        got = merged.columns[name]
+        assert (got.null_count, got.min_value, got.max_value) == (
+            col.null_count,
+            col.min_value,
+            col.max_value,
+        )
+    assert merged.columns["kind"].dictionary == {"A", "B", "C", "D"}
+    assert merged.columns["kind"].top_values == full.columns["kind"].top_values
+    assert merged.validate_filters({"kind": "D"}) == ({"kind": "D"}, [])
+
+
+def _kinds():
+    conn = duckdb.connect()
+    conn.execute(
+        "CREATE TABLE sales AS SELECT ['North', 'South'][i % 2 + 1] AS region FROM range(10) t(i)"
+    )
+    return profile_table(conn, "sales")
+
+
+def test_filter_values_are_mapped_to_stored_spelling():
+    filters, warnings = _kinds().validate_filters({"region": [" north", "Sout"]})
+    assert filters == {"region": ["North", "South"]}
+    assert warnings == ["Filter region: interpreted 'Sout' as 'South'."]
+
+
+def test_unknown_filter_value_is_kept_so_nothing_matches():
+    filters, warnings = _kinds().validate_filters({"region": "Atlantis"})
+    assert filters == {"region": "Atlantis"}
+    assert warnings == ["Filter region: 'Atlantis' does not occur in the data, so no rows match."]
+
+    filters, warnings = _kinds().validate_filters({"region": ["north", "Atlantis"]})
+    assert filters == {"region": ["North", "Atlantis"]}
+    assert warnings == ["Filter region: 'Atlantis' does not occur in the data."]
+
+
+def test_prompt_notes_point_at_the_derived_columns():
+    prompt = _kinds().to_prompt()
+    assert "order_date is an ISO DATE" in prompt
+    assert "is_shipped / is_cancelled" in prompt
+    assert "Date column is MM-DD-YY" not in prompt
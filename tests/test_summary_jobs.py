@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import duckdb
+import yaml
+from sales_data import create_raw_sales
+
+from retail_ai.data_engine.data_loader import DataLoader
+from retail_ai.engine import RetailAssistantEngine
+from retail_ai.utils.tracing import profile_queries
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _setup(tmp_path: Path):
+    cfg = yaml.safe_load((ROOT / "config/model_config.yaml").read_text(encoding="utf-8"))
+    cfg["llm"]["provider"] = "stub"
+    cfg["llm"]["stub"] = {"latency_ms": 0, "responses": {}}
+    cfg["llm_cache"]["enabled"] = False
+    cfg["precompute"] = {"enabled": True, "workers": 1, "prompt_rows": 50}
+    path = tmp_path / "model_config.yaml"
+    path.write_text(yaml.safe_dump(cfg), encoding="utf-8")
+
+    (tmp_path / "input").mkdir()
+    csv = tmp_path / "input" / "sales.csv"
+    conn = duckdb.connect()
+    create_raw_sales(conn, 2_000)
+    conn.execute(f"COPY sales_raw TO '{csv}' (HEADER)")
+    dataset = DataLoader(tmp_path / "input", tmp_path / "cache").open(csv)
+    return RetailAssistantEngine(cfg_path=str(path)), dataset
+
+
+def _source(res):
+    return (res.get("telemetry") or {}).get("precompute", {}).get("source")
+
+
+def test_summary_job_is_used_only_for_its_own_settings(tmp_path):
+    engine, dataset = _setup(tmp_path)
+    engine.precompute(dataset).result()
+
+    assert _source(engine.summarize(dataset, max_rows=50)) == "warm"
+    assert _source(engine.summarize(dataset, max_rows=5)) is None  # ran inline
+    with profile_queries():
+        assert _source(engine.summarize(dataset, max_rows=50)) is None
+        events = list(engine.summarize_stream(dataset, max_rows=50))
+    assert _source(events[-1]["state"]) is None